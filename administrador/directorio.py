@@ -0,0 +1,114 @@
+"""
+Directorio en memoria de unidades para el buscador dinámico del administrador.
+
+Se construye una vez por versión de datos ('unidades') con los totales de proyectos
+y el cumplimiento del POA aprobado ya calculados; buscar_unidades_ajax responde desde
+memoria en cada pulsación. Las señales de poa incrementan la versión cuando cambian
+usuarios, unidades o proyectos, y cada worker reconstruye su copia. Los avances no la
+incrementan (en mes de reporte cambian a cada momento): el cumplimiento mostrado se
+actualiza al reconstruir el directorio como máximo cada EDAD_MAXIMA segundos.
+"""
+import time
+import unicodedata
+
+from django.db.models import Count, Q
+
+from login.models import Usuario
+from utils.cache import version_datos
+from utils.estadisticas import poa_aprobado_por_unidad, cumplimiento_por_proyecto
+
+ESPACIO = 'unidades'
+UMBRAL_TRIGRAMAS = 0.3
+EDAD_MAXIMA = 10 * 60
+
+_directorio = {'version': None, 'construido': 0, 'entradas': []}
+
+
+def _normalizar(texto):
+    """Minúsculas y sin acentos"""
+    texto = unicodedata.normalize('NFKD', (texto or '').lower())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+
+def _trigramas(texto):
+    texto = f'  {texto} '
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def _rendimientos():
+    """Cumplimiento promedio del POA aprobado de cada unidad"""
+    poas = poa_aprobado_por_unidad()
+    cumplimientos = cumplimiento_por_proyecto(list(poas.values()))
+    return {unidad_id: cumplimientos[proyecto_id] for unidad_id, proyecto_id in poas.items()}
+
+
+def _construir():
+    rendimientos = _rendimientos()
+    unidades = Usuario.objects.unidades().select_related('unidad').annotate(
+        total_proyectos=Count('proyectos'),
+        count_proyectos_aprobados=Count('proyectos', filter=Q(proyectos__estado='APROBADO'))
+    ).order_by('unidad__nombre', 'id')
+
+    entradas = []
+    for unidad in unidades:
+        nombre = _normalizar(unidad.unidad.nombre)
+        email = _normalizar(unidad.email)
+        entradas.append({
+            'datos': {
+                'id': unidad.id,
+                'nombre': unidad.unidad.nombre,
+                'email': unidad.email,
+                'total_proyectos': unidad.total_proyectos,
+                'proyectos_aprobados': unidad.count_proyectos_aprobados,
+                'rendimiento': rendimientos.get(unidad.id, 0),
+            },
+            'texto': f'{nombre} {email}',
+            'palabras': (nombre + ' ' + email.replace('@', ' ').replace('.', ' ')).split(),
+            'trigramas': [_trigramas(p) for p in nombre.split()],
+        })
+    return entradas
+
+
+def obtener_entradas():
+    """Entradas del directorio vigentes, reconstruidas si la versión cambió o son muy antiguas"""
+    version = version_datos(ESPACIO)
+    ahora = time.monotonic()
+    if _directorio['version'] != version or ahora - _directorio['construido'] > EDAD_MAXIMA:
+        _directorio['entradas'] = _construir()
+        _directorio['version'] = version
+        _directorio['construido'] = ahora
+    return _directorio['entradas']
+
+
+def _similitud(trigramas, palabras):
+    # Jaccard contra la palabra más parecida del nombre
+    return max((len(trigramas & t) / len(trigramas | t) for t in palabras), default=0)
+
+
+def _puntaje(entrada, consulta, terminos, trigramas):
+    if all(any(p.startswith(t) for p in entrada['palabras']) for t in terminos):
+        return 3
+    if consulta in entrada['texto']:
+        return 2
+    # Tolerancia a errores de tipeo por similitud de trigramas, término a término
+    similitud = sum(_similitud(t, entrada['trigramas']) for t in trigramas) / len(trigramas)
+    return similitud if similitud >= UMBRAL_TRIGRAMAS else 0
+
+
+def buscar(consulta, limite=10):
+    """Retorna los datos de las unidades que coinciden, las más relevantes primero"""
+    entradas = obtener_entradas()
+    consulta = _normalizar(consulta).strip()
+    if not consulta:
+        return [e['datos'] for e in entradas[:limite]]
+
+    terminos = consulta.split()
+    trigramas = [_trigramas(t) for t in terminos]
+    puntuadas = []
+    for entrada in entradas:
+        puntaje = _puntaje(entrada, consulta, terminos, trigramas)
+        if puntaje:
+            puntuadas.append((puntaje, entrada['datos']))
+    # sort es estable: a igual puntaje se conserva el orden alfabético
+    puntuadas.sort(key=lambda p: p[0], reverse=True)
+    return [datos for _, datos in puntuadas[:limite]]
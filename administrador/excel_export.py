@@ -481,10 +481,9 @@ def generar_poa_excel(unidad, proyectos, objetivo_estrategico):
     usuario_unidad = Usuario.objects.filter(unidad=unidad, rol='UNIDAD').first()
     
     if usuario_unidad:
-        proyecto_no_planificado = proyectos.model.objects.filter(
-            unidad=usuario_unidad,
-            anio=proyectos.first().anio if proyectos.exists() else datetime.now().year,
-            es_no_planificado=True
+        proyecto_no_planificado = proyectos.model.objects.no_planificado(
+            usuario_unidad,
+            proyectos.first().anio if proyectos.exists() else datetime.now().year,
         ).first()
         
         if proyecto_no_planificado:
@@ -0,0 +1,272 @@
+"""
+Importación de POA históricos desde archivos Excel con el formato de plantilla_poa.xlsx
+(el mismo que escribe generar_poa_excel).
+
+El archivo se lee en modo streaming de openpyxl (read_only): una fila a la vez, sin
+cargar la hoja completa. Disposición de la hoja:
+- D5: nombre de la unidad. El título de la hoja ("POA 2025") indica el año.
+- Desde la fila 14, una actividad por fila: B número, C proyecto y D meta (fusionadas:
+  solo la primera fila de cada grupo tiene valor), E actividad, F unidad de medida.
+- Desde G, 4 columnas por mes (Programado, Realizado, Cumplimiento, Verificación) y una
+  columna de seguimiento trimestral cada 3 meses; después S1, S2, promedio anual y
+  total de recursos.
+- La sección "ACTIVIDADES NO PLANIFICADAS" va al proyecto de no planificadas de la unidad.
+
+Las actividades se validan con FormularioActividad (FormularioActividadNoPlanificada en
+esa sección) y cada archivo se guarda en una transacción con inserciones masivas: si
+tiene algún error no se importa nada de él.
+"""
+import re
+
+from django.db import transaction
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from login.models import Usuario
+from poa.forms import FormularioActividad, FormularioActividadNoPlanificada
+from poa.models import Proyecto, MetaProyecto, Actividad, AvanceMensual
+from poa.signals import despues_de_crear_en_lote
+
+FILA_UNIDAD = 5
+FILA_DATOS = 14
+COLUMNA_PROYECTO, COLUMNA_META, COLUMNA_ACTIVIDAD, COLUMNA_UNIDAD_MEDIDA = 3, 4, 5, 6
+COLUMNA_ENERO = 7
+NO_PLANIFICADAS = 'ACTIVIDADES NO PLANIFICADAS'
+MEDIO_VERIFICACION_FALTANTE = 'No indicado en el POA importado'
+MESES = range(1, 13)
+UNIDADES_MEDIDA = {valor for valor, _ in FormularioActividad.UNIDADES_MEDIDA if valor and valor != 'Otro'}
+
+
+def columna_mes(mes):
+    """Columna (desde 1) del programado del mes: 4 por mes más una trimestral cada 3 meses"""
+    return COLUMNA_ENERO + (mes - 1) * 4 + (mes - 1) // 3
+
+
+COLUMNA_RECURSOS = columna_mes(12) + 4 + 1 + 3
+
+
+class ArchivoInvalido(Exception):
+    """El archivo no se puede importar. errores: lista de mensajes con la fila."""
+
+    def __init__(self, errores):
+        super().__init__('; '.join(errores))
+        self.errores = errores
+
+
+def _texto(valor):
+    return '' if valor is None else str(valor).strip()
+
+
+def _celda(fila, columna):
+    return fila[columna - 1] if columna <= len(fila) else None
+
+
+def _cantidad(valor, ubicacion, errores):
+    if valor is None or _texto(valor) == '':
+        return 0
+    try:
+        numero = float(valor)
+    except (TypeError, ValueError):
+        errores.append(f'{ubicacion}: "{valor}" no es una cantidad.')
+        return 0
+    if not numero.is_integer() or not 0 <= numero <= 999999:
+        errores.append(f'{ubicacion}: la cantidad debe ser un entero entre 0 y 999,999.')
+        return 0
+    return int(numero)
+
+
+def _errores_formulario(formulario, ubicacion):
+    return [
+        f'{ubicacion}: {error}' if campo == '__all__' else f'{ubicacion} ({campo}): {error}'
+        for campo, errores in formulario.errors.items()
+        for error in errores
+    ]
+
+
+def _actividad(fila, numero_fila, no_planificada, errores):
+    """Valida la fila y retorna (actividad sin guardar, [(programado, realizado, texto) por mes])"""
+    ubicacion = f'Fila {numero_fila}'
+    meses = []
+    for mes in MESES:
+        columna = columna_mes(mes)
+        meses.append((
+            _cantidad(_celda(fila, columna), f'{ubicacion}, mes {mes} (programado)', errores),
+            _cantidad(_celda(fila, columna + 1), f'{ubicacion}, mes {mes} (realizado)', errores),
+            _texto(_celda(fila, columna + 3))[:500],
+        ))
+    programado = sum(p for p, _, _ in meses)
+    verificaciones = list(dict.fromkeys(texto for p, r, texto in meses if texto and r >= p))
+
+    unidad_medida = _texto(_celda(fila, COLUMNA_UNIDAD_MEDIDA))
+    recursos = _celda(fila, COLUMNA_RECURSOS)
+    datos = {
+        'descripcion': _texto(_celda(fila, COLUMNA_ACTIVIDAD)),
+        'unidad_medida_select': unidad_medida if unidad_medida in UNIDADES_MEDIDA else 'Otro',
+        'unidad_medida_otro': '' if unidad_medida in UNIDADES_MEDIDA else unidad_medida,
+        'es_cuantificable': programado > 0 or no_planificada,
+        'cantidad_programada': programado,
+        'medio_verificacion': '; '.join(verificaciones)[:500] or MEDIO_VERIFICACION_FALTANTE,
+        'recursos': '',
+        'total_recursos': recursos if isinstance(recursos, (int, float)) else 0,
+    }
+    formulario = (FormularioActividadNoPlanificada if no_planificada else FormularioActividad)(datos)
+    if not formulario.is_valid():
+        errores.extend(_errores_formulario(formulario, ubicacion))
+        return None
+    return formulario.save(commit=False), meses
+
+
+def leer_poa_excel(archivo, anio=None):
+    """
+    Lee y valida el archivo (ruta o archivo abierto) sin guardar nada.
+    Retorna {'unidad': nombre, 'anio', 'proyectos': [{'nombre', 'no_planificado', 'metas':
+    [(descripcion, [(actividad, meses), ...])]}]}. Lanza ArchivoInvalido con todos los errores.
+    """
+    try:
+        libro = load_workbook(archivo, read_only=True, data_only=True)
+    except Exception as e:
+        raise ArchivoInvalido([f'No se pudo abrir el archivo: {e}'])
+    try:
+        hoja = libro.active
+        if anio is None:
+            coincidencia = re.search(r'(\d{4})', hoja.title or '')
+            if not coincidencia:
+                raise ArchivoInvalido([f'No se encontró el año en el título de la hoja ("{hoja.title}"); indíquelo.'])
+            anio = int(coincidencia.group(1))
+
+        errores, proyectos = [], []
+        unidad = ''
+        proyecto = meta = None
+        for numero_fila, fila in enumerate(hoja.iter_rows(min_row=FILA_UNIDAD, values_only=True), start=FILA_UNIDAD):
+            if numero_fila == FILA_UNIDAD:
+                unidad = _texto(_celda(fila, COLUMNA_META))
+            if numero_fila < FILA_DATOS:
+                continue
+            nombre_proyecto = _texto(_celda(fila, COLUMNA_PROYECTO))
+            descripcion_meta = _texto(_celda(fila, COLUMNA_META))
+            if not _texto(_celda(fila, COLUMNA_ACTIVIDAD)):
+                # Filas vacías y el título de la sección de no planificadas
+                continue
+            if nombre_proyecto:
+                proyecto = {'nombre': nombre_proyecto, 'no_planificado': nombre_proyecto == NO_PLANIFICADAS, 'metas': []}
+                proyectos.append(proyecto)
+                meta = None
+            if descripcion_meta:
+                if proyecto is None:
+                    errores.append(f'Fila {numero_fila}: la meta no tiene proyecto.')
+                    continue
+                meta = (descripcion_meta[:200], [])
+                proyecto['metas'].append(meta)
+            if meta is None:
+                errores.append(f'Fila {numero_fila}: la actividad no tiene meta.')
+                continue
+            actividad = _actividad(fila, numero_fila, proyecto['no_planificado'], errores)
+            if actividad:
+                meta[1].append(actividad)
+    finally:
+        libro.close()
+
+    if not proyectos and not errores:
+        errores.append(f'El archivo no tiene actividades desde la fila {FILA_DATOS}.')
+    if errores:
+        raise ArchivoInvalido(errores)
+    return {'unidad': unidad, 'anio': anio, 'proyectos': proyectos}
+
+
+def _usuario_de_unidad(nombre):
+    """Usuario de unidad cuyo nombre de unidad coincide (sin distinguir mayúsculas, también con tildes)"""
+    buscado = nombre.casefold()
+    for usuario in Usuario.objects.unidades().select_related('unidad').order_by('id'):
+        if usuario.unidad and usuario.unidad.nombre.strip().casefold() == buscado:
+            return usuario
+    return None
+
+
+def _resumen(poa, usuario):
+    metas = [meta for proyecto in poa['proyectos'] for meta in proyecto['metas']]
+    actividades = sum(len(actividades) for _, actividades in metas)
+    return {
+        'unidad': usuario.unidad.nombre, 'anio': poa['anio'], 'proyectos': len(poa['proyectos']),
+        'metas': len(metas), 'actividades': actividades, 'avances': actividades * len(MESES),
+    }
+
+
+def importar_poa_excel(archivo, usuario=None, anio=None, dry_run=False):
+    """
+    Importa un archivo POA como proyectos aprobados de la unidad (la indicada en `usuario`
+    o la que coincide con D5). Con dry_run solo valida. Retorna el resumen de lo creado
+    (o de lo que se crearía); lanza ArchivoInvalido con los errores del archivo.
+    """
+    poa = leer_poa_excel(archivo, anio)
+    if usuario is None:
+        if not poa['unidad']:
+            raise ArchivoInvalido([f'La celda D{FILA_UNIDAD} no tiene el nombre de la unidad; indique la unidad.'])
+        usuario = _usuario_de_unidad(poa['unidad'])
+        if usuario is None:
+            raise ArchivoInvalido([f'No hay un usuario de unidad para "{poa["unidad"]}".'])
+
+    existentes = set(
+        Proyecto.objects.filter(unidad=usuario, anio=poa['anio']).values_list('nombre', 'es_no_planificado')
+    )
+    repetidos = [
+        p['nombre'] for p in poa['proyectos']
+        if (p['nombre'], False) in existentes or (p['no_planificado'] and any(np for _, np in existentes))
+    ]
+    if repetidos:
+        raise ArchivoInvalido([f'La unidad ya tiene en {poa["anio"]} el proyecto "{nombre}".' for nombre in repetidos])
+
+    resumen = _resumen(poa, usuario)
+    if not dry_run:
+        _guardar(poa, usuario)
+    return resumen
+
+
+@transaction.atomic
+def _guardar(poa, usuario):
+    anio = poa['anio']
+    proyectos = []
+    for datos in poa['proyectos']:
+        if datos['no_planificado']:
+            proyecto = Proyecto(
+                unidad=usuario, nombre=f'{NO_PLANIFICADAS} {anio}', es_no_planificado=True,
+                objetivo_unidad='Registro de actividades no contempladas en el POA inicial',
+            )
+        else:
+            proyecto = Proyecto(unidad=usuario, nombre=datos['nombre'][:200])
+        proyecto.anio, proyecto.estado, proyecto.fecha_aprobacion = anio, 'APROBADO', timezone.now()
+        proyectos.append((proyecto, datos['metas']))
+    Proyecto.objects.bulk_create([proyecto for proyecto, _ in proyectos])
+
+    metas = [
+        (MetaProyecto(proyecto=proyecto, descripcion=descripcion), actividades)
+        for proyecto, metas_proyecto in proyectos
+        for descripcion, actividades in metas_proyecto
+    ]
+    MetaProyecto.objects.bulk_create([meta for meta, _ in metas])
+
+    actividades = []
+    for meta, actividades_meta in metas:
+        for actividad, meses in actividades_meta:
+            actividad.meta = meta
+            actividades.append((actividad, meses))
+    Actividad.objects.bulk_create([actividad for actividad, _ in actividades], batch_size=500)
+
+    avances = []
+    for actividad, meses in actividades:
+        for mes, (programado, realizado, texto) in zip(MESES, meses):
+            avance = AvanceMensual(
+                actividad=actividad, mes=mes, anio=anio, cantidad_programada_mes=programado,
+                cantidad_realizada=realizado, es_no_planificada=realizado > programado,
+                causal_incumplimiento=texto if realizado < programado else '',
+            )
+            avance.calcular_cumplimiento()
+            avances.append(avance)
+    AvanceMensual.objects.bulk_create(avances, batch_size=500)
+
+    despues_de_crear_en_lote(
+        usuario.unidad_id,
+        proyectos=[proyecto for proyecto, _ in proyectos],
+        metas=[meta for meta, _ in metas],
+        actividades=[actividad for actividad, _ in actividades],
+        avances=avances,
+    )
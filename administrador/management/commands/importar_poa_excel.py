@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from administrador.excel_import import ArchivoInvalido, importar_poa_excel
+from login.models import Usuario
+
+
+class Command(BaseCommand):
+    """
+    Importa POA históricos desde archivos Excel con el formato de plantilla_poa.xlsx.
+    Cada archivo se importa completo o no se importa; los errores se informan por archivo.
+    Ejemplo: python manage.py importar_poa_excel poa_2023/*.xlsx --anio 2023 --dry-run
+    """
+    help = 'Importa proyectos, metas, actividades y avances desde archivos POA en Excel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivos', nargs='+', help='Archivos .xlsx a importar')
+        parser.add_argument('--anio', type=int, help='Año de los POA (por defecto, el del título de la hoja)')
+        parser.add_argument('--unidad', type=int, help='ID de la unidad, como en clonar_poas (por defecto, según la celda D5)')
+        parser.add_argument('--dry-run', action='store_true', help='Solo valida y muestra lo que se importaría')
+
+    def handle(self, *args, **options):
+        usuario = None
+        if options['unidad']:
+            usuario = (
+                Usuario.objects.unidades().select_related('unidad')
+                .filter(unidad_id=options['unidad']).order_by('id').first()
+            )
+            if usuario is None:
+                raise CommandError(f'La unidad {options["unidad"]} no existe o no tiene usuario de unidad.')
+        if options['anio'] is not None and not 2000 <= options['anio'] <= 2100:
+            raise CommandError('--anio debe estar entre 2000 y 2100.')
+
+        verbo = 'Se importaría' if options['dry_run'] else 'Importado'
+        importados = fallidos = 0
+        inicio = time.monotonic()
+        for archivo in options['archivos']:
+            try:
+                r = importar_poa_excel(archivo, usuario=usuario, anio=options['anio'], dry_run=options['dry_run'])
+            except ArchivoInvalido as e:
+                fallidos += 1
+                self.stderr.write(self.style.ERROR(f'{archivo}: {len(e.errores)} errores, no se importó.'))
+                for error in e.errores:
+                    self.stderr.write(f'  - {error}')
+                continue
+            importados += 1
+            self.stdout.write(
+                f"{archivo}: {verbo} a {r['unidad']} ({r['anio']}): {r['proyectos']} proyectos, "
+                f"{r['metas']} metas, {r['actividades']} actividades y {r['avances']} avances."
+            )
+
+        resumen = f'{importados} archivos correctos y {fallidos} con errores en {time.monotonic() - inicio:.1f} s.'
+        self.stdout.write(self.style.WARNING(resumen) if fallidos else self.style.SUCCESS(resumen))
@@ -1,3 +1,236 @@
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from login.models import Usuario
+from poa.models import Actividad, AvanceMensual, MetaPredeterminada, Proyecto
+from poa.tests import DatosPOAMixin
+from utils import catalogos
+from . import directorio
+from utils.cache import obtener_metricas
+
+
+class BuscarUnidadesAjaxTestCase(DatosPOAMixin, TestCase):
+    """Tests para el buscador dinámico de unidades"""
+
+    def setUp(self):
+        self.crear_datos()
+        self.admin = Usuario.objects.create_user(
+            email='admin@ejemplo.com', password='clave123', unidad=self.unidad,
+            rol='ADMIN', debe_cambiar_clave=False,
+        )
+        self.client.force_login(self.admin)
+        AvanceMensual.objects.create(actividad=self.actividad, mes=1, cantidad_programada_mes=4, cantidad_realizada=2)
+
+    def buscar(self, consulta):
+        respuesta = self.client.get(reverse('administrador:buscar_unidades_ajax'), {'q': consulta})
+        return respuesta.json()['unidades']
+
+    def test_prefijo_y_errores_de_tipeo(self):
+        for consulta in ['de tur', 'turismo@', 'Turisno']:
+            with self.subTest(consulta=consulta):
+                self.assertEqual(self.buscar(consulta)[0]['id'], self.usuario.id)
+
+    def test_lista_filtra_por_subcadena_o_prefijo_sin_acentos(self):
+        url = reverse('administrador:lista_unidades')
+        for consulta, esperado in [('rismo@ejem', True), ('turísmo ejemplo', True), ('tur ejemplox', False)]:
+            with self.subTest(consulta=consulta):
+                unidades = self.client.get(url, {'buscar': consulta}).context['unidades']
+                self.assertEqual(self.usuario in unidades, esperado)
+
+    def test_invalida_por_proyectos_y_refresca_avances_por_antiguedad(self):
+        unidad = self.buscar('turismo')[0]
+        self.assertEqual((unidad['total_proyectos'], unidad['proyectos_aprobados'], unidad['rendimiento']), (1, 1, 50.0))
+
+        # Guardar avances no reconstruye el directorio en cada carga
+        avance = AvanceMensual.objects.get(actividad=self.actividad, mes=1)
+        avance.cantidad_realizada = 4
+        avance.save()
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(self.buscar('turismo')[0]['rendimiento'], 50.0)
+        self.assertFalse([c for c in consultas if 'poa_avancemensual' in c['sql']])
+
+        construido = directorio._directorio['construido']
+        with mock.patch('administrador.directorio.time.monotonic', return_value=construido + directorio.EDAD_MAXIMA + 1):
+            self.assertEqual(self.buscar('turismo')[0]['rendimiento'], 100.0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Proyecto.objects.create(unidad=self.usuario, nombre='Ruta del Café', anio=2025)
+        self.assertEqual(self.buscar('turismo')[0]['total_proyectos'], 2)
+
+
+class DashboardCacheTestCase(DatosPOAMixin, TestCase):
+    """Tests para los agregados cacheados del dashboard"""
+
+    def setUp(self):
+        self.crear_datos()
+        self.admin = Usuario.objects.create_user(
+            email='admin@ejemplo.com', password='clave123', unidad=self.unidad,
+            rol='ADMIN', debe_cambiar_clave=False,
+        )
+        self.client.force_login(self.admin)
+
+    def test_cachea_e_invalida_por_senales(self):
+        url = reverse('administrador:dashboard')
+        self.client.get(url)
+        # Con la caché caliente solo quedan la sesión y el usuario autenticado
+        with self.assertNumQueries(2):
+            respuesta = self.client.get(url)
+        self.assertEqual(respuesta.context['proyectos_pendientes'], 0)
+
+        # Las versiones se incrementan al confirmar la transacción
+        with self.captureOnCommitCallbacks(execute=True):
+            self.proyecto.estado = 'ENVIADO'
+            self.proyecto.save()
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.context['proyectos_pendientes'], 1)
+        self.assertEqual(list(respuesta.context['proyectos_revision']), [self.proyecto])
+
+        metricas = obtener_metricas()['dashboard:conteos']
+        self.assertEqual((metricas['aciertos'], metricas['fallos']), (1, 2))
+
+    def test_dataset_de_graficos_con_etag(self):
+        url = reverse('administrador:datos_grafico', args=['proyectos'])
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.json()['estados'][0], 1)
+        etag = respuesta['ETag']
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        comprimida = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(comprimida['Content-Encoding'], 'gzip')
+
+        # Las versiones se incrementan al confirmar la transacción
+        with self.captureOnCommitCallbacks(execute=True):
+            self.proyecto.estado = 'ENVIADO'
+            self.proyecto.save()
+        respuesta = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['estados'][:2], [0, 1])
+        self.assertEqual(self.client.get(reverse('administrador:datos_grafico', args=['otro'])).status_code, 404)
+
+
+class CatalogosTestCase(DatosPOAMixin, TestCase):
+    """Tests para los catálogos cacheados en memoria"""
+
+    def setUp(self):
+        self.crear_datos()
+        catalogos.limpiar()
+        self.admin = Usuario.objects.create_user(
+            email='admin@ejemplo.com', password='clave123', unidad=self.unidad,
+            rol='ADMIN', debe_cambiar_clave=False,
+        )
+        self.client.force_login(self.admin)
+
+    def test_sin_consultas_e_invalidado_por_el_crud(self):
+        MetaPredeterminada.objects.create(nombre='Capacitación')
+        self.assertEqual([m.nombre for m in catalogos.metas_predeterminadas_activas()], ['Capacitación'])
+        with self.assertNumQueries(0):
+            catalogos.metas_predeterminadas_activas()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('administrador:crear_meta_predeterminada'), {'nombre': 'Atención', 'activa': 'on'})
+        self.assertEqual(
+            [m.nombre for m in catalogos.metas_predeterminadas_activas()], ['Atención', 'Capacitación']
+        )
+
+        meta = MetaPredeterminada.objects.get(nombre='Capacitación')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('administrador:editar_meta_predeterminada', args=[meta.id]), {'nombre': 'Capacitación'})
+        self.assertEqual([m.nombre for m in catalogos.metas_predeterminadas_activas()], ['Atención'])
+
+
+class EditarProyectoAdminTestCase(DatosPOAMixin, TestCase):
+    """Tests para la matriz de programación de la edición del administrador"""
+
+    def setUp(self):
+        self.crear_datos()
+        self.admin = Usuario.objects.create_user(
+            email='admin@ejemplo.com', password='clave123', unidad=self.unidad,
+            rol='ADMIN', debe_cambiar_clave=False,
+        )
+        self.client.force_login(self.admin)
+        self.url = reverse('administrador:editar_proyecto_admin', args=[self.proyecto.id])
+        for _ in range(3):
+            self.client.post(self.url, {'accion': 'siguiente'})
+        for mes, cantidad in ((1, 5), (12, 7)):
+            AvanceMensual.objects.create(actividad=self.actividad, mes=mes, anio=2025, cantidad_programada_mes=cantidad)
+
+    def consultas_paso_4(self):
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(self.url)
+        return respuesta, len(consultas)
+
+    def test_matriz_en_consultas_constantes(self):
+        respuesta, consultas = self.consultas_paso_4()
+        fila = respuesta.context['programacion'][0]
+        self.assertEqual(fila['cantidades'], [5] + [0] * 10 + [7])
+        self.assertContains(respuesta, 'name="mes_12" min="0" value="7"')
+
+        for i in range(5):
+            Actividad.objects.create(
+                meta=self.meta, descripcion=f'Actividad {i}', unidad_medida='Evento', medio_verificacion='Actas',
+            )
+        respuesta, consultas_con_mas_actividades = self.consultas_paso_4()
+        self.assertEqual(len(respuesta.context['programacion']), 6)
+        self.assertEqual(consultas_con_mas_actividades, consultas)
+
+
+class ImportarPoaExcelTestCase(DatosPOAMixin, TestCase):
+    """Tests para la importación de POA desde el Excel que genera la exportación"""
+
+    def setUp(self):
+        from administrador.excel_export import generar_poa_excel
+        self.crear_datos()
+        for mes in range(1, 13):
+            AvanceMensual.objects.create(
+                actividad=self.actividad, mes=mes, anio=2025, cantidad_programada_mes=1, cantidad_realizada=mes % 2,
+            )
+        proyectos = Proyecto.objects.filter(id=self.proyecto.id).prefetch_related('metas__actividades')
+        self.libro = generar_poa_excel(self.unidad, proyectos, None)
+
+    def archivo(self):
+        # El libro se guarda una sola vez: openpyxl no puede volver a escribir sus imágenes
+        if not hasattr(self, 'contenido'):
+            archivo = BytesIO()
+            self.libro.save(archivo)
+            self.contenido = archivo.getvalue()
+        return BytesIO(self.contenido)
+
+    def test_importa_lo_exportado(self):
+        from administrador.excel_import import importar_poa_excel
+        resumen = importar_poa_excel(self.archivo(), anio=2026, dry_run=True)
+        self.assertEqual((resumen['proyectos'], resumen['actividades'], resumen['avances']), (1, 1, 12))
+        self.assertFalse(Proyecto.objects.filter(anio=2026).exists())
+
+        importar_poa_excel(self.archivo(), anio=2026)
+        copia = Proyecto.objects.get(unidad=self.usuario, anio=2026)
+        self.assertEqual((copia.nombre, copia.estado), ('Festival Gastronómico', 'APROBADO'))
+        actividad = Actividad.objects.get(meta__proyecto=copia)
+        self.assertEqual((actividad.descripcion, actividad.unidad_medida, actividad.cantidad_programada),
+                         ('Organizar feria de artesanías', 'Evento', 12))
+        realizado = dict(AvanceMensual.objects.filter(actividad=actividad).values_list('mes', 'cantidad_realizada'))
+        self.assertEqual(realizado, {mes: mes % 2 for mes in range(1, 13)})
+
+    def test_comando_con_la_unidad_indicada(self):
+        # --unidad es el id de login.Unidad, igual que en clonar_poas
+        with tempfile.NamedTemporaryFile(suffix='.xlsx') as archivo:
+            archivo.write(self.archivo().getvalue())
+            archivo.flush()
+            call_command('importar_poa_excel', archivo.name, '--anio', '2026', '--unidad', str(self.unidad.id), stdout=StringIO())
+            with self.assertRaises(CommandError):
+                call_command('importar_poa_excel', archivo.name, '--unidad', str(self.usuario.id + 1000), stdout=StringIO())
+        self.assertTrue(Proyecto.objects.filter(unidad=self.usuario, anio=2026).exists())
 
-# Create your tests here.
+    def test_reporta_errores_por_fila_sin_importar(self):
+        from administrador.excel_import import ArchivoInvalido, importar_poa_excel
+        self.libro.active['H14'] = 'muchos'
+        with self.assertRaises(ArchivoInvalido) as contexto:
+            importar_poa_excel(self.archivo(), anio=2026)
+        self.assertEqual(contexto.exception.errores, ['Fila 14, mes 1 (realizado): "muchos" no es una cantidad.'])
+        self.assertFalse(Proyecto.objects.filter(anio=2026).exists())
@@ -6,6 +6,7 @@ app_name = 'administrador'
 urlpatterns = [
     path('', views.dashboard_admin, name='dashboard'),
     path('estadisticas/', views.estadisticas_admin, name='estadisticas'),
+    path('estadisticas/datos/<str:dataset>/', views.datos_grafico, name='datos_grafico'),
     path('unidades/', views.lista_unidades, name='lista_unidades'),
     path('unidades/exportar/pdf/', views.exportar_unidades_pdf, name='exportar_unidades_pdf'),
     path('unidades/exportar/excel/', views.exportar_unidades_excel, name='exportar_unidades_excel'),
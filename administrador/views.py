@@ -3,111 +3,60 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db.models import Q, Count, Avg, Sum
 from django.utils import timezone
+from django.views.decorators.gzip import gzip_page
 from django.http import JsonResponse, HttpResponse
 from login.models import Usuario, Unidad
 from poa.models import Proyecto, MetaProyecto, Actividad, AvanceMensual, Evidencia, AuditoriaLog
 from poa.forms import FormularioProyecto, FormularioMeta, FormularioActividad
+from poa.busqueda import ids_coincidentes
+from poa.programacion import matriz_programacion
+from utils.cache import cacheado
+from utils.catalogos import objetivos_estrategicos_activos
+from utils import estado_wizard
+from utils.estadisticas import conteos_generales, datos_trimestrales, filtrar_por_nombre
+from utils.graficos import respuesta_dataset
+from utils.concurrencia import limitar_exportaciones
 from .decorators import admin_required
-from openpyxl.cell.cell import Cell
-import json
+from . import directorio
 from django.core.paginator import Paginator
 from decimal import Decimal
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib.enums import TA_CENTER
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
-from openpyxl import Workbook
-from openpyxl.styles import PatternFill, Font, Border, Side, Alignment
 from datetime import datetime
 
-from utils.exportacion import (
-    generar_pdf_proyecto_detalle,
-    generar_excel_proyecto_detalle,
-    generar_pdf_unidades,
-    generar_excel_unidades,
-    generar_pdf_reporte_trimestral, 
-    generar_excel_reporte_trimestral
-)
+# reportlab, openpyxl y utils.exportacion se importan dentro de las vistas de exportación:
+# así no se cargan al iniciar cada worker, solo en la primera exportación
+
+
+TTL_CONTEOS_DASHBOARD = 15 * 60
+TTL_LISTAS_DASHBOARD = 5 * 60
 
 
 def verificar_admin(user):
     """Verifica que el usuario sea administrador"""
     return user.is_authenticated and user.rol == 'ADMIN'
 
+
 @login_required
 def dashboard_admin(request):
     """Dashboard principal del administrador"""
     if request.user.rol != 'ADMIN':
         return redirect('login:login')
     
-    # Estadísticas generales
-    total_unidades = Usuario.objects.filter(rol='UNIDAD').count()
-    total_proyectos = Proyecto.objects.count()
-    proyectos_aprobados = Proyecto.objects.filter(estado='APROBADO').count()
-    proyectos_enviados = Proyecto.objects.filter(estado='ENVIADO').count()
-    proyectos_borrador = Proyecto.objects.filter(estado='BORRADOR').count()
+    # Estadísticas generales (cacheadas; las señales de poa invalidan el espacio 'dashboard')
+    conteos = cacheado('dashboard', 'conteos', conteos_generales, ttl=TTL_CONTEOS_DASHBOARD)
     
     # Proyectos pendientes de revisión (Enviados)
-    pendientes = Proyecto.objects.filter(estado='ENVIADO').select_related('unidad').order_by('-fecha_modificacion')
+    pendientes = cacheado('dashboard', 'admin:pendientes', lambda: list(
+        Proyecto.objects.pendientes_revision().select_related('unidad__unidad')
+    ), ttl=TTL_LISTAS_DASHBOARD)
     
     context = {
-        'total_unidades': total_unidades,
-        'total_proyectos': total_proyectos,
-        'proyectos_aprobados': proyectos_aprobados,
-        'proyectos_pendientes': proyectos_enviados,
-        'proyectos_borrador': proyectos_borrador,
+        **conteos,
         'proyectos_revision': pendientes,
     }
     return render(request, 'administrador/dashboard.html', context)
 
 
 
-def _get_datos_trimestrales(busqueda_str=""):
-    """
-    Función de ayuda para calcular y filtrar los datos trimestrales.
-    Usada por estadisticas_admin y las vistas de exportación.
-    """
-    unidades_con_datos = Usuario.objects.filter(rol='UNIDAD').select_related('unidad')
-    unidades_trimestrales_data = []
-
-    for unidad in unidades_con_datos:
-        nombre_unidad = unidad.unidad.nombre
-        
-        if busqueda_str and busqueda_str.lower() not in nombre_unidad.lower():
-            continue 
-        
-        poa_aprobado = Proyecto.objects.filter(unidad=unidad, estado='APROBADO').first()
-        
-        t1_avg, t2_avg, t3_avg, t4_avg = 0.0, 0.0, 0.0, 0.0
-        
-        if poa_aprobado:
-            avances = AvanceMensual.objects.filter(actividad__meta__proyecto=poa_aprobado)
-            
-            t1_data = avances.filter(mes__in=[1, 2, 3]).aggregate(avg=Avg('cumplimiento'))
-            t1_avg = float(t1_data['avg'] or 0.0)
-            
-            t2_data = avances.filter(mes__in=[4, 5, 6]).aggregate(avg=Avg('cumplimiento'))
-            t2_avg = float(t2_data['avg'] or 0.0)
-            
-            t3_data = avances.filter(mes__in=[7, 8, 9]).aggregate(avg=Avg('cumplimiento'))
-            t3_avg = float(t3_data['avg'] or 0.0)
-            
-            t4_data = avances.filter(mes__in=[10, 11, 12]).aggregate(avg=Avg('cumplimiento'))
-            t4_avg = float(t4_data['avg'] or 0.0)
-            
-        unidades_trimestrales_data.append({
-            'nombre': nombre_unidad,
-            't1': round(t1_avg, 2),
-            't2': round(t2_avg, 2),
-            't3': round(t3_avg, 2),
-            't4': round(t4_avg, 2),
-        })
-        
-    return unidades_trimestrales_data
-
-
 @admin_required
 def estadisticas_admin(request):
     """Página de estadísticas y gráficos del administrador"""
@@ -116,29 +65,8 @@ def estadisticas_admin(request):
     page_number = request.GET.get('page', 1)
     active_tab = request.GET.get('tab', 'general')
     
-    unidades_con_datos = Usuario.objects.filter(rol='UNIDAD').select_related('unidad')
-    unidades_data = { 'nombres': [], 'cumplimiento': [], 'proyectos': [], 'metricas': [] }
-    
-    for unidad in unidades_con_datos:
-        unidades_data['nombres'].append(unidad.unidad.nombre)
-        poa_aprobado = Proyecto.objects.filter(unidad=unidad, estado='APROBADO').first()
-        cumplimiento_promedio = 0.0
-        if poa_aprobado:
-            avances = AvanceMensual.objects.filter(actividad__meta__proyecto=poa_aprobado)
-            resultado_avg = avances.aggregate(Avg('cumplimiento'))['cumplimiento__avg']
-            if resultado_avg is not None: cumplimiento_promedio = float(resultado_avg)
-            unidades_data['cumplimiento'].append(round(cumplimiento_promedio, 2))
-            total_evidencias = Evidencia.objects.filter(actividad__meta__proyecto=poa_aprobado).count()
-            total_actividades = Actividad.objects.filter(meta__proyecto=poa_aprobado).count()
-            unidades_data['metricas'].append([round(cumplimiento_promedio, 2), min(total_evidencias * 10, 100), min(total_actividades * 5, 100), 85, 90])
-        else:
-            unidades_data['cumplimiento'].append(0.0)
-            unidades_data['metricas'].append([0, 0, 0, 0, 0])
-        total_proyectos_unidad = Proyecto.objects.filter(unidad=unidad).count()
-        unidades_data['proyectos'].append(total_proyectos_unidad)
-    
-   
-    unidades_trimestrales_filtradas = _get_datos_trimestrales(busqueda)
+    trimestrales = cacheado('dashboard', 'trimestrales', datos_trimestrales, ttl=TTL_CONTEOS_DASHBOARD)
+    unidades_trimestrales_filtradas = filtrar_por_nombre(trimestrales, busqueda)
         
     # 2. Paginamos la lista filtrada
     paginator = Paginator(unidades_trimestrales_filtradas, 6) # 6 unidades por página
@@ -147,39 +75,14 @@ def estadisticas_admin(request):
     # =======================================================
     # =======================================================
 
-    proyectos_data = {
-        'estados': [
-            Proyecto.objects.filter(estado='APROBADO').count(),
-            Proyecto.objects.filter(estado='ENVIADO').count(),
-            Proyecto.objects.filter(estado='RECHAZADO').count(),
-            Proyecto.objects.filter(estado='BORRADOR').count()
-        ],
-        'cumplimiento_mensual': []
-    }
-    for mes in range(1, 13):
-        # Calculamos el promedio de cumplimiento de todas las actividades en ese mes
-        # Solo consideramos avances que tengan un cumplimiento calculado (no nulo)
-        promedio = AvanceMensual.objects.filter(
-            mes=mes, 
-            cumplimiento__isnull=False
-        ).aggregate(promedio=Avg('cumplimiento'))['promedio']
-        
-        val = float(promedio) if promedio is not None else 0.0
-        proyectos_data['cumplimiento_mensual'].append(round(val, 2))
-    
-    total_unidades = unidades_con_datos.count() 
-    total_proyectos = Proyecto.objects.count()
-    proyectos_aprobados = Proyecto.objects.filter(estado='APROBADO').count()
-    proyectos_pendientes = Proyecto.objects.filter(estado='ENVIADO').count()
+    conteos = cacheado('dashboard', 'conteos', conteos_generales, ttl=TTL_CONTEOS_DASHBOARD)
     
     contexto = {
         'titulo': 'Estadísticas y Gráficos',
-        'unidades_data': json.dumps(unidades_data),
-        'proyectos_data': json.dumps(proyectos_data),
-        'total_unidades': total_unidades,
-        'total_proyectos': total_proyectos,
-        'proyectos_aprobados': proyectos_aprobados,
-        'proyectos_pendientes': proyectos_pendientes,
+        'total_unidades': conteos['total_unidades'],
+        'total_proyectos': conteos['total_proyectos'],
+        'proyectos_aprobados': conteos['proyectos_aprobados'],
+        'proyectos_pendientes': conteos['proyectos_pendientes'],
         'unidades_trimestrales_page': page_obj,
         'busqueda': busqueda,
         'active_tab': active_tab,
@@ -187,18 +90,27 @@ def estadisticas_admin(request):
     
     return render(request, 'administrador/estadisticas.html', contexto)
 
+
+@admin_required
+@gzip_page
+def datos_grafico(request, dataset):
+    """Dataset JSON de un gráfico de estadísticas ('unidades' o 'proyectos'), con ETag"""
+    return respuesta_dataset(request, dataset)
+
 @admin_required
 def lista_unidades(request):
     """Lista todas las unidades con buscador dinámico"""
     
     busqueda = request.GET.get('buscar', '')
     
-    unidades = Usuario.objects.filter(rol='UNIDAD').select_related('unidad')
+    unidades = Usuario.objects.unidades().select_related('unidad')
     
     if busqueda:
+        # Subcadena (como siempre) o comienzo de palabra sin acentos en el índice de texto completo
         unidades = unidades.filter(
             Q(unidad__nombre__icontains=busqueda) |
-            Q(email__icontains=busqueda)
+            Q(email__icontains=busqueda) |
+            Q(id__in=ids_coincidentes(busqueda, 'UNIDAD'))
         )
     
     unidades = unidades.annotate(
@@ -208,7 +120,7 @@ def lista_unidades(request):
     
     unidades_con_rendimiento = []
     for unidad in unidades:
-        poa_aprobado = Proyecto.objects.filter(unidad=unidad, estado='APROBADO').first()
+        poa_aprobado = Proyecto.objects.aprobados_de(unidad).first()
         if poa_aprobado:
             avances = AvanceMensual.objects.filter(actividad__meta__proyecto=poa_aprobado)
             cumplimiento_promedio = avances.aggregate(Avg('cumplimiento'))['cumplimiento__avg'] or 0
@@ -229,11 +141,9 @@ def lista_unidades(request):
 @admin_required
 def proyectos_unidad(request, unidad_id):
     """Lista todos los proyectos de una unidad específica"""
-    from poa.models import ObjetivoEstrategico
-    
     unidad = get_object_or_404(Usuario, id=unidad_id, rol='UNIDAD')
     proyectos = Proyecto.objects.filter(unidad=unidad).order_by('-anio', '-fecha_creacion')
-    objetivos_estrategicos = ObjetivoEstrategico.objects.filter(activa=True)
+    objetivos_estrategicos = objetivos_estrategicos_activos()
     
     contexto = {
         'titulo': f'Proyectos de {unidad.unidad.nombre}',
@@ -334,10 +244,7 @@ def detalle_proyecto_admin(request, proyecto_id):
         for actividad in meta.actividades.all():
             for avance in actividad.avances.all():
                 # Contar evidencias del mes específico
-                avance.evidencias_count = Evidencia.objects.filter(
-                    actividad=actividad,
-                    mes=avance.mes
-                ).count()
+                avance.evidencias_count = Evidencia.objects.del_mes(actividad, avance.mes).count()
     
     contexto = {
         'titulo': f'Detalle: {proyecto.nombre}',
@@ -357,21 +264,22 @@ def editar_proyecto_admin(request, proyecto_id):
     
     proyecto = get_object_or_404(Proyecto, id=proyecto_id)
     
-    # Obtener el paso actual de la sesión
-    paso_actual = request.session.get(f'paso_edicion_{proyecto_id}', 1)
+    # Obtener el paso actual del estado del wizard
+    clave_paso = f'paso_edicion_{proyecto_id}'
+    paso_actual = estado_wizard.obtener(request, clave_paso, 1)
     
     # Obtener metas y actividades
-    metas = proyecto.metas.prefetch_related('actividades__avances').all()
+    metas = proyecto.metas.prefetch_related('actividades').all()
     
     if request.method == 'POST':
         accion = request.POST.get('accion')
         
         if accion == 'siguiente':
             paso_actual = min(paso_actual + 1, 4)
-            request.session[f'paso_edicion_{proyecto_id}'] = paso_actual
+            estado_wizard.guardar(request, **{clave_paso: paso_actual})
         elif accion == 'anterior':
             paso_actual = max(paso_actual - 1, 1)
-            request.session[f'paso_edicion_{proyecto_id}'] = paso_actual
+            estado_wizard.guardar(request, **{clave_paso: paso_actual})
         elif accion == 'guardar_info':
             # Guardar información básica del proyecto
             formulario = FormularioProyecto(request.POST, instance=proyecto)
@@ -379,7 +287,7 @@ def editar_proyecto_admin(request, proyecto_id):
                 formulario.save()
                 messages.success(request, 'Información del proyecto actualizada.')
                 paso_actual = 2
-                request.session[f'paso_edicion_{proyecto_id}'] = paso_actual
+                estado_wizard.guardar(request, **{clave_paso: paso_actual})
         elif accion == 'agregar_meta':
             # Agregar nueva meta
             formulario_meta = FormularioMeta(request.POST)
@@ -421,9 +329,8 @@ def editar_proyecto_admin(request, proyecto_id):
             
             messages.success(request, 'Programación mensual actualizada.')
         elif accion == 'finalizar':
-            # Limpiar sesión y redirigir
-            if f'paso_edicion_{proyecto_id}' in request.session:
-                del request.session[f'paso_edicion_{proyecto_id}']
+            # Limpiar el estado del wizard y redirigir
+            estado_wizard.limpiar(request, clave_paso)
             
             AuditoriaLog.objects.create(
                 usuario=request.user,
@@ -441,25 +348,18 @@ def editar_proyecto_admin(request, proyecto_id):
     formulario_meta = FormularioMeta()
     formulario_actividad = FormularioActividad()
     
-    actividades = Actividad.objects.filter(meta__proyecto=proyecto).select_related('meta')
-    
-    programacion_mensual = {}
-    for actividad in actividades:
-        programacion_mensual[actividad.id] = {}
-        for avance in actividad.avances.all():
-            programacion_mensual[actividad.id][avance.mes] = avance.cantidad_programada_mes
+    # Actividades × 12 meses en una sola consulta (solo la usa el paso 4)
+    programacion = matriz_programacion(proyecto) if paso_actual == 4 else []
 
     contexto = {
         'titulo': f'Editar: {proyecto.nombre}',
         'proyecto': proyecto,
         'paso_actual': paso_actual,
         'metas': metas,
-        'actividades': actividades,
+        'programacion': programacion,
         'formulario_proyecto': formulario_proyecto,
         'formulario_meta': formulario_meta,
         'formulario_actividad': formulario_actividad,
-        'meses': range(1, 13),
-        'programacion_mensual': programacion_mensual,
     }
     
     return render(request, 'administrador/editar_proyecto.html', contexto)
@@ -467,39 +367,17 @@ def editar_proyecto_admin(request, proyecto_id):
 
 @admin_required
 def buscar_unidades_ajax(request):
-    """Búsqueda AJAX de unidades para el buscador dinámico"""
+    """Búsqueda AJAX de unidades para el buscador dinámico (responde desde el directorio en memoria)"""
     
     busqueda = request.GET.get('q', '')
     
-    unidades = Usuario.objects.filter(rol='UNIDAD').select_related('unidad')
-    
-    if busqueda:
-        unidades = unidades.filter(
-            Q(unidad__nombre__icontains=busqueda) |
-            Q(email__icontains=busqueda)
-        )
-    
-    unidades = unidades.annotate(
-        total_proyectos=Count('proyectos'),
-        count_proyectos_aprobados=Count('proyectos', filter=Q(proyectos__estado='APROBADO'))
-    )[:10]
-    
-    resultados = []
-    for unidad in unidades:
-        resultados.append({
-            'id': unidad.id,
-            'nombre': unidad.unidad.nombre,
-            'email': unidad.email,
-            'total_proyectos': unidad.total_proyectos,
-            'proyectos_aprobados': unidad.count_proyectos_aprobados,
-        })
-    
-    return JsonResponse({'unidades': resultados})
+    return JsonResponse({'unidades': directorio.buscar(busqueda)})
 
 
 @admin_required
 def exportar_proyecto_detalle_pdf(request, proyecto_id):
     """Exporta el detalle COMPLETO de un proyecto a PDF - Usa función compartida"""
+    from utils.exportacion import generar_pdf_proyecto_detalle
     proyecto = get_object_or_404(Proyecto, id=proyecto_id)
     
     response = generar_pdf_proyecto_detalle(proyecto, request.user)
@@ -520,6 +398,7 @@ def exportar_proyecto_detalle_pdf(request, proyecto_id):
 @admin_required
 def exportar_proyecto_detalle_excel(request, proyecto_id):
     """Exporta el detalle COMPLETO de un proyecto a Excel - Usa función compartida"""
+    from utils.exportacion import generar_excel_proyecto_detalle
     proyecto = get_object_or_404(Proyecto, id=proyecto_id)
     
     response = generar_excel_proyecto_detalle(proyecto, request.user)
@@ -537,10 +416,12 @@ def exportar_proyecto_detalle_excel(request, proyecto_id):
 
 
 @admin_required
+@limitar_exportaciones
 def exportar_unidades_pdf(request):
     """Exporta el reporte de todas las unidades con su cumplimiento a PDF - Usa función compartida"""
+    from utils.exportacion import generar_pdf_unidades
     
-    unidades = Usuario.objects.filter(rol='UNIDAD').select_related('unidad')
+    unidades = Usuario.objects.unidades().select_related('unidad')
     unidades = unidades.annotate(
         total_proyectos=Count('proyectos'),
         count_proyectos_aprobados=Count('proyectos', filter=Q(proyectos__estado='APROBADO'))
@@ -548,7 +429,7 @@ def exportar_unidades_pdf(request):
     
     unidades_con_rendimiento = []
     for unidad in unidades:
-        poa_aprobado = Proyecto.objects.filter(unidad=unidad, estado='APROBADO').first()
+        poa_aprobado = Proyecto.objects.aprobados_de(unidad).first()
         if poa_aprobado:
             avances = AvanceMensual.objects.filter(actividad__meta__proyecto=poa_aprobado)
             cumplimiento_promedio = avances.aggregate(Avg('cumplimiento'))['cumplimiento__avg'] or 0
@@ -582,10 +463,13 @@ def exportar_unidades_pdf(request):
 
 
 @admin_required
+@limitar_exportaciones
 def exportar_unidades_excel(request):
     """Exporta el reporte de todas las unidades con su cumplimiento a Excel - Usa función compartida"""
+    from utils.exportacion import generar_excel_unidades
+    from openpyxl.styles import PatternFill
     
-    unidades = Usuario.objects.filter(rol='UNIDAD').select_related('unidad')
+    unidades = Usuario.objects.unidades().select_related('unidad')
     unidades = unidades.annotate(
         total_proyectos=Count('proyectos'),
         count_proyectos_aprobados=Count('proyectos', filter=Q(proyectos__estado='APROBADO'))
@@ -593,7 +477,7 @@ def exportar_unidades_excel(request):
     
     unidades_con_rendimiento = []
     for unidad in unidades:
-        poa_aprobado = Proyecto.objects.filter(unidad=unidad, estado='APROBADO').first()
+        poa_aprobado = Proyecto.objects.aprobados_de(unidad).first()
         if poa_aprobado:
             avances = AvanceMensual.objects.filter(actividad__meta__proyecto=poa_aprobado)
             cumplimiento_promedio = avances.aggregate(Avg('cumplimiento'))['cumplimiento__avg'] or 0
@@ -632,12 +516,15 @@ def exportar_unidades_excel(request):
 
 
 @admin_required
+@limitar_exportaciones
 def exportar_reporte_trimestral_pdf(request):
     """Exporta el reporte trimestral (filtrado) a PDF"""
+    from utils.exportacion import generar_pdf_reporte_trimestral
     
     busqueda = request.GET.get('buscar', '')
     
-    unidades_trimestrales = _get_datos_trimestrales(busqueda)
+    trimestrales = cacheado('dashboard', 'trimestrales', datos_trimestrales, ttl=TTL_CONTEOS_DASHBOARD)
+    unidades_trimestrales = filtrar_por_nombre(trimestrales, busqueda)
     
     response = generar_pdf_reporte_trimestral(unidades_trimestrales, request.user, busqueda)
     
@@ -653,12 +540,15 @@ def exportar_reporte_trimestral_pdf(request):
     return response
 
 @admin_required
+@limitar_exportaciones
 def exportar_reporte_trimestral_excel(request):
     """Exporta el reporte trimestral (filtrado) a Excel"""
+    from utils.exportacion import generar_excel_reporte_trimestral
     
     busqueda = request.GET.get('buscar', '')
     
-    unidades_trimestrales = _get_datos_trimestrales(busqueda)
+    trimestrales = cacheado('dashboard', 'trimestrales', datos_trimestrales, ttl=TTL_CONTEOS_DASHBOARD)
+    unidades_trimestrales = filtrar_por_nombre(trimestrales, busqueda)
     
     response = generar_excel_reporte_trimestral(unidades_trimestrales, request.user, busqueda)
     
@@ -793,6 +683,7 @@ def eliminar_objetivo_estrategico(request, objetivo_id):
     })
 
 @admin_required
+@limitar_exportaciones
 def exportar_proyectos_unidad(request, unidad_id):
     """Exporta los proyectos de una unidad a Excel en formato POA"""
     from poa.models import ObjetivoEstrategico
@@ -87,6 +87,33 @@ DATABASES = {
 
 AUTH_USER_MODEL = 'login.Usuario'
 
+# Caché
+# Basada en archivos para que los workers de gunicorn compartan los datos
+# cacheados y sus invalidaciones. Guarda versiones por unidad, listas de acciones y
+# datasets: MAX_ENTRIES evita que se descarten al azar con el límite de 300 por
+# defecto, y el directorio se revisa cada CULL_INTERVAL escrituras (utils.cache).
+
+CACHES = {
+    'default': {
+        'BACKEND': 'utils.cache.CacheArchivos',
+        'LOCATION': env('CACHE_LOCATION', default=str(BASE_DIR / 'cache')),
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': env.int('CACHE_MAX_ENTRIES', default=20000),
+            'CULL_FREQUENCY': 4,
+            'CULL_INTERVAL': 100,
+        },
+    }
+}
+
+# Exportaciones consolidadas (PDF/Excel) simultáneas en todo el servidor: el resto de los
+# hilos de los workers queda libre para los usuarios que registran avances.
+# Los cupos entre workers se coordinan con archivos bloqueados en EXPORTACIONES_DIR.
+
+MAXIMO_EXPORTACIONES = env.int('MAXIMO_EXPORTACIONES', default=2)
+ESPERA_EXPORTACIONES = env.float('ESPERA_EXPORTACIONES', default=5)
+EXPORTACIONES_DIR = env('EXPORTACIONES_DIR', default=str(BASE_DIR / 'cache' / 'exportaciones'))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -14,6 +14,7 @@ urlpatterns = [
     path('poa/', include('poa.urls')),
     path('administrador/', include('administrador.urls')),
     path('auditor/', include('auditor.urls')),
+    path('api/v1/', include('poa.urls_api')),
     path('', redirigir_a_login),
 ]
 
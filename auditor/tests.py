@@ -1,3 +1,189 @@
-from django.test import TestCase
+import tempfile
+from contextlib import ExitStack
+from datetime import timedelta
+from io import BytesIO, StringIO
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from login.models import Unidad, Usuario
+from poa.models import AuditoriaLog, AuditoriaLogArchivo, AvanceMensual
+from poa.tests import DatosPOAMixin
+from utils import estadisticas
+from utils.concurrencia import cupo_exportacion
+from .views import LOGS_POR_PAGINA
+
+
+class VerLogsTestCase(TestCase):
+    """Tests para el visor de logs de auditoría"""
+
+    def setUp(self):
+        cache.clear()
+        unidad = Unidad.objects.create(nombre='Auditoría')
+        self.auditor = Usuario.objects.create_user(
+            email='auditor@ejemplo.com', password='clave123', unidad=unidad,
+            rol='AUDITOR', debe_cambiar_clave=False,
+        )
+        self.client.force_login(self.auditor)
+
+    def crear_logs(self, cantidad, accion='CREACION'):
+        for i in range(cantidad):
+            AuditoriaLog.objects.create(usuario=self.auditor, accion=accion, tabla='Proyecto', registro_id=i)
+
+    def test_paginacion_por_cursor(self):
+        """Las páginas se recorren con el cursor sin repetir ni perder registros"""
+        self.crear_logs(LOGS_POR_PAGINA + 5)
+        url = reverse('auditor:ver_logs')
+
+        respuesta = self.client.get(url)
+        primera = respuesta.context['logs']
+        cursor = respuesta.context['siguiente_cursor']
+        self.assertEqual(len(primera), LOGS_POR_PAGINA)
+        self.assertIsNotNone(cursor)
+
+        respuesta = self.client.get(url, {'antes': cursor})
+        segunda = respuesta.context['logs']
+        self.assertEqual(len(segunda), 5)
+        self.assertIsNone(respuesta.context['siguiente_cursor'])
+        ids = {log.id for log in primera} | {log.id for log in segunda}
+        self.assertEqual(len(ids), LOGS_POR_PAGINA + 5)
+
+    def test_acciones_cacheadas_se_invalidan(self):
+        """Una acción nueva aparece en el filtro aunque la lista esté cacheada"""
+        self.crear_logs(1, accion='CREACION')
+        self.assertEqual(AuditoriaLog.objects.acciones_distintas(), ['CREACION'])
+        self.crear_logs(1, accion='RECHAZO')
+        self.assertEqual(AuditoriaLog.objects.acciones_distintas(), ['CREACION', 'RECHAZO'])
+
+    def test_archivar_logs(self):
+        """El comando mueve los logs de años anteriores a la tabla de archivo"""
+        self.crear_logs(3)
+        antiguos = AuditoriaLog.objects.all()[:2]
+        hace_dos_anios = timezone.now() - timedelta(days=800)
+        AuditoriaLog.objects.filter(id__in=[log.id for log in antiguos]).update(fecha=hace_dos_anios)
+
+        call_command('archivar_logs', conservar=1, stdout=StringIO())
+
+        self.assertEqual(AuditoriaLog.objects.count(), 1)
+        self.assertEqual(AuditoriaLogArchivo.objects.count(), 2)
+        self.assertEqual(AuditoriaLogArchivo.objects.first().anio, timezone.localtime(hace_dos_anios).year)
+
+    def test_visor_y_exportacion_de_logs_archivados(self):
+        """Los logs archivados se consultan y exportan eligiendo su año"""
+        self.crear_logs(1, accion='CREACION')
+        AuditoriaLogArchivo.objects.create(
+            anio=2023, usuario=self.auditor, accion='RECHAZO', tabla='Proyecto', registro_id=7,
+            fecha=timezone.now() - timedelta(days=800),
+        )
+        url = reverse('auditor:ver_logs')
+
+        respuesta = self.client.get(url)
+        self.assertEqual([log.accion for log in respuesta.context['logs']], ['CREACION'])
+        self.assertEqual(list(respuesta.context['anios_archivados']), [2023])
+
+        respuesta = self.client.get(url, {'anio': 2023})
+        self.assertEqual([log.registro_id for log in respuesta.context['logs']], [7])
+        self.assertEqual(respuesta.context['acciones'], ['RECHAZO'])
+
+        with self.settings(EXPORTACIONES_DIR=tempfile.mkdtemp()):
+            respuesta = self.client.get(reverse('auditor:exportar_logs_excel'), {'anio': 2023})
+        hoja = load_workbook(BytesIO(respuesta.content)).active
+        self.assertEqual((hoja['A1'].value, hoja['C5'].value, hoja['C6'].value), ('Logs de Auditoría archivados 2023', 'RECHAZO', None))
+
+
+class EstadisticasTestCase(DatosPOAMixin, TestCase):
+    """Tests para el motor de estadísticas compartido"""
+
+    def setUp(self):
+        self.crear_datos()
+        AvanceMensual.objects.create(actividad=self.actividad, mes=1, cantidad_programada_mes=4, cantidad_realizada=3)
+        AvanceMensual.objects.create(actividad=self.actividad, mes=2, cantidad_programada_mes=0, cantidad_realizada=2)
+
+    def test_datos_proyectos_en_dos_consultas(self):
+        with self.assertNumQueries(2):
+            datos = estadisticas.datos_proyectos()
+        self.assertEqual(datos['estados'][0], 1)
+        # Sumas de cantidades, no cantidad de registros
+        self.assertEqual(datos['programado_mensual'][:3], [4, 0, 0])
+        self.assertEqual(datos['realizado_mensual'][:3], [3, 2, 0])
+        # El mes sin programación no aplica y no entra en el promedio
+        self.assertEqual(datos['cumplimiento_mensual'][:3], [75.0, 0.0, 0.0])
+
+    def test_trimestrales_del_poa_aprobado(self):
+        filas = estadisticas.filtrar_por_nombre(estadisticas.datos_trimestrales(), 'turismo')
+        fila = next(f for f in filas if f['nombre'] == 'Unidad de Turismo')
+        self.assertEqual(fila, {'nombre': 'Unidad de Turismo', 't1': 75.0, 't2': 0.0, 't3': 0.0, 't4': 0.0})
+
+
+class VerProyectosTestCase(DatosPOAMixin, TestCase):
+    """Tests para la lista de proyectos del auditor"""
+
+    def setUp(self):
+        self.crear_datos()
+        self.auditor = Usuario.objects.create_user(
+            email='auditor@ejemplo.com', password='clave123', unidad=self.unidad,
+            rol='AUDITOR', debe_cambiar_clave=False,
+        )
+        self.client.force_login(self.auditor)
+
+    def test_busqueda_por_subcadena_o_prefijo_sin_acentos(self):
+        url = reverse('auditor:ver_proyectos')
+        for consulta, esperado in [
+            ('nómico', [self.proyecto]), ('gastronomico', [self.proyecto]),
+            ('de Turismo', [self.proyecto]), ('Ruta del Café', []),
+        ]:
+            with self.subTest(consulta=consulta):
+                self.assertEqual(list(self.client.get(url, {'buscar': consulta}).context['proyectos']), esperado)
+
+
+@override_settings(EXPORTACIONES_DIR=tempfile.mkdtemp(), ESPERA_EXPORTACIONES=0)
+class ExportacionesPdfTestCase(DatosPOAMixin, TestCase):
+    """Tests para las exportaciones a PDF del auditor"""
+
+    def setUp(self):
+        self.crear_datos()
+        self.auditor = Usuario.objects.create_user(
+            email='auditor@ejemplo.com', password='clave123', unidad=self.unidad,
+            rol='AUDITOR', debe_cambiar_clave=False,
+        )
+        self.client.force_login(self.auditor)
+
+    def test_generan_pdf(self):
+        for nombre in ('estadisticas', 'proyectos', 'usuarios', 'logs'):
+            with self.subTest(exportacion=nombre):
+                respuesta = self.client.get(reverse(f'auditor:exportar_{nombre}_pdf'))
+                self.assertEqual(respuesta['Content-Type'], 'application/pdf')
+                self.assertTrue(respuesta.content.startswith(b'%PDF'))
+
+
+@override_settings(EXPORTACIONES_DIR=tempfile.mkdtemp(), ESPERA_EXPORTACIONES=0)
+class LimiteExportacionesTestCase(TestCase):
+    """Tests para el límite de exportaciones simultáneas"""
+
+    def setUp(self):
+        unidad = Unidad.objects.create(nombre='Auditoría')
+        self.auditor = Usuario.objects.create_user(
+            email='auditor@ejemplo.com', password='clave123', unidad=unidad,
+            rol='AUDITOR', debe_cambiar_clave=False,
+        )
+        self.client.force_login(self.auditor)
+        self.url = reverse('auditor:exportar_usuarios_excel')
+
+    def test_sin_cupo_responde_reintentar(self):
+        with ExitStack() as cupos:
+            for _ in range(settings.MAXIMO_EXPORTACIONES):
+                cupos.enter_context(cupo_exportacion())
+            respuesta = self.client.get(self.url)
+            self.assertEqual((respuesta.status_code, respuesta['Retry-After']), (503, '10'))
+
+            origen = 'http://testserver' + reverse('auditor:dashboard')
+            respuesta = self.client.get(self.url, HTTP_REFERER=origen)
+            self.assertRedirects(respuesta, origen, fetch_redirect_response=False)
+
+        respuesta = self.client.get(self.url)
+        self.assertEqual(respuesta.status_code, 200)
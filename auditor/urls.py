@@ -6,6 +6,7 @@ app_name = 'auditor'
 urlpatterns = [
     path('', views.dashboard_auditor, name='dashboard'),
     path('estadisticas/', views.estadisticas_auditor, name='estadisticas'),
+    path('estadisticas/datos/<str:dataset>/', views.datos_grafico, name='datos_grafico'),
     path('usuarios/', views.ver_usuarios, name='ver_usuarios'),
     path('logs/', views.ver_logs, name='ver_logs'),
     path('proyectos/', views.ver_proyectos, name='ver_proyectos'),
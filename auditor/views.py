@@ -3,72 +3,65 @@ from django.contrib.auth.decorators import login_required
 from django.db.models import Q, Count, Avg, Sum
 from django.utils import timezone
 from login.models import Usuario, Unidad
-from poa.models import Proyecto, MetaProyecto, Actividad, AvanceMensual, Evidencia, AuditoriaLog
+from poa.models import Proyecto, MetaProyecto, Actividad, AvanceMensual, Evidencia, AuditoriaLog, AuditoriaLogArchivo
+from poa.busqueda import ids_coincidentes
+from utils.cache import cacheado
+from utils.estadisticas import conteos_generales, datos_trimestrales, filtrar_por_nombre
+from utils.graficos import respuesta_dataset
+from utils.concurrencia import limitar_exportaciones
 from .decorators import auditor_required
-import json
 from decimal import Decimal
+from django.views.decorators.gzip import gzip_page
 from django.http import HttpResponse
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
-from openpyxl import Workbook
-
-
-from datetime import datetime
+from datetime import datetime, timezone as dt_timezone
+from django.db.models.functions import Coalesce
+from django.core.paginator import Paginator
+from types import SimpleNamespace
+from urllib.parse import urlencode
 
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib.enums import TA_CENTER
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+# reportlab, openpyxl y utils.exportacion se importan dentro de las vistas de exportación:
+# así no se cargan al iniciar cada worker, solo en la primera exportación
 
 
-# ---
-from django.db.models.functions import Coalesce
-# --- NUEVAS IMPORTACIONES AÑADIDAS ---
-from django.core.paginator import Paginator
-from openpyxl.cell.cell import Cell
-# ---
+def _reportlab():
+    """Clases y constantes de reportlab que usan las exportaciones a PDF"""
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.lib.enums import TA_CENTER
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+    return SimpleNamespace(
+        colors=colors, A4=A4, getSampleStyleSheet=getSampleStyleSheet, ParagraphStyle=ParagraphStyle,
+        inch=inch, TA_CENTER=TA_CENTER, SimpleDocTemplate=SimpleDocTemplate, Paragraph=Paragraph,
+        Spacer=Spacer, Table=Table, TableStyle=TableStyle,
+    )
 
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-from openpyxl.utils import get_column_letter
-from datetime import datetime
-from utils.exportacion import (
-    generar_pdf_proyecto_detalle,
-    generar_excel_proyecto_detalle,
-    generar_pdf_unidades,
-    generar_excel_unidades,
-    generar_pdf_reporte_trimestral, 
-    generar_excel_reporte_trimestral
-)
+TTL_CONTEOS_DASHBOARD = 15 * 60
+TTL_LISTAS_DASHBOARD = 5 * 60
+TTL_LOGS_DASHBOARD = 60
 
 
 @auditor_required
 def dashboard_auditor(request):
     """Dashboard principal del auditor con estadísticas generales"""
     
-    # Estadísticas generales (solo lectura)
-    total_unidades = Usuario.objects.filter(rol='UNIDAD').count()
-    total_proyectos = Proyecto.objects.count()
-    proyectos_pendientes = Proyecto.objects.filter(estado='ENVIADO').count()
-    proyectos_aprobados = Proyecto.objects.filter(estado='APROBADO').count()
+    # Estadísticas generales (solo lectura, cacheadas; las señales de poa invalidan los espacios)
+    conteos = cacheado('dashboard', 'conteos', conteos_generales, ttl=TTL_CONTEOS_DASHBOARD)
     
     # Proyectos recientes
-    proyectos_recientes = Proyecto.objects.select_related('unidad').order_by('-fecha_creacion')[:5]
+    proyectos_recientes = cacheado('dashboard', 'auditor:recientes', lambda: list(
+        Proyecto.objects.select_related('unidad__unidad').order_by('-fecha_creacion')[:5]
+    ), ttl=TTL_LISTAS_DASHBOARD)
     
-    # Logs recientes de auditoría
-    logs_recientes = AuditoriaLog.objects.select_related('usuario').order_by('-fecha')[:10]
+    # Logs recientes de auditoría (espacio propio: se registran logs constantemente)
+    logs_recientes = cacheado('auditoria', 'auditor:logs_recientes', lambda: list(
+        AuditoriaLog.objects.select_related('usuario').order_by('-fecha')[:10]
+    ), ttl=TTL_LOGS_DASHBOARD)
     
     contexto = {
         'titulo': 'Panel de Auditoría',
-        'total_unidades': total_unidades,
-        'total_proyectos': total_proyectos,
-        'proyectos_pendientes': proyectos_pendientes,
-        'proyectos_aprobados': proyectos_aprobados,
+        **conteos,
         'proyectos_recientes': proyectos_recientes,
         'logs_recientes': logs_recientes,
     }
@@ -76,51 +69,6 @@ def dashboard_auditor(request):
     return render(request, 'auditor/dashboard.html', contexto)
 
 
-def _get_datos_trimestrales(busqueda_str=""):
-    """
-    Función de ayuda para calcular y filtrar los datos trimestrales.
-    Usada por estadisticas_admin y las vistas de exportación.
-    """
-    unidades_con_datos = Usuario.objects.filter(rol='UNIDAD').select_related('unidad')
-    unidades_trimestrales_data = []
-
-    for unidad in unidades_con_datos:
-        nombre_unidad = unidad.unidad.nombre
-        
-        # Filtro de búsqueda
-        if busqueda_str and busqueda_str.lower() not in nombre_unidad.lower():
-            continue 
-        
-        poa_aprobado = Proyecto.objects.filter(unidad=unidad, estado='APROBADO').first()
-        
-        t1_avg, t2_avg, t3_avg, t4_avg = 0.0, 0.0, 0.0, 0.0
-        
-        if poa_aprobado:
-            avances = AvanceMensual.objects.filter(actividad__meta__proyecto=poa_aprobado)
-            
-            t1_data = avances.filter(mes__in=[1, 2, 3]).aggregate(avg=Avg('cumplimiento'))
-            t1_avg = float(t1_data['avg'] or 0.0)
-            
-            t2_data = avances.filter(mes__in=[4, 5, 6]).aggregate(avg=Avg('cumplimiento'))
-            t2_avg = float(t2_data['avg'] or 0.0)
-            
-            t3_data = avances.filter(mes__in=[7, 8, 9]).aggregate(avg=Avg('cumplimiento'))
-            t3_avg = float(t3_data['avg'] or 0.0)
-            
-            t4_data = avances.filter(mes__in=[10, 11, 12]).aggregate(avg=Avg('cumplimiento'))
-            t4_avg = float(t4_data['avg'] or 0.0)
-            
-        unidades_trimestrales_data.append({
-            'nombre': nombre_unidad,
-            't1': round(t1_avg, 2),
-            't2': round(t2_avg, 2),
-            't3': round(t3_avg, 2),
-            't4': round(t4_avg, 2),
-        })
-        
-    return unidades_trimestrales_data
-
-
 @auditor_required
 def estadisticas_auditor(request):
     """Página de estadísticas y gráficos (solo lectura)"""
@@ -129,84 +77,19 @@ def estadisticas_auditor(request):
     page_number = request.GET.get('page', 1)
     active_tab = request.GET.get('tab', 'general')
     
-    unidades_con_datos = Usuario.objects.filter(rol='UNIDAD').select_related('unidad')
-    
-    unidades_data = {
-        'nombres': [],
-        'cumplimiento': [],
-        'proyectos': [],
-        'metricas': []
-    }
-    
-    for unidad in unidades_con_datos:
-        unidades_data['nombres'].append(unidad.unidad.nombre)
-        
-        poa_aprobado = Proyecto.objects.filter(unidad=unidad, estado='APROBADO').first()
-        if poa_aprobado:
-            avances = AvanceMensual.objects.filter(actividad__meta__proyecto=poa_aprobado)
-            cumplimiento_promedio = avances.aggregate(Avg('cumplimiento'))['cumplimiento__avg']
-            
-            if cumplimiento_promedio is not None:
-                cumplimiento_promedio = float(cumplimiento_promedio)
-            else:
-                cumplimiento_promedio = 0.0
-            
-            unidades_data['cumplimiento'].append(round(cumplimiento_promedio, 2))
-            
-            total_evidencias = Evidencia.objects.filter(actividad__meta__proyecto=poa_aprobado).count()
-            total_actividades = Actividad.objects.filter(meta__proyecto=poa_aprobado).count()
-            unidades_data['metricas'].append([
-                round(cumplimiento_promedio, 2),
-                min(total_evidencias * 10, 100),
-                min(total_actividades * 5, 100),
-                85,
-                90
-            ])
-        else:
-            unidades_data['cumplimiento'].append(0.0)
-            unidades_data['metricas'].append([0, 0, 0, 0, 0])
-        
-        total_proyectos_unidad = Proyecto.objects.filter(unidad=unidad).count()
-        unidades_data['proyectos'].append(total_proyectos_unidad)
-    
-    proyectos_data = {
-        'estados': [
-            Proyecto.objects.filter(estado='APROBADO').count(),
-            Proyecto.objects.filter(estado='ENVIADO').count(),
-            Proyecto.objects.filter(estado='RECHAZADO').count(),
-            Proyecto.objects.filter(estado='BORRADOR').count()
-        ],
-        'programado_mensual': [],
-        'realizado_mensual': []
-    }
-    
-    for mes in range(1, 13):
-        programado = AvanceMensual.objects.filter(mes=mes).aggregate(
-            total=Count('cantidad_programada_mes')
-        )['total'] or 0
-        realizado = AvanceMensual.objects.filter(mes=mes).aggregate(
-            total=Count('cantidad_realizada')
-        )['total'] or 0
-        proyectos_data['programado_mensual'].append(programado)
-        proyectos_data['realizado_mensual'].append(realizado)
-    
-    unidades_trimestrales_filtradas = _get_datos_trimestrales(busqueda)
+    trimestrales = cacheado('dashboard', 'trimestrales', datos_trimestrales, ttl=TTL_CONTEOS_DASHBOARD)
+    unidades_trimestrales_filtradas = filtrar_por_nombre(trimestrales, busqueda)
     paginator = Paginator(unidades_trimestrales_filtradas, 6) 
     page_obj = paginator.get_page(page_number)
     
-    total_unidades = unidades_con_datos.count()
-    total_proyectos = Proyecto.objects.count()
-    proyectos_aprobados = Proyecto.objects.filter(estado='APROBADO').count()
-    proyectos_pendientes = Proyecto.objects.filter(estado='ENVIADO').count()
+    conteos = cacheado('dashboard', 'conteos', conteos_generales, ttl=TTL_CONTEOS_DASHBOARD)
     
     contexto = {
         'titulo': 'Estadísticas del Sistema',
-        'unidades_data': json.dumps(unidades_data),
-        'proyectos_data': json.dumps(proyectos_data),
-        'total_unidades': total_unidades,
-        'total_proyectos': total_proyectos,
-        'proyectos_aprobados': proyectos_aprobados,
-        'proyectos_pendientes': proyectos_pendientes,
+        'total_unidades': conteos['total_unidades'],
+        'total_proyectos': conteos['total_proyectos'],
+        'proyectos_aprobados': conteos['proyectos_aprobados'],
+        'proyectos_pendientes': conteos['proyectos_pendientes'],
         
         'unidades_trimestrales_page': page_obj,
         'busqueda': busqueda,
@@ -216,6 +99,13 @@ def estadisticas_auditor(request):
     return render(request, 'auditor/estadisticas.html', contexto)
 
 
+@auditor_required
+@gzip_page
+def datos_grafico(request, dataset):
+    """Dataset JSON de un gráfico de estadísticas ('unidades' o 'proyectos'), con ETag"""
+    return respuesta_dataset(request, dataset)
+
+
 @auditor_required
 def ver_usuarios(request):
     """Lista todos los usuarios del sistema (solo lectura)"""
@@ -242,14 +132,45 @@ def ver_usuarios(request):
     return render(request, 'auditor/ver_usuarios.html', contexto)
 
 
-@auditor_required
-def ver_logs(request):
-    
+LOGS_POR_PAGINA = 100
+FORMATO_CURSOR_LOG = '%Y%m%d%H%M%S%f'
+
+
+def _codificar_cursor_log(log):
+    """Codifica la posición (fecha, id) de un log para la paginación por cursor"""
+    fecha_utc = log.fecha.astimezone(dt_timezone.utc)
+    return f'{fecha_utc.strftime(FORMATO_CURSOR_LOG)}-{log.id}'
+
+
+def _decodificar_cursor_log(cursor):
+    """Retorna (fecha, id) a partir de un cursor, o None si no es válido"""
+    try:
+        fecha_str, log_id = cursor.split('-', 1)
+        fecha = datetime.strptime(fecha_str, FORMATO_CURSOR_LOG).replace(tzinfo=dt_timezone.utc)
+        return fecha, int(log_id)
+    except (ValueError, AttributeError):
+        return None
+
+
+def _logs_filtrados(request):
+    """
+    Logs según los filtros del visor (buscar, accion, anio), usados también por las
+    exportaciones. Sin año se consultan los logs vigentes; con un año, los archivados
+    por el comando archivar_logs. Retorna (logs, filtros).
+    """
     busqueda = request.GET.get('buscar', '')
     accion_filtro = request.GET.get('accion', '')
+    anio_filtro = request.GET.get('anio', '')
     
-    logs = AuditoriaLog.objects.select_related('usuario').all()
+    if anio_filtro.isdigit():
+        logs = AuditoriaLogArchivo.objects.filter(anio=int(anio_filtro))
+    else:
+        anio_filtro = ''
+        logs = AuditoriaLog.objects.all()
+    logs = logs.select_related('usuario')
     
+    # Búsqueda por subcadena: recorre los logs del período (los índices sirven al
+    # filtro exacto por acción y al orden por fecha, no a icontains)
     if busqueda:
         logs = logs.filter(
             Q(usuario__email__icontains=busqueda) |
@@ -260,16 +181,46 @@ def ver_logs(request):
     if accion_filtro:
         logs = logs.filter(accion=accion_filtro)
     
-    logs = logs.order_by('-fecha')[:100] 
-    
-    acciones = AuditoriaLog.objects.values_list('accion', flat=True).distinct()
+    return logs, {'busqueda': busqueda, 'accion_filtro': accion_filtro, 'anio_filtro': anio_filtro}
+
+
+@auditor_required
+def ver_logs(request):
+    """
+    Lista los logs de auditoría (vigentes o archivados de un año) paginados por cursor (fecha, id).
+    A diferencia de un OFFSET, el costo de cada página no crece con el tamaño de la tabla.
+    """
+    logs, filtros = _logs_filtrados(request)
+    cursor = _decodificar_cursor_log(request.GET.get('antes', ''))
+    
+    if cursor:
+        fecha_cursor, id_cursor = cursor
+        logs = logs.filter(Q(fecha__lt=fecha_cursor) | Q(fecha=fecha_cursor, id__lt=id_cursor))
+    
+    # Se pide un registro extra para saber si existe una página siguiente
+    logs = list(logs.order_by('-fecha', '-id')[:LOGS_POR_PAGINA + 1])
+    siguiente_cursor = None
+    if len(logs) > LOGS_POR_PAGINA:
+        logs = logs[:LOGS_POR_PAGINA]
+        siguiente_cursor = _codificar_cursor_log(logs[-1])
+    
+    if filtros['anio_filtro']:
+        acciones = sorted(
+            AuditoriaLogArchivo.objects.filter(anio=int(filtros['anio_filtro']))
+            .order_by().values_list('accion', flat=True).distinct()
+        )
+    else:
+        acciones = AuditoriaLog.objects.acciones_distintas()
     
     contexto = {
         'titulo': 'Logs de Auditoría',
         'logs': logs,
-        'busqueda': busqueda,
-        'accion_filtro': accion_filtro,
+        **filtros,
         'acciones': acciones,
+        'anios_archivados': AuditoriaLogArchivo.objects.order_by('-anio').values_list('anio', flat=True).distinct(),
+        'filtros_url': urlencode({'buscar': filtros['busqueda'], 'accion': filtros['accion_filtro'], 'anio': filtros['anio_filtro']}),
+        'es_primera_pagina': cursor is None,
+        'siguiente_cursor': siguiente_cursor,
     }
     
     return render(request, 'auditor/ver_logs.html', contexto)
@@ -285,9 +236,11 @@ def ver_proyectos(request):
     proyectos = Proyecto.objects.select_related('unidad').all()
     
     if busqueda:
+        # Subcadena (como siempre) o comienzo de palabra sin acentos en el índice de texto completo
         proyectos = proyectos.filter(
             Q(nombre__icontains=busqueda) |
-            Q(unidad__nombre__icontains=busqueda)
+            Q(unidad__unidad__nombre__icontains=busqueda) |
+            Q(id__in=ids_coincidentes(busqueda, 'PROYECTO'))
         )
     
     if estado_filtro:
@@ -323,10 +276,7 @@ def detalle_proyecto_auditor(request, proyecto_id):
     for meta in metas:
         for actividad in meta.actividades.all():
             for avance in actividad.avances.all():
-                avance.evidencias_count = Evidencia.objects.filter(
-                    actividad=actividad,
-                    mes=avance.mes
-                ).count()
+                avance.evidencias_count = Evidencia.objects.del_mes(actividad, avance.mes).count()
     
     contexto = {
         'titulo': f'Detalle: {proyecto.nombre}',
@@ -346,7 +296,7 @@ def ver_unidades(request):
     
     busqueda = request.GET.get('buscar', '')
     
-    unidades = Usuario.objects.filter(rol='UNIDAD').select_related('unidad')
+    unidades = Usuario.objects.unidades().select_related('unidad')
     
     if busqueda:
         unidades = unidades.filter(
@@ -361,7 +311,7 @@ def ver_unidades(request):
     
     unidades_con_rendimiento = []
     for unidad in unidades:
-        poa_aprobado = Proyecto.objects.filter(unidad=unidad, estado='APROBADO').first()
+        poa_aprobado = Proyecto.objects.aprobados_de(unidad).first()
         if poa_aprobado:
             avances = AvanceMensual.objects.filter(actividad__meta__proyecto=poa_aprobado)
             cumplimiento_promedio = avances.aggregate(Avg('cumplimiento'))['cumplimiento__avg'] or 0
@@ -380,28 +330,30 @@ def ver_unidades(request):
 
 
 @auditor_required
+@limitar_exportaciones
 def exportar_estadisticas_pdf(request):
     """Exporta las estadísticas del sistema a PDF"""
+    pdf = _reportlab()
     response = HttpResponse(content_type='application/pdf')
     response['Content-Disposition'] = f'attachment; filename="estadisticas_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf"'
     
-    doc = SimpleDocTemplate(response, pagesize=A4)
+    doc = pdf.SimpleDocTemplate(response, pagesize=pdf.A4)
     elementos = []
-    styles = getSampleStyleSheet()
+    styles = pdf.getSampleStyleSheet()
     
-    titulo_style = ParagraphStyle(
+    titulo_style = pdf.ParagraphStyle(
         'CustomTitle',
         parent=styles['Heading1'],
         fontSize=24,
-        textColor=colors.HexColor('#0c4a6e'),
+        textColor=pdf.colors.HexColor('#0c4a6e'),
         spaceAfter=30,
-        alignment=TA_CENTER
+        alignment=pdf.TA_CENTER
     )
-    elementos.append(Paragraph('Estadísticas del Sistema POA', titulo_style))
-    elementos.append(Paragraph(f'Generado: {datetime.now().strftime("%d/%m/%Y %H:%M")}', styles['Normal']))
-    elementos.append(Spacer(1, 0.5*inch))
+    elementos.append(pdf.Paragraph('Estadísticas del Sistema POA', titulo_style))
+    elementos.append(pdf.Paragraph(f'Generado: {datetime.now().strftime("%d/%m/%Y %H:%M")}', styles['Normal']))
+    elementos.append(pdf.Spacer(1, 0.5*pdf.inch))
     
-    unidades = Usuario.objects.filter(rol='UNIDAD').select_related('unidad')
+    unidades = Usuario.objects.unidades().select_related('unidad')
     
     data = [['Unidad', 'Proyectos', 'Aprobados', 'Cumplimiento %']]
     
@@ -409,7 +361,7 @@ def exportar_estadisticas_pdf(request):
         total_proyectos = Proyecto.objects.filter(unidad=unidad).count()
         proyectos_aprobados = Proyecto.objects.filter(unidad=unidad, estado='APROBADO').count()
         
-        poa_aprobado = Proyecto.objects.filter(unidad=unidad, estado='APROBADO').first()
+        poa_aprobado = Proyecto.objects.aprobados_de(unidad).first()
         if poa_aprobado:
             avances = AvanceMensual.objects.filter(actividad__meta__proyecto=poa_aprobado)
             cumplimiento = avances.aggregate(Avg('cumplimiento'))['cumplimiento__avg'] or 0
@@ -424,16 +376,16 @@ def exportar_estadisticas_pdf(request):
             f'{cumplimiento}%'
         ])
     
-    tabla = Table(data, colWidths=[3*inch, 1*inch, 1*inch, 1.5*inch])
-    tabla.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0c4a6e')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    tabla = pdf.Table(data, colWidths=[3*pdf.inch, 1*pdf.inch, 1*pdf.inch, 1.5*pdf.inch])
+    tabla.setStyle(pdf.TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), pdf.colors.HexColor('#0c4a6e')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), pdf.colors.whitesmoke),
         ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
         ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
         ('FONTSIZE', (0, 0), (-1, 0), 12),
         ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ('BACKGROUND', (0, 1), (-1, -1), pdf.colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, pdf.colors.black)
     ]))
     
     elementos.append(tabla)
@@ -443,8 +395,11 @@ def exportar_estadisticas_pdf(request):
 
 
 @auditor_required
+@limitar_exportaciones
 def exportar_estadisticas_excel(request):
     """Exporta las estadísticas del sistema a Excel"""
+    from openpyxl import Workbook
+    from openpyxl.styles import PatternFill, Font, Border, Side, Alignment
     wb = Workbook()
     ws = wb.active
     ws.title = "Estadísticas"
@@ -476,14 +431,14 @@ def exportar_estadisticas_excel(request):
         cell.alignment = Alignment(horizontal='center')
         cell.border = border
     
-    unidades = Usuario.objects.filter(rol='UNIDAD').select_related('unidad')
+    unidades = Usuario.objects.unidades().select_related('unidad')
     row = 5
     
     for unidad in unidades:
         total_proyectos = Proyecto.objects.filter(unidad=unidad).count()
         proyectos_aprobados = Proyecto.objects.filter(unidad=unidad, estado='APROBADO').count()
         
-        poa_aprobado = Proyecto.objects.filter(unidad=unidad, estado='APROBADO').first()
+        poa_aprobado = Proyecto.objects.aprobados_de(unidad).first()
         if poa_aprobado:
             avances = AvanceMensual.objects.filter(actividad__meta__proyecto=poa_aprobado)
             cumplimiento = avances.aggregate(Avg('cumplimiento'))['cumplimiento__avg'] or 0
@@ -515,6 +470,7 @@ def exportar_estadisticas_excel(request):
 @auditor_required
 def exportar_proyecto_detalle_pdf(request, proyecto_id):
     """Exporta el detalle COMPLETO de un proyecto a PDF - Usa función compartida"""
+    from utils.exportacion import generar_pdf_proyecto_detalle
     proyecto = get_object_or_404(Proyecto, id=proyecto_id)
     
     response = generar_pdf_proyecto_detalle(proyecto, request.user)
@@ -534,6 +490,7 @@ def exportar_proyecto_detalle_pdf(request, proyecto_id):
 @auditor_required
 def exportar_proyecto_detalle_excel(request, proyecto_id):
     """Exporta el detalle COMPLETO de un proyecto a Excel - Usa función compartida"""
+    from utils.exportacion import generar_excel_proyecto_detalle
     proyecto = get_object_or_404(Proyecto, id=proyecto_id)
     
     response = generar_excel_proyecto_detalle(proyecto, request.user)
@@ -551,10 +508,12 @@ def exportar_proyecto_detalle_excel(request, proyecto_id):
 
 
 @auditor_required
+@limitar_exportaciones
 def exportar_unidades_pdf(request):
     """Exporta el reporte de todas las unidades con su cumplimiento a PDF - Usa función compartida"""
+    from utils.exportacion import generar_pdf_unidades
     
-    unidades = Usuario.objects.filter(rol='UNIDAD').select_related('unidad')
+    unidades = Usuario.objects.unidades().select_related('unidad')
     unidades = unidades.annotate(
         total_proyectos=Count('proyectos'),
         count_proyectos_aprobados=Count('proyectos', filter=Q(proyectos__estado='APROBADO'))
@@ -562,7 +521,7 @@ def exportar_unidades_pdf(request):
     
     unidades_con_rendimiento = []
     for unidad in unidades:
-        poa_aprobado = Proyecto.objects.filter(unidad=unidad, estado='APROBADO').first()
+        poa_aprobado = Proyecto.objects.aprobados_de(unidad).first()
         if poa_aprobado:
             avances = AvanceMensual.objects.filter(actividad__meta__proyecto=poa_aprobado)
             cumplimiento_promedio = avances.aggregate(Avg('cumplimiento'))['cumplimiento__avg'] or 0
@@ -596,10 +555,13 @@ def exportar_unidades_pdf(request):
 
 
 @auditor_required
+@limitar_exportaciones
 def exportar_unidades_excel(request):
     """Exporta el reporte de todas las unidades con su cumplimiento a Excel - Usa función compartida"""
+    from utils.exportacion import generar_excel_unidades
+    from openpyxl.styles import PatternFill
     
-    unidades = Usuario.objects.filter(rol='UNIDAD').select_related('unidad')
+    unidades = Usuario.objects.unidades().select_related('unidad')
     unidades = unidades.annotate(
         total_proyectos=Count('proyectos'),
         count_proyectos_aprobados=Count('proyectos', filter=Q(proyectos__estado='APROBADO'))
@@ -607,7 +569,7 @@ def exportar_unidades_excel(request):
     
     unidades_con_rendimiento = []
     for unidad in unidades:
-        poa_aprobado = Proyecto.objects.filter(unidad=unidad, estado='APROBADO').first()
+        poa_aprobado = Proyecto.objects.aprobados_de(unidad).first()
         if poa_aprobado:
             avances = AvanceMensual.objects.filter(actividad__meta__proyecto=poa_aprobado)
             cumplimiento_promedio = avances.aggregate(Avg('cumplimiento'))['cumplimiento__avg'] or 0
@@ -645,42 +607,44 @@ def exportar_unidades_excel(request):
 
 
 @auditor_required
+@limitar_exportaciones
 def exportar_proyectos_pdf(request):
     """
     Exporta una lista detallada de proyectos a PDF, incluyendo
     estadísticas de metas, actividades y presupuesto.
     """
+    pdf = _reportlab()
     response = HttpResponse(content_type='application/pdf')
     response['Content-Disposition'] = f'attachment; filename="Reporte_Proyectos_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf"'
     
-    doc = SimpleDocTemplate(response, pagesize=A4, 
-                            topMargin=0.5*inch, bottomMargin=0.5*inch, 
-                            leftMargin=0.5*inch, rightMargin=0.5*inch)
+    doc = pdf.SimpleDocTemplate(response, pagesize=pdf.A4, 
+                            topMargin=0.5*pdf.inch, bottomMargin=0.5*pdf.inch, 
+                            leftMargin=0.5*pdf.inch, rightMargin=0.5*pdf.inch)
     elementos = []
-    styles = getSampleStyleSheet()
+    styles = pdf.getSampleStyleSheet()
     
-    titulo_style = ParagraphStyle(
+    titulo_style = pdf.ParagraphStyle(
         'CustomTitle',
         parent=styles['Heading1'],
         fontSize=20, 
-        textColor=colors.HexColor('#d97706'),
+        textColor=pdf.colors.HexColor('#d97706'),
         spaceAfter=20,
-        alignment=TA_CENTER,
+        alignment=pdf.TA_CENTER,
         fontName='Helvetica-Bold'
     )
     
-    cell_style = ParagraphStyle(
+    cell_style = pdf.ParagraphStyle(
         'BodyCell',
         parent=styles['Normal'],
         fontSize=8, 
         leading=10
     )
     
-    elementos.append(Paragraph('Reporte Detallado de Proyectos', titulo_style))
+    elementos.append(pdf.Paragraph('Reporte Detallado de Proyectos', titulo_style))
     
     fecha_gen_local = timezone.localtime(timezone.now()).strftime("%d/%m/%Y %H:%M")
-    elementos.append(Paragraph(f'Generado: {fecha_gen_local}', styles['Normal']))
-    elementos.append(Spacer(1, 0.3*inch))
+    elementos.append(pdf.Paragraph(f'Generado: {fecha_gen_local}', styles['Normal']))
+    elementos.append(pdf.Spacer(1, 0.3*pdf.inch))
     
     proyectos = Proyecto.objects.select_related(
         'unidad__unidad'
@@ -698,8 +662,8 @@ def exportar_proyectos_pdf(request):
     ]
     
     for proyecto in proyectos:
-        unidad_p = Paragraph(proyecto.unidad.unidad.nombre, cell_style)
-        proyecto_p = Paragraph(proyecto.nombre, cell_style)
+        unidad_p = pdf.Paragraph(proyecto.unidad.unidad.nombre, cell_style)
+        proyecto_p = pdf.Paragraph(proyecto.nombre, cell_style)
         
         fecha_creacion_local = timezone.localtime(proyecto.fecha_creacion)
         fecha_str = fecha_creacion_local.strftime('%d/%m/%Y')
@@ -719,20 +683,20 @@ def exportar_proyectos_pdf(request):
     
     # --- Definición de Columnas y Estilos de Tabla ---
     colWidths = [
-        1.3*inch,  # Unidad
-        1.8*inch,  # Proyecto
-        0.4*inch,  # Año
-        0.8*inch,  # Estado
-        0.5*inch,  # Metas
-        0.5*inch,  # Activ.
-        1.0*inch,  # Presupuesto
-        0.9*inch   # Fecha Creac.
+        1.3*pdf.inch,  # Unidad
+        1.8*pdf.inch,  # Proyecto
+        0.4*pdf.inch,  # Año
+        0.8*pdf.inch,  # Estado
+        0.5*pdf.inch,  # Metas
+        0.5*pdf.inch,  # Activ.
+        1.0*pdf.inch,  # Presupuesto
+        0.9*pdf.inch   # Fecha Creac.
     ]
     
-    tabla = Table(data, colWidths=colWidths)
-    tabla.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#d97706')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    tabla = pdf.Table(data, colWidths=colWidths)
+    tabla.setStyle(pdf.TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), pdf.colors.HexColor('#d97706')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), pdf.colors.whitesmoke),
         ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
         ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
         ('ALIGN', (0, 1), (1, -1), 'LEFT'), 
@@ -740,8 +704,8 @@ def exportar_proyectos_pdf(request):
         ('FONTSIZE', (0, 0), (-1, 0), 10),
         ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
         ('TOPPADDING', (0, 0), (-1, 0), 10),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#F7F7F7')), 
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#D0D0D0')),
+        ('BACKGROUND', (0, 1), (-1, -1), pdf.colors.HexColor('#F7F7F7')), 
+        ('GRID', (0, 0), (-1, -1), 1, pdf.colors.HexColor('#D0D0D0')),
         ('TOPPADDING', (0, 1), (-1, -1), 6),
         ('BOTTOMPADDING', (0, 1), (-1, -1), 6),
     ]))
@@ -753,11 +717,14 @@ def exportar_proyectos_pdf(request):
     return response
 
 @auditor_required
+@limitar_exportaciones
 def exportar_proyectos_excel(request):
     """
     Exporta una lista detallada de proyectos, incluyendo estadísticas
     de metas, actividades y presupuesto.
     """
+    from openpyxl import Workbook
+    from openpyxl.styles import PatternFill, Font, Border, Side, Alignment
     wb = Workbook()
     ws = wb.active
     ws.title = "Proyectos"
@@ -862,26 +829,28 @@ def exportar_proyectos_excel(request):
 
 
 @auditor_required
+@limitar_exportaciones
 def exportar_usuarios_pdf(request):
     """Exporta la lista de usuarios a PDF"""
+    pdf = _reportlab()
     response = HttpResponse(content_type='application/pdf')
     response['Content-Disposition'] = f'attachment; filename="usuarios_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf"'
     
-    doc = SimpleDocTemplate(response, pagesize=A4)
+    doc = pdf.SimpleDocTemplate(response, pagesize=pdf.A4)
     elementos = []
-    styles = getSampleStyleSheet()
+    styles = pdf.getSampleStyleSheet()
     
-    titulo_style = ParagraphStyle(
+    titulo_style = pdf.ParagraphStyle(
         'CustomTitle',
         parent=styles['Heading1'],
         fontSize=24,
-        textColor=colors.HexColor('#d97706'),
+        textColor=pdf.colors.HexColor('#d97706'),
         spaceAfter=30,
-        alignment=TA_CENTER
+        alignment=pdf.TA_CENTER
     )
-    elementos.append(Paragraph('Usuarios del Sistema', titulo_style))
-    elementos.append(Paragraph(f'Generado: {datetime.now().strftime("%d/%m/%Y %H:%M")}', styles['Normal']))
-    elementos.append(Spacer(1, 0.5*inch))
+    elementos.append(pdf.Paragraph('Usuarios del Sistema', titulo_style))
+    elementos.append(pdf.Paragraph(f'Generado: {datetime.now().strftime("%d/%m/%Y %H:%M")}', styles['Normal']))
+    elementos.append(pdf.Spacer(1, 0.5*pdf.inch))
     
     usuarios = Usuario.objects.select_related('unidad').all()
     
@@ -896,16 +865,16 @@ def exportar_usuarios_pdf(request):
             'Sí' if usuario.is_active else 'No'
         ])
     
-    tabla = Table(data, colWidths=[2.5*inch, 1.5*inch, 2*inch, 1*inch])
-    tabla.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#d97706')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    tabla = pdf.Table(data, colWidths=[2.5*pdf.inch, 1.5*pdf.inch, 2*pdf.inch, 1*pdf.inch])
+    tabla.setStyle(pdf.TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), pdf.colors.HexColor('#d97706')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), pdf.colors.whitesmoke),
         ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
         ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
         ('FONTSIZE', (0, 0), (-1, 0), 12),
         ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ('BACKGROUND', (0, 1), (-1, -1), pdf.colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, pdf.colors.black)
     ]))
     
     elementos.append(tabla)
@@ -915,8 +884,11 @@ def exportar_usuarios_pdf(request):
 
 
 @auditor_required
+@limitar_exportaciones
 def exportar_usuarios_excel(request):
     """Exporta la lista de usuarios a Excel"""
+    from openpyxl import Workbook
+    from openpyxl.styles import PatternFill, Font, Border, Side, Alignment
     wb = Workbook()
     ws = wb.active
     ws.title = "Usuarios"
@@ -975,28 +947,32 @@ def exportar_usuarios_excel(request):
 
 
 @auditor_required
+@limitar_exportaciones
 def exportar_logs_pdf(request):
     """Exporta los logs de auditoría a PDF"""
+    pdf = _reportlab()
     response = HttpResponse(content_type='application/pdf')
     response['Content-Disposition'] = f'attachment; filename="logs_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf"'
     
-    doc = SimpleDocTemplate(response, pagesize=A4)
+    doc = pdf.SimpleDocTemplate(response, pagesize=pdf.A4)
     elementos = []
-    styles = getSampleStyleSheet()
+    styles = pdf.getSampleStyleSheet()
     
-    titulo_style = ParagraphStyle(
+    titulo_style = pdf.ParagraphStyle(
         'CustomTitle',
         parent=styles['Heading1'],
         fontSize=24,
-        textColor=colors.HexColor('#d97706'),
+        textColor=pdf.colors.HexColor('#d97706'),
         spaceAfter=30,
-        alignment=TA_CENTER
+        alignment=pdf.TA_CENTER
     )
-    elementos.append(Paragraph('Logs de Auditoría', titulo_style))
-    elementos.append(Paragraph(f'Generado: {datetime.now().strftime("%d/%m/%Y %H:%M")}', styles['Normal']))
-    elementos.append(Spacer(1, 0.5*inch))
+    logs, filtros = _logs_filtrados(request)
+    titulo = f"Logs de Auditoría archivados {filtros['anio_filtro']}" if filtros['anio_filtro'] else 'Logs de Auditoría'
+    elementos.append(pdf.Paragraph(titulo, titulo_style))
+    elementos.append(pdf.Paragraph(f'Generado: {datetime.now().strftime("%d/%m/%Y %H:%M")}', styles['Normal']))
+    elementos.append(pdf.Spacer(1, 0.5*pdf.inch))
     
-    logs = AuditoriaLog.objects.select_related('usuario').order_by('-fecha')[:100]
+    logs = logs.order_by('-fecha', '-id')[:100]
     
     data = [['Fecha', 'Usuario', 'Acción', 'Tabla']]
     
@@ -1009,16 +985,16 @@ def exportar_logs_pdf(request):
             log.tabla[:20]
         ])
     
-    tabla = Table(data, colWidths=[1.5*inch, 2*inch, 1.5*inch, 2*inch])
-    tabla.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#d97706')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    tabla = pdf.Table(data, colWidths=[1.5*pdf.inch, 2*pdf.inch, 1.5*pdf.inch, 2*pdf.inch])
+    tabla.setStyle(pdf.TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), pdf.colors.HexColor('#d97706')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), pdf.colors.whitesmoke),
         ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
         ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
         ('FONTSIZE', (0, 0), (-1, 0), 10),
         ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('BACKGROUND', (0, 1), (-1, -1), pdf.colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, pdf.colors.black),
         ('FONTSIZE', (0, 1), (-1, -1), 8),
     ]))
     
@@ -1029,8 +1005,11 @@ def exportar_logs_pdf(request):
 
 
 @auditor_required
+@limitar_exportaciones
 def exportar_logs_excel(request):
     """Exporta los logs de auditoría a Excel"""
+    from openpyxl import Workbook
+    from openpyxl.styles import PatternFill, Font, Border, Side, Alignment
     wb = Workbook()
     ws = wb.active
     ws.title = "Logs"
@@ -1044,8 +1023,9 @@ def exportar_logs_excel(request):
         bottom=Side(style='thin')
     )
     
+    logs, filtros = _logs_filtrados(request)
     ws.merge_cells('A1:E1')
-    ws['A1'] = 'Logs de Auditoría'
+    ws['A1'] = f"Logs de Auditoría archivados {filtros['anio_filtro']}" if filtros['anio_filtro'] else 'Logs de Auditoría'
     ws['A1'].font = Font(bold=True, size=16, color="d97706")
     ws['A1'].alignment = Alignment(horizontal='center')
     
@@ -1062,7 +1042,7 @@ def exportar_logs_excel(request):
         cell.alignment = Alignment(horizontal='center')
         cell.border = border
     
-    logs = AuditoriaLog.objects.select_related('usuario').order_by('-fecha')[:500]
+    logs = logs.order_by('-fecha', '-id')[:500]
     row = 5
     
     for log in logs:
@@ -1091,12 +1071,15 @@ def exportar_logs_excel(request):
 
 
 @auditor_required
+@limitar_exportaciones
 def exportar_reporte_trimestral_pdf(request):
     """Exporta el reporte trimestral (filtrado) a PDF para Auditor"""
+    from utils.exportacion import generar_pdf_reporte_trimestral
     
     busqueda = request.GET.get('buscar', '')
     
-    unidades_trimestrales = _get_datos_trimestrales(busqueda)
+    trimestrales = cacheado('dashboard', 'trimestrales', datos_trimestrales, ttl=TTL_CONTEOS_DASHBOARD)
+    unidades_trimestrales = filtrar_por_nombre(trimestrales, busqueda)
     
     response = generar_pdf_reporte_trimestral(unidades_trimestrales, request.user, busqueda)
     
@@ -1112,12 +1095,15 @@ def exportar_reporte_trimestral_pdf(request):
     return response
 
 @auditor_required
+@limitar_exportaciones
 def exportar_reporte_trimestral_excel(request):
     """Exporta el reporte trimestral (filtrado) a Excel para Auditor"""
+    from utils.exportacion import generar_excel_reporte_trimestral
     
     busqueda = request.GET.get('buscar', '')
     
-    unidades_trimestrales = _get_datos_trimestrales(busqueda)
+    trimestrales = cacheado('dashboard', 'trimestrales', datos_trimestrales, ttl=TTL_CONTEOS_DASHBOARD)
+    unidades_trimestrales = filtrar_por_nombre(trimestrales, busqueda)
     
     response = generar_excel_reporte_trimestral(unidades_trimestrales, request.user, busqueda)
     
@@ -0,0 +1,125 @@
+"""
+Micro-benchmark del cálculo de cumplimiento.
+
+Compara, sobre N avances (100.000 por defecto):
+1. El cálculo por fila con Decimal (AvanceMensual.calcular_cumplimiento anterior)
+   contra la aritmética entera de utils.cumplimiento.porcentaje_cumplimiento.
+2. La acumulación de totales fila por fila en Python (ver_reportes/dashboard_unidad
+   anteriores) contra una sola agregación SQL con Least(realizado, programado).
+
+Usa una base de datos de prueba temporal; no modifica db.sqlite3.
+
+Uso:
+    SECRET_KEY=x python benchmarks/cumplimiento.py [--avances 100000]
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'alcaldiaPOA.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+
+from login.models import Unidad, Usuario  # noqa: E402
+from poa.models import Proyecto, MetaProyecto, Actividad, AvanceMensual  # noqa: E402
+from utils.cumplimiento import porcentaje_cumplimiento, totales_cumplimiento  # noqa: E402
+
+
+def cumplimiento_decimal(realizado, programado):
+    """Implementación anterior de AvanceMensual.calcular_cumplimiento"""
+    try:
+        if programado > 0:
+            cantidad_para_calculo = min(realizado, programado)
+            porcentaje = (Decimal(cantidad_para_calculo) / Decimal(programado)) * 100
+            return min(round(porcentaje, 2), Decimal('100.00'))
+        return None
+    except (InvalidOperation, Exception):
+        return None
+
+
+def cumplimiento_entero(realizado, programado):
+    if programado > 0:
+        return porcentaje_cumplimiento(min(realizado, programado), programado)
+    return None
+
+
+def totales_python(avances):
+    """Implementación anterior de ver_reportes: dos recorridos con Decimal"""
+    total_programado = Decimal(0)
+    for avance in avances.all():
+        total_programado += Decimal(avance.cantidad_programada_mes or 0)
+    total_realizado = Decimal(0)
+    for avance in avances.all():
+        total_realizado += min(Decimal(avance.cantidad_realizada or 0), Decimal(avance.cantidad_programada_mes or 0))
+    return total_programado, total_realizado
+
+
+def medir(funcion, *args):
+    inicio = time.perf_counter()
+    resultado = funcion(*args)
+    return time.perf_counter() - inicio, resultado
+
+
+def poblar(cantidad, pares):
+    unidad = Unidad.objects.create(nombre='Benchmark')
+    usuario = Usuario.objects.create_user(email='benchmark@ejemplo.com', password='x', unidad=unidad, rol='UNIDAD')
+    proyecto = Proyecto.objects.create(unidad=usuario, nombre='Benchmark', anio=2025, estado='APROBADO')
+    meta = MetaProyecto.objects.create(proyecto=proyecto, descripcion='Benchmark')
+    actividades = Actividad.objects.bulk_create(
+        Actividad(meta=meta, descripcion=f'Actividad {i}', unidad_medida='u', medio_verificacion='-')
+        for i in range((cantidad + 11) // 12)
+    )
+    avances = [
+        AvanceMensual(
+            actividad=actividades[i // 12], mes=i % 12 + 1, anio=2025,
+            cantidad_programada_mes=programado, cantidad_realizada=realizado,
+            cumplimiento=cumplimiento_entero(realizado, programado),
+        )
+        for i, (realizado, programado) in enumerate(pares)
+    ]
+    AvanceMensual.objects.bulk_create(avances, batch_size=2000)
+    return proyecto
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--avances', type=int, default=100_000)
+    cantidad = parser.parse_args().avances
+
+    aleatorio = random.Random(2025)
+    pares = [(aleatorio.randint(0, 60), aleatorio.randint(0, 50)) for _ in range(cantidad)]
+
+    print(f'Cálculo por fila ({cantidad} avances)')
+    t_decimal, r_decimal = medir(lambda: [cumplimiento_decimal(r, p) for r, p in pares])
+    t_entero, r_entero = medir(lambda: [cumplimiento_entero(r, p) for r, p in pares])
+    assert r_decimal == r_entero, 'Los resultados difieren'
+    print(f'  Decimal: {t_decimal:.3f} s   entero: {t_entero:.3f} s   ({t_decimal / t_entero:.1f}x)')
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        nombre_original = connection.creation.create_test_db(verbosity=0)
+    try:
+        proyecto = poblar(cantidad, pares)
+        consulta = AvanceMensual.objects.filter(actividad__meta__proyecto=proyecto)
+
+        print(f'Totales de un proyecto ({cantidad} avances)')
+        t_python, (programado, realizado) = medir(totales_python, consulta)
+        t_sql, totales = medir(totales_cumplimiento, consulta)
+        assert (programado, realizado) == (totales['programado'], totales['realizado']), 'Los totales difieren'
+        print(f'  Python: {t_python:.3f} s   SQL: {t_sql:.3f} s   ({t_python / t_sql:.1f}x)')
+    finally:
+        connection.creation.destroy_test_db(nombre_original, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Perfil del tiempo de importación y la memoria al iniciar un worker.
+
+Cada medición corre en un proceso nuevo (como un worker de gunicorn recién creado):
+1. Arranque: django.setup() y la carga del URLconf, que importa todas las vistas.
+2. Primera exportación: lo que agrega cargar el subsistema de exportación
+   (utils.exportacion y administrador.excel_export, con reportlab y openpyxl).
+
+Muestra la mediana de tiempo y memoria residente máxima, si reportlab/openpyxl quedaron
+cargados al arrancar y los módulos más lentos según python -X importtime.
+
+Uso:
+    SECRET_KEY=x python benchmarks/importacion.py [--repeticiones 5] [--top 10]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+MEDICION = '''
+import json, os, resource, sys, time
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'alcaldiaPOA.settings')
+inicio = time.perf_counter()
+import django
+django.setup()
+import alcaldiaPOA.urls
+arranque = time.perf_counter() - inicio
+rss_arranque = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+cargadas = [m for m in ('reportlab', 'openpyxl', 'utils.exportacion') if m in sys.modules]
+inicio = time.perf_counter()
+import utils.exportacion, administrador.excel_export
+exportacion = time.perf_counter() - inicio
+rss_exportacion = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({
+    'arranque': arranque, 'rss_arranque': rss_arranque, 'cargadas': cargadas,
+    'exportacion': exportacion, 'rss_exportacion': rss_exportacion,
+}))
+'''
+
+ARRANQUE = '''
+import os
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'alcaldiaPOA.settings')
+import django
+django.setup()
+import alcaldiaPOA.urls
+'''
+
+
+def _ejecutar(codigo, *opciones):
+    return subprocess.run(
+        [sys.executable, *opciones, '-c', codigo], cwd=RAIZ, env=os.environ.copy(),
+        capture_output=True, text=True, check=True,
+    )
+
+
+def medir(repeticiones):
+    muestras = [json.loads(_ejecutar(MEDICION).stdout) for _ in range(repeticiones)]
+    mediana = {
+        clave: statistics.median(m[clave] for m in muestras)
+        for clave in ('arranque', 'rss_arranque', 'exportacion', 'rss_exportacion')
+    }
+    mediana['cargadas'] = muestras[0]['cargadas']
+    return mediana
+
+
+def perfil_importacion(top):
+    """Módulos con mayor tiempo acumulado al arrancar (microsegundos)"""
+    filas = []
+    for linea in _ejecutar(ARRANQUE, '-X', 'importtime').stderr.splitlines():
+        if not linea.startswith('import time:') or 'cumulative' in linea:
+            continue
+        _, acumulado, modulo = linea[len('import time:'):].split('|')
+        filas.append((int(acumulado), modulo.strip()))
+    return sorted(filas, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    m = medir(args.repeticiones)
+    print(f'Arranque del worker:   {m["arranque"] * 1000:8.1f} ms   RSS máx. {m["rss_arranque"] / 1024:7.1f} MB')
+    print(f'Primera exportación:  +{m["exportacion"] * 1000:8.1f} ms   RSS máx. {m["rss_exportacion"] / 1024:7.1f} MB')
+    print(f'Cargados al arrancar:  {", ".join(m["cargadas"]) or "ni reportlab ni openpyxl"}')
+    print('\nMódulos más lentos al arrancar (-X importtime, acumulado):')
+    for acumulado, modulo in perfil_importacion(args.top):
+        print(f'  {acumulado / 1000:8.1f} ms  {modulo}')
+
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,9 @@ set -e
 echo "--> Aplicando migraciones de base de datos..."
 python manage.py migrate
 
+echo "--> Eliminando sesiones expiradas..."
+python manage.py clearsessions
+
 echo "--> Iniciando servidor..."
 # Esto ejecuta el comando que tengas en CMD en el Dockerfile (gunicorn)
 exec "$@"
\ No newline at end of file
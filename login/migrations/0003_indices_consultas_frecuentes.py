@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('login', '0002_crear_unidades_usuarios_iniciales'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(fields=['rol'], name='login_usuario_rol_idx'),
+        ),
+    ]
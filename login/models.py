@@ -45,6 +45,10 @@ class UsuarioManager(BaseUserManager):
         
         return self.create_user(email, password, **extra_fields)
 
+    def unidades(self):
+        """Usuarios de rol UNIDAD (uno por unidad organizativa)"""
+        return self.filter(rol='UNIDAD')
+
 
 class Usuario(AbstractBaseUser, PermissionsMixin):
     """Modelo personalizado de usuario basado en el esquema proporcionado"""
@@ -72,6 +76,9 @@ class Usuario(AbstractBaseUser, PermissionsMixin):
         verbose_name = 'Usuario'
         verbose_name_plural = 'Usuarios'
         ordering = ['-date_joined']
+        indexes = [
+            models.Index(fields=['rol'], name='login_usuario_rol_idx'),
+        ]
     
     def __str__(self):
         return self.email
@@ -1,5 +1,11 @@
+from decimal import Decimal
+
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from poa.models import AvanceMensual
+from poa.tests import DatosPOAMixin
 from .models import Unidad
 
 Usuario = get_user_model()
@@ -41,3 +47,33 @@ class ModelosTestCase(TestCase):
     def test_unidad_str(self):
         """Test para el método __str__ de Unidad"""
         self.assertEqual(str(self.unidad), 'Unidad de Prueba')
+
+
+class DashboardUnidadTestCase(DatosPOAMixin, TestCase):
+    """Tests para el resumen cacheado del dashboard de una unidad"""
+
+    def setUp(self):
+        self.crear_datos()
+        self.avance = AvanceMensual.objects.create(
+            actividad=self.actividad, mes=1, cantidad_programada_mes=4, cantidad_realizada=1
+        )
+        self.client.force_login(self.usuario)
+
+    def test_resumen_cacheado_e_invalidado_por_avances(self):
+        url = reverse('login:dashboard_unidad')
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.context['proyectos_aprobados'], 1)
+        self.assertEqual(respuesta.context['cumplimiento_global'], Decimal('25.0'))
+        # Los proyectos recientes se cachean como dicts, no como instancias del modelo
+        reciente = respuesta.context['proyectos_recientes'][0]
+        self.assertEqual((reciente['id'], reciente['estado']), (self.proyecto.id, 'APROBADO'))
+        self.assertContains(respuesta, reverse('poa:gestionar_avances', args=[self.proyecto.id]))
+
+        # Con la caché caliente solo quedan la sesión, el usuario y su unidad
+        with self.assertNumQueries(3):
+            self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.avance.cantidad_realizada = 3
+            self.avance.save()
+        self.assertEqual(self.client.get(url).context['cumplimiento_global'], Decimal('75.0'))
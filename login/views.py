@@ -1,13 +1,15 @@
-from decimal import Decimal
 from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.urls import reverse
 
-from poa.models import AvanceMensual, Proyecto
+from utils.cache import cacheado
+from utils.estadisticas import espacio_unidad, resumen_unidad
 from .forms import FormularioLogin, FormularioCambiarClave
 
+TTL_DASHBOARD_UNIDAD = 30 * 60
+
 
 def vista_login(request):
     """Vista para el inicio de sesión"""
@@ -88,51 +90,16 @@ def dashboard_unidad(request):
     if request.user.rol != 'UNIDAD':
         return redirect('login:login')
     
-    # Obtener todos los proyectos de la unidad
-    proyectos = Proyecto.objects.filter(unidad__unidad=request.user.unidad).order_by('-anio', '-fecha_modificacion')
-    
-    # Estadísticas
-    total_proyectos = proyectos.count()
-    proyectos_aprobados = proyectos.filter(estado='APROBADO').count()
-    proyectos_revision = proyectos.filter(estado='ENVIADO').count()
-    proyectos_borrador = proyectos.filter(estado__in=['BORRADOR', 'RECHAZADO']).count()
-    
-    # Cálculo de cumplimiento global (solo de proyectos aprobados)
-    cumplimiento_global = Decimal(0)
-    proyectos_aprobados_qs = proyectos.filter(estado='APROBADO')
-    
-    total_programado_global = 0
-    total_realizado_global = 0
-    
-    if proyectos_aprobados_qs.exists():
-        # Obtener todos los avances de los proyectos aprobados
-        avances = AvanceMensual.objects.filter(actividad__meta__proyecto__in=proyectos_aprobados_qs)
-        
-        for avance in avances:
-            prog = avance.cantidad_programada_mes or 0
-            real = avance.cantidad_realizada or 0
-            # Solo sumamos lo realizado hasta el tope de lo programado para el % de cumplimiento
-            # (aunque el dato real se guarde completo)
-            total_programado_global += prog
-            total_realizado_global += min(real, prog)
-            
-        if total_programado_global > 0:
-            cumplimiento_global = (Decimal(total_realizado_global) / Decimal(total_programado_global)) * 100
-            cumplimiento_global = round(cumplimiento_global, 1)
-
-    # Proyectos recientes (para la lista rápida)
-    proyectos_recientes = proyectos[:5]
+    # Resumen cacheado por unidad: las señales de poa invalidan el espacio de la unidad
+    # cuando cambian sus proyectos o avances
+    unidad = request.user.unidad
+    resumen = cacheado(espacio_unidad(unidad.id), 'dashboard', lambda: resumen_unidad(unidad), ttl=TTL_DASHBOARD_UNIDAD)
     
     context = {
-        'unidad': request.user.unidad,
+        'unidad': unidad,
         'titulo': 'Panel de Control',
-        'total_proyectos': total_proyectos,
-        'proyectos_aprobados': proyectos_aprobados,
-        'proyectos_revision': proyectos_revision,
-        'proyectos_borrador': proyectos_borrador,
-        'cumplimiento_global': cumplimiento_global,
-        'proyectos_recientes': proyectos_recientes,
-        'tiene_proyectos': total_proyectos > 0
+        **resumen,
+        'tiene_proyectos': resumen['total_proyectos'] > 0
     }
     
     return render(request, 'poa/dashboard_unidad.html', context)
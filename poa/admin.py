@@ -1,5 +1,6 @@
-from django.contrib import admin
-from .models import Proyecto, MetaProyecto, Actividad, AvanceMensual, Evidencia, AuditoriaLog
+from django.contrib import admin, messages
+from .renovacion import clonar_proyectos
+from .models import Proyecto, MetaProyecto, Actividad, AvanceMensual, Evidencia, AuditoriaLog, AuditoriaLogArchivo, RegistroCambio
 
 
 @admin.register(Proyecto)
@@ -8,6 +9,19 @@ class ProyectoAdmin(admin.ModelAdmin):
     list_filter = ['anio', 'unidad']
     search_fields = ['nombre', 'objetivo_unidad']
     readonly_fields = ['fecha_creacion']
+    actions = ['clonar_al_anio_siguiente']
+    
+    @admin.action(description='Copiar los proyectos aprobados seleccionados al año siguiente')
+    def clonar_al_anio_siguiente(self, request, queryset):
+        resumen = clonar_proyectos(queryset)
+        for proyecto, motivo in resumen['omitidos']:
+            self.message_user(request, f'Omitido "{proyecto}": {motivo}.', messages.WARNING)
+        self.message_user(
+            request,
+            f"{len(resumen['proyectos'])} proyectos copiados como borradores: {resumen['metas']} metas, "
+            f"{resumen['actividades']} actividades y {resumen['avances']} avances mensuales.",
+            messages.SUCCESS,
+        )
 
 
 @admin.register(MetaProyecto)
@@ -51,3 +65,18 @@ class AuditoriaLogAdmin(admin.ModelAdmin):
     list_filter = ['accion', 'tabla', 'fecha']
     readonly_fields = ['usuario', 'accion', 'tabla', 'registro_id', 'datos_anteriores', 'datos_nuevos', 'fecha', 'ip']
     search_fields = ['usuario__email', 'tabla', 'accion']
+
+
+@admin.register(AuditoriaLogArchivo)
+class AuditoriaLogArchivoAdmin(admin.ModelAdmin):
+    list_display = ['usuario', 'accion', 'tabla', 'fecha', 'anio']
+    list_filter = ['anio', 'accion', 'tabla']
+    readonly_fields = ['anio', 'usuario', 'accion', 'tabla', 'registro_id', 'datos_anteriores', 'datos_nuevos', 'fecha', 'ip']
+    search_fields = ['usuario__email', 'tabla', 'accion']
+
+
+@admin.register(RegistroCambio)
+class RegistroCambioAdmin(admin.ModelAdmin):
+    list_display = ['id', 'operacion', 'tabla', 'objeto_id', 'fecha']
+    list_filter = ['tabla', 'operacion']
+    readonly_fields = ['tabla', 'objeto_id', 'operacion', 'datos', 'fecha']
@@ -0,0 +1,23 @@
+"""
+Búsqueda de proyectos, metas, actividades, avances y evidencias junto con la unidad
+dueña, para verificar permisos sin consultas adicionales al recorrer
+objeto.meta.proyecto.unidad.unidad.
+"""
+from operator import attrgetter
+
+from django.shortcuts import get_object_or_404
+
+
+def obtener_con_unidad(modelo, **filtros):
+    """get_object_or_404 que trae en la misma consulta la cadena hasta el usuario dueño del proyecto"""
+    return get_object_or_404(modelo.objects.con_unidad(), **filtros)
+
+
+def usuario_dueno(objeto):
+    """Usuario dueño del proyecto al que pertenece el objeto"""
+    return attrgetter(objeto.RUTA_USUARIO.replace('__', '.'))(objeto)
+
+
+def puede_acceder(usuario, objeto):
+    """Administradores y auditores acceden a todo; un usuario de unidad, solo a lo de su unidad"""
+    return usuario.rol != 'UNIDAD' or usuario_dueno(objeto).unidad_id == usuario.unidad_id
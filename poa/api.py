@@ -0,0 +1,201 @@
+"""
+API JSON de solo lectura (v1) para integraciones: proyectos, metas, actividades,
+avances y metadatos de evidencias. Permite sincronizar por partes: actualizado_desde
+trae solo lo modificado desde una fecha y despues_de pagina por id (cursor), sin
+contar ni saltar filas. Las bajas se consultan en la bandeja de cambios (/poa/cambios/).
+"""
+from datetime import datetime, time
+from functools import wraps
+
+from django.core.files.storage import default_storage
+from django.db.models import F
+from django.http import JsonResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_safe
+
+from .models import Proyecto, MetaProyecto, Actividad, AvanceMensual, Evidencia, RegistroCambio, MODELOS_REGISTRADOS
+
+ROLES_API = ('ADMIN', 'AUDITOR')
+POR_PAGINA = 500
+MAXIMO_POR_PAGINA = 5000
+
+# campos: columnas del modelo; calculados: valores de tablas relacionadas;
+# actualizacion: columna de última modificación (sin ella se usa la bandeja de cambios);
+# filtros: parámetro -> lookup (numérico, salvo que opciones indique los valores válidos)
+RECURSOS = {
+    'proyectos': {
+        'modelo': Proyecto,
+        'campos': (
+            'id', 'nombre', 'objetivo_unidad', 'anio', 'estado', 'es_no_planificado',
+            'fecha_aprobacion', 'motivo_rechazo', 'fecha_creacion', 'fecha_modificacion',
+        ),
+        'calculados': {'id_unidad': F('unidad__unidad_id'), 'nombre_unidad': F('unidad__unidad__nombre')},
+        'actualizacion': 'fecha_modificacion',
+        'filtros': {'anio': 'anio', 'estado': 'estado'},
+        'opciones': {'estado': [estado for estado, _ in Proyecto.ESTADOS]},
+    },
+    'metas': {
+        'modelo': MetaProyecto,
+        'campos': ('id', 'proyecto_id', 'descripcion'),
+        'filtros': {'proyecto': 'proyecto_id'},
+    },
+    'actividades': {
+        'modelo': Actividad,
+        'campos': (
+            'id', 'meta_id', 'descripcion', 'unidad_medida', 'cantidad_programada', 'es_cuantificable',
+            'medio_verificacion', 'recursos', 'total_recursos', 'observaciones', 'fecha_creacion',
+        ),
+        'calculados': {'proyecto_id': F('meta__proyecto_id')},
+        'filtros': {'proyecto': 'meta__proyecto_id', 'meta': 'meta_id'},
+    },
+    'avances': {
+        'modelo': AvanceMensual,
+        'campos': (
+            'id', 'actividad_id', 'mes', 'anio', 'cantidad_programada_mes', 'cantidad_realizada',
+            'cumplimiento', 'causal_incumplimiento', 'es_no_planificada', 'fecha_actualizacion', 'version',
+        ),
+        'actualizacion': 'fecha_actualizacion',
+        'filtros': {'proyecto': 'actividad__meta__proyecto_id', 'actividad': 'actividad_id', 'anio': 'anio', 'mes': 'mes'},
+    },
+    'evidencias': {
+        'modelo': Evidencia,
+        'campos': ('id', 'actividad_id', 'tipo', 'archivo', 'url', 'descripcion', 'mes', 'fecha_subida'),
+        'filtros': {'proyecto': 'actividad__meta__proyecto_id', 'actividad': 'actividad_id', 'mes': 'mes'},
+    },
+}
+
+
+class ParametroInvalido(Exception):
+    pass
+
+
+def lectura_api(vista):
+    """Como las vistas de administrador y auditor, pero responde JSON en lugar de redirigir"""
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'errores': ['Debe iniciar sesión para usar la API.']}, status=401)
+        if request.user.rol not in ROLES_API:
+            return JsonResponse({'errores': ['Solo administradores y auditores pueden usar la API.']}, status=403)
+        return vista(request, *args, **kwargs)
+    return envoltura
+
+
+def _entero(valor, nombre, minimo=0):
+    try:
+        numero = int(valor)
+    except (TypeError, ValueError):
+        raise ParametroInvalido(f'{nombre} debe ser un número entero.')
+    if numero < minimo:
+        raise ParametroInvalido(f'{nombre} debe ser mayor o igual a {minimo}.')
+    return numero
+
+
+def _fecha(valor):
+    """Fecha y hora ISO 8601 (o solo la fecha, desde el inicio del día); sin zona horaria se usa la local"""
+    try:
+        fecha = parse_datetime(valor)
+        if fecha is None and (dia := parse_date(valor)) is not None:
+            fecha = datetime.combine(dia, time.min)
+    except ValueError:
+        fecha = None
+    if fecha is None:
+        raise ParametroInvalido('actualizado_desde debe ser una fecha ISO 8601 (por ejemplo 2025-03-01T08:00:00Z).')
+    return timezone.make_aware(fecha) if timezone.is_naive(fecha) else fecha
+
+
+def _campos(recurso, parametro):
+    """Campos pedidos en `campos` (separados por coma), siempre con el id para el cursor"""
+    disponibles = recurso['campos'] + tuple(recurso.get('calculados', {}))
+    if not parametro:
+        return disponibles
+    pedidos = [campo.strip() for campo in parametro.split(',') if campo.strip()]
+    desconocidos = [campo for campo in pedidos if campo not in disponibles]
+    if desconocidos:
+        raise ParametroInvalido(f'Campos desconocidos: {", ".join(desconocidos)}. Disponibles: {", ".join(disponibles)}.')
+    return ['id'] + [campo for campo in pedidos if campo != 'id']
+
+
+def consultar(recurso, parametros):
+    """
+    Página de filas (dicts) del recurso según los parámetros de la petición.
+    Retorna (filas, siguiente), donde siguiente es el cursor de la próxima página o None.
+    """
+    modelo = recurso['modelo']
+    consulta = modelo.objects.all()
+
+    if 'unidad' in parametros:
+        consulta = consulta.de_unidad(_entero(parametros['unidad'], 'unidad'))
+    for parametro, lookup in recurso['filtros'].items():
+        if parametro not in parametros:
+            continue
+        opciones = recurso.get('opciones', {}).get(parametro)
+        if opciones is None:
+            valor = _entero(parametros[parametro], parametro)
+        elif (valor := parametros[parametro]) not in opciones:
+            raise ParametroInvalido(f'{parametro} debe ser uno de: {", ".join(opciones)}.')
+        consulta = consulta.filter(**{lookup: valor})
+
+    if 'actualizado_desde' in parametros:
+        desde = _fecha(parametros['actualizado_desde'])
+        if recurso.get('actualizacion'):
+            consulta = consulta.filter(**{f'{recurso["actualizacion"]}__gte': desde})
+        else:
+            consulta = consulta.filter(id__in=RegistroCambio.objects.filter(
+                tabla=MODELOS_REGISTRADOS[modelo], fecha__gte=desde,
+            ).values('objeto_id'))
+
+    limite = min(_entero(parametros.get('limite', POR_PAGINA), 'limite', minimo=1), MAXIMO_POR_PAGINA)
+    despues_de = _entero(parametros.get('despues_de', 0), 'despues_de')
+    campos = _campos(recurso, parametros.get('campos'))
+    calculados = recurso.get('calculados', {})
+
+    filas = list(
+        consulta.filter(id__gt=despues_de).order_by('id').values(
+            *[campo for campo in campos if campo not in calculados],
+            **{campo: expresion for campo, expresion in calculados.items() if campo in campos},
+        )[:limite + 1]
+    )
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        siguiente = filas[-1]['id']
+    for fila in filas:
+        if fila.get('archivo'):
+            fila['archivo'] = default_storage.url(fila['archivo'])
+    return filas, siguiente
+
+
+@require_safe
+@lectura_api
+def indice(request):
+    """Recursos disponibles en esta versión de la API"""
+    return JsonResponse({'recursos': {
+        nombre: request.build_absolute_uri(reverse('api_v1:listar', args=[nombre])) for nombre in RECURSOS
+    }})
+
+
+@require_safe
+@gzip_page
+@lectura_api
+def listar(request, recurso):
+    """
+    Lista paginada de un recurso. Parámetros: actualizado_desde, despues_de (cursor),
+    limite, campos y los filtros del recurso (unidad, proyecto, anio...). Para la
+    siguiente sincronización conviene usar el sincronizado_en de la primera página.
+    """
+    if recurso not in RECURSOS:
+        return JsonResponse({'errores': [f'Recurso desconocido: {recurso}.']}, status=404)
+    sincronizado_en = timezone.now()
+    try:
+        filas, siguiente = consultar(RECURSOS[recurso], request.GET)
+    except ParametroInvalido as e:
+        return JsonResponse({'errores': [str(e)]}, status=400)
+    return JsonResponse({
+        'resultados': filas,
+        'siguiente': siguiente,
+        'sincronizado_en': sincronizado_en,
+    })
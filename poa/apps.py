@@ -5,3 +5,6 @@ class PoaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'poa'
     verbose_name = 'Gestión de POA'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,189 @@
+"""
+Creación de un POA completo a partir de un borrador editado en el navegador.
+
+El borrador es un documento JSON con el proyecto, sus metas, las actividades de cada
+meta y la programación de los 12 meses de cada actividad:
+
+    {
+        "proyecto": {"nombre": "...", "objetivo_unidad": "...", "anio": 2026},
+        "metas": [{
+            "descripcion": "...",
+            "actividades": [{
+                "descripcion": "...", "unidad_medida_select": "Evento", "unidad_medida_otro": "",
+                "es_cuantificable": true, "cantidad_programada": 12, "medio_verificacion": "...",
+                "recursos": "", "total_recursos": "0", "programacion": [1, 1, ..., 1]
+            }]
+        }]
+    }
+
+Se valida con las mismas reglas que el wizard paso a paso (los formularios de poa y la
+validación de la programación del paso "finalizar") y se guarda en una sola transacción
+con inserciones masivas.
+"""
+import re
+
+from django.db import transaction
+
+from .forms import FormularioProyecto, FormularioMeta, FormularioActividad
+from .models import Proyecto, MetaProyecto, Actividad, AvanceMensual
+from .signals import despues_de_crear_en_lote
+
+MESES = range(1, 13)
+MAXIMO_METAS = 100
+MAXIMO_ACTIVIDADES = 500
+
+
+class BorradorInvalido(Exception):
+    """El borrador no cumple las reglas del wizard. errores: lista de mensajes."""
+
+    def __init__(self, errores):
+        super().__init__('; '.join(errores))
+        self.errores = errores
+
+
+def _errores_formulario(formulario, ubicacion):
+    return [
+        f'{ubicacion}: {error}' if campo == '__all__' else f'{ubicacion} ({campo}): {error}'
+        for campo, errores in formulario.errors.items()
+        for error in errores
+    ]
+
+
+def _cantidad(valor):
+    """Cantidad mensual entera; None si no es un entero ni un texto entero (vacío = 0, como el wizard)."""
+    if isinstance(valor, int) and not isinstance(valor, bool):
+        return valor
+    if isinstance(valor, str):
+        texto = valor.strip()
+        if not texto:
+            return 0
+        if re.fullmatch(r'[+-]?\d+', texto):
+            return int(texto)
+    return None
+
+
+def _programacion(valores, ubicacion, errores):
+    if not isinstance(valores, list) or len(valores) != len(MESES):
+        errores.append(f'{ubicacion}: la programación debe ser una lista de 12 cantidades.')
+        return [0] * len(MESES)
+    programacion = []
+    for mes, valor in zip(MESES, valores):
+        cantidad = _cantidad(valor)
+        if cantidad is None or not 0 <= cantidad <= 999999:
+            errores.append(f'{ubicacion}: cantidad inválida para el mes {mes}.')
+            cantidad = 0
+        programacion.append(cantidad)
+    return programacion
+
+
+def _validar_actividad(datos, ubicacion, errores):
+    if not isinstance(datos, dict):
+        errores.append(f'{ubicacion}: formato inválido.')
+        return None
+    formulario = FormularioActividad(datos)
+    if not formulario.is_valid():
+        errores.extend(_errores_formulario(formulario, ubicacion))
+        return None
+    actividad = formulario.save(commit=False)
+    programacion = _programacion(datos.get('programacion', []), ubicacion, errores)
+
+    # Mismas reglas que el paso "finalizar" del wizard
+    if actividad.es_cuantificable and actividad.cantidad_programada > 0:
+        suma = sum(programacion)
+        if suma == 0:
+            errores.append(f'{ubicacion}: la actividad no ha sido programada.')
+        elif suma != actividad.cantidad_programada:
+            errores.append(
+                f'{ubicacion}: la suma de la programación mensual ({suma}) debe ser igual '
+                f'a la cantidad programada ({actividad.cantidad_programada}).'
+            )
+    return actividad, programacion
+
+
+def validar_borrador(datos):
+    """
+    Valida el borrador completo y retorna (proyecto, metas) sin guardar, donde metas es
+    una lista de (meta, [(actividad, programacion), ...]).
+    Lanza BorradorInvalido con todos los errores encontrados.
+    """
+    if not isinstance(datos, dict):
+        raise BorradorInvalido(['El borrador debe ser un objeto JSON.'])
+    errores = []
+
+    formulario = FormularioProyecto(datos.get('proyecto') or {})
+    proyecto = formulario.save(commit=False) if formulario.is_valid() else None
+    if proyecto is None:
+        errores.extend(_errores_formulario(formulario, 'Proyecto'))
+
+    metas_datos = datos.get('metas')
+    if not isinstance(metas_datos, list) or not metas_datos:
+        errores.append('Agregue al menos una meta.')
+        metas_datos = []
+    elif len(metas_datos) > MAXIMO_METAS:
+        raise BorradorInvalido([f'El borrador no puede tener más de {MAXIMO_METAS} metas.'])
+    total_actividades = sum(
+        len(m['actividades']) for m in metas_datos if isinstance(m, dict) and isinstance(m.get('actividades'), list)
+    )
+    if total_actividades > MAXIMO_ACTIVIDADES:
+        raise BorradorInvalido([f'El borrador no puede tener más de {MAXIMO_ACTIVIDADES} actividades.'])
+
+    metas = []
+    for i, meta_datos in enumerate(metas_datos, start=1):
+        ubicacion = f'Meta {i}'
+        if not isinstance(meta_datos, dict):
+            errores.append(f'{ubicacion}: formato inválido.')
+            continue
+        formulario = FormularioMeta(meta_datos)
+        if not formulario.is_valid():
+            errores.extend(_errores_formulario(formulario, ubicacion))
+            continue
+        actividades_datos = meta_datos.get('actividades')
+        if not isinstance(actividades_datos, list) or not actividades_datos:
+            errores.append(f'{ubicacion}: todas las metas deben tener al menos una actividad.')
+            continue
+        actividades = [
+            _validar_actividad(actividad_datos, f'{ubicacion}, actividad {j}', errores)
+            for j, actividad_datos in enumerate(actividades_datos, start=1)
+        ]
+        metas.append((formulario.save(commit=False), [a for a in actividades if a]))
+
+    if errores:
+        raise BorradorInvalido(errores)
+    return proyecto, metas
+
+
+@transaction.atomic
+def crear_desde_borrador(datos, usuario):
+    """Valida el borrador y crea el proyecto con sus metas, actividades y avances. Retorna el proyecto."""
+    proyecto, metas = validar_borrador(datos)
+    proyecto.unidad = usuario
+    if not proyecto.nombre:
+        conteo = Proyecto.objects.filter(unidad=usuario, anio=proyecto.anio).count() + 1
+        proyecto.nombre = f"Proyecto Operativo {proyecto.anio} - {conteo}"
+    proyecto.save()
+
+    for meta, _ in metas:
+        meta.proyecto = proyecto
+    MetaProyecto.objects.bulk_create([meta for meta, _ in metas])
+
+    for meta, actividades in metas:
+        for actividad, _ in actividades:
+            actividad.meta = meta
+    actividades = [a for _, actividades_meta in metas for a in actividades_meta]
+    Actividad.objects.bulk_create([actividad for actividad, _ in actividades])
+
+    avances = []
+    for actividad, programacion in actividades:
+        for mes, cantidad in zip(MESES, programacion):
+            avance = AvanceMensual(actividad=actividad, mes=mes, anio=proyecto.anio, cantidad_programada_mes=cantidad)
+            avance.calcular_cumplimiento()
+            avances.append(avance)
+    AvanceMensual.objects.bulk_create(avances, batch_size=500)
+
+    despues_de_crear_en_lote(
+        usuario.unidad_id,
+        metas=[meta for meta, _ in metas],
+        actividades=[actividad for actividad, _ in actividades],
+        avances=avances,
+    )
+    return proyecto
@@ -0,0 +1,272 @@
+"""
+Índice de búsqueda de texto completo para proyectos, metas, actividades y unidades.
+
+Cada objeto buscable tiene un documento en IndiceBusqueda, mantenido por las señales
+de poa/signals.py. Según el motor de base de datos se consulta con:
+- SQLite: tabla virtual FTS5 (poa_indicebusqueda_fts) ordenada por bm25.
+- PostgreSQL: to_tsvector('spanish') con índice GIN, ordenada por ts_rank.
+- Otros motores: icontains por término (sin ranking).
+"""
+import re
+from urllib.parse import urlencode
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.urls import reverse
+
+from .models import IndiceBusqueda
+
+TABLA_FTS = 'poa_indicebusqueda_fts'
+CONFIGURACION_POSTGRES = 'spanish'
+LIMITE_RESULTADOS = 20
+
+
+_indice_disponible = False
+
+
+def indice_disponible():
+    """
+    Indica si la tabla del índice ya existe. Las migraciones de datos anteriores
+    (p. ej. login 0002) crean usuarios antes de que exista, y las señales no deben fallar.
+    """
+    global _indice_disponible
+    if not _indice_disponible:
+        _indice_disponible = IndiceBusqueda._meta.db_table in connection.introspection.table_names()
+    return _indice_disponible
+
+
+# --- Construcción de documentos ---
+
+def _unir(*partes):
+    return ' '.join(p for p in partes if p)
+
+
+def _campos_proyecto(proyecto):
+    unidad = proyecto.unidad.unidad
+    return {
+        'proyecto_id': proyecto.id,
+        'unidad_id': unidad.id,
+        'titulo': proyecto.nombre or f'Proyecto {proyecto.anio}',
+        'texto': _unir(proyecto.nombre, proyecto.objetivo_unidad, unidad.nombre, str(proyecto.anio)),
+    }
+
+
+def _campos_meta(meta):
+    return {
+        'proyecto_id': meta.proyecto_id,
+        'unidad_id': meta.proyecto.unidad.unidad_id,
+        'titulo': meta.descripcion,
+        'texto': meta.descripcion,
+    }
+
+
+def _campos_actividad(actividad):
+    proyecto = actividad.meta.proyecto
+    return {
+        'proyecto_id': proyecto.id,
+        'unidad_id': proyecto.unidad.unidad_id,
+        'titulo': actividad.descripcion,
+        'texto': _unir(actividad.descripcion, actividad.medio_verificacion),
+    }
+
+
+def _campos_usuario_unidad(usuario):
+    return {
+        'proyecto_id': None,
+        'unidad_id': usuario.unidad_id,
+        'titulo': usuario.unidad.nombre,
+        'texto': _unir(usuario.unidad.nombre, usuario.email),
+    }
+
+
+def indexar_proyecto(proyecto):
+    """Crea o actualiza el documento de un proyecto"""
+    IndiceBusqueda.objects.update_or_create(
+        tipo='PROYECTO', objeto_id=proyecto.id, defaults=_campos_proyecto(proyecto)
+    )
+
+
+def indexar_meta(meta):
+    """Crea o actualiza el documento de una meta"""
+    IndiceBusqueda.objects.update_or_create(
+        tipo='META', objeto_id=meta.id, defaults=_campos_meta(meta)
+    )
+
+
+def indexar_actividad(actividad):
+    """Crea o actualiza el documento de una actividad"""
+    IndiceBusqueda.objects.update_or_create(
+        tipo='ACTIVIDAD', objeto_id=actividad.id, defaults=_campos_actividad(actividad)
+    )
+
+
+def indexar_usuario_unidad(usuario):
+    """Crea, actualiza o elimina el documento de un usuario de unidad"""
+    if usuario.rol != 'UNIDAD':
+        eliminar_del_indice('UNIDAD', usuario.id)
+        return
+    IndiceBusqueda.objects.update_or_create(
+        tipo='UNIDAD', objeto_id=usuario.id, defaults=_campos_usuario_unidad(usuario)
+    )
+
+
+def indexar_lote(tipo, objetos):
+    """Crea los documentos de objetos nuevos creados con bulk_create (que no emite señales)"""
+    campos = {'PROYECTO': _campos_proyecto, 'META': _campos_meta, 'ACTIVIDAD': _campos_actividad}[tipo]
+    IndiceBusqueda.objects.bulk_create(
+        [IndiceBusqueda(tipo=tipo, objeto_id=objeto.id, **campos(objeto)) for objeto in objetos], batch_size=500
+    )
+
+
+def eliminar_del_indice(tipo, objeto_id):
+    IndiceBusqueda.objects.filter(tipo=tipo, objeto_id=objeto_id).delete()
+
+
+def reconstruir_indice():
+    """Regenera el índice completo. Retorna la cantidad de documentos creados."""
+    from login.models import Usuario
+    from .models import Proyecto, MetaProyecto, Actividad
+
+    fuentes = [
+        ('PROYECTO', Proyecto.objects.select_related('unidad__unidad'), _campos_proyecto),
+        ('META', MetaProyecto.objects.select_related('proyecto__unidad'), _campos_meta),
+        ('ACTIVIDAD', Actividad.objects.select_related('meta__proyecto__unidad'), _campos_actividad),
+        ('UNIDAD', Usuario.objects.unidades().select_related('unidad'), _campos_usuario_unidad),
+    ]
+    documentos = [
+        IndiceBusqueda(tipo=tipo, objeto_id=objeto.id, **campos(objeto))
+        for tipo, queryset, campos in fuentes
+        for objeto in queryset.order_by()
+    ]
+    IndiceBusqueda.objects.all().delete()
+    IndiceBusqueda.objects.bulk_create(documentos, batch_size=500)
+    return len(documentos)
+
+
+# --- Consultas ---
+
+def _terminos(consulta):
+    return re.findall(r'\w+', consulta or '')[:10]
+
+
+def _expresion_fts(terminos):
+    # Cada término se cita para neutralizar la sintaxis de FTS5 y se busca por prefijo
+    return ' '.join('"%s"*' % t.replace('"', '') for t in terminos)
+
+
+def _buscar_sqlite(terminos, filtros, parametros, limite):
+    expresion = _expresion_fts(terminos)
+    sql = (
+        f'SELECT i.*, bm25({TABLA_FTS}) AS relevancia '
+        f'FROM {TABLA_FTS} JOIN poa_indicebusqueda i ON i.id = {TABLA_FTS}.rowid '
+        f'WHERE {TABLA_FTS} MATCH %s {filtros} '
+        f'ORDER BY relevancia LIMIT %s'
+    )
+    return list(IndiceBusqueda.objects.raw(sql, [expresion, *parametros, limite]))
+
+
+def _vector_y_consulta_postgres(terminos):
+    from django.contrib.postgres.search import SearchQuery, SearchVector
+
+    vector = SearchVector('texto', config=CONFIGURACION_POSTGRES)
+    consulta = SearchQuery(
+        ' & '.join(f'{t}:*' for t in terminos), config=CONFIGURACION_POSTGRES, search_type='raw'
+    )
+    return vector, consulta
+
+
+def _buscar_postgres(terminos, qs, limite):
+    from django.contrib.postgres.search import SearchRank
+
+    vector, consulta = _vector_y_consulta_postgres(terminos)
+    return list(
+        qs.annotate(relevancia=SearchRank(vector, consulta))
+        .filter(relevancia__gt=0)
+        .order_by('-relevancia')[:limite]
+    )
+
+
+def buscar(consulta, unidad=None, tipos=None, limite=LIMITE_RESULTADOS):
+    """
+    Busca en el índice y retorna los documentos ordenados por relevancia.
+
+    Args:
+        consulta: texto ingresado por el usuario
+        unidad: si se indica, limita los resultados a esa Unidad (login.Unidad)
+        tipos: lista opcional de tipos (PROYECTO, META, ACTIVIDAD, UNIDAD)
+    """
+    terminos = _terminos(consulta)
+    if not terminos:
+        return []
+
+    if connection.vendor == 'sqlite':
+        filtros, parametros = '', []
+        if unidad is not None:
+            filtros += ' AND i.unidad_id = %s'
+            parametros.append(unidad.id)
+        if tipos:
+            filtros += ' AND i.tipo IN (%s)' % ', '.join(['%s'] * len(tipos))
+            parametros.extend(tipos)
+        return _buscar_sqlite(terminos, filtros, parametros, limite)
+
+    qs = IndiceBusqueda.objects.all()
+    if unidad is not None:
+        qs = qs.filter(unidad=unidad)
+    if tipos:
+        qs = qs.filter(tipo__in=tipos)
+
+    if connection.vendor == 'postgresql':
+        return _buscar_postgres(terminos, qs, limite)
+
+    for termino in terminos:
+        qs = qs.filter(texto__icontains=termino)
+    return list(qs.order_by('tipo', 'titulo')[:limite])
+
+
+def ids_coincidentes(consulta, tipo, unidad=None):
+    """
+    Subconsulta con los objeto_id de un tipo que coinciden con la consulta, para filtrar
+    listas completas con filter(id__in=...): a diferencia de buscar(), no tiene límite
+    ni ordena por relevancia. Coincide igual que buscar(): cada palabra de la consulta
+    debe ser el comienzo de una palabra del documento, sin importar acentos
+    ('gastro' encuentra 'Gastronómico'); no busca subcadenas como icontains ('nómico' no).
+    """
+    terminos = _terminos(consulta)
+    if not terminos:
+        return IndiceBusqueda.objects.none().values('objeto_id')
+
+    if connection.vendor == 'sqlite':
+        sql = (
+            f'SELECT i.objeto_id FROM {TABLA_FTS} JOIN poa_indicebusqueda i ON i.id = {TABLA_FTS}.rowid '
+            f'WHERE {TABLA_FTS} MATCH %s AND i.tipo = %s'
+        )
+        parametros = [_expresion_fts(terminos), tipo]
+        if unidad is not None:
+            sql += ' AND i.unidad_id = %s'
+            parametros.append(unidad.id)
+        return RawSQL(sql, parametros)
+
+    qs = IndiceBusqueda.objects.filter(tipo=tipo)
+    if unidad is not None:
+        qs = qs.filter(unidad=unidad)
+    if connection.vendor == 'postgresql':
+        vector, consulta_postgres = _vector_y_consulta_postgres(terminos)
+        qs = qs.annotate(documento=vector).filter(documento=consulta_postgres)
+    else:
+        for termino in terminos:
+            qs = qs.filter(texto__icontains=termino)
+    return qs.values('objeto_id')
+
+
+def url_resultado(documento, usuario):
+    """URL de destino de un resultado según el rol del usuario"""
+    if documento.tipo == 'UNIDAD':
+        if usuario.rol == 'ADMIN':
+            return reverse('administrador:proyectos_unidad', args=[documento.objeto_id])
+        return f"{reverse('auditor:ver_unidades')}?{urlencode({'buscar': documento.titulo})}"
+
+    if usuario.rol == 'ADMIN':
+        return reverse('administrador:detalle_proyecto_admin', args=[documento.proyecto_id])
+    if usuario.rol == 'AUDITOR':
+        return reverse('auditor:detalle_proyecto', args=[documento.proyecto_id])
+    return reverse('poa:detalle_proyecto', args=[documento.proyecto_id])
@@ -0,0 +1,127 @@
+"""
+Guardado en lote de la grilla de avances: todas las celdas modificadas de un mes o de
+todo el proyecto llegan en un solo envío JSON:
+
+    {"cambios": [{"actividad_id": 7, "mes": 3, "cantidad_realizada": 12, "version": 4}, ...]}
+
+Las celdas se validan juntas (si alguna es inválida no se guarda ninguna) y se escriben
+en una transacción con UPDATE masivos condicionados a la versión de cada avance. Las
+celdas que otro usuario modificó mientras tanto no se sobrescriben: se devuelven como
+conflictos con su valor actual.
+"""
+from django.db import transaction
+
+from utils.cache import incrementar_version
+from utils.estadisticas import espacio_unidad
+from .models import AvanceMensual
+
+MESES = range(1, 13)
+MAXIMO_CELDAS = 600
+CELDAS_POR_LOTE = 100
+CAMPOS_CELDA = ('id', 'actividad_id', 'mes', 'cantidad_realizada', 'cumplimiento', 'es_no_planificada', 'version')
+
+
+class CambiosInvalidos(Exception):
+    """El envío de la grilla tiene celdas inválidas. errores: lista de mensajes."""
+
+    def __init__(self, errores):
+        super().__init__('; '.join(errores))
+        self.errores = errores
+
+
+class GuardadoSimultaneo(Exception):
+    """Otro guardado modificó los avances entre la lectura y la escritura"""
+
+
+def _entero(valor):
+    if isinstance(valor, bool):
+        return None
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def validar_cambios(datos):
+    """
+    Valida el formato de las celdas y retorna {(actividad_id, mes): (cantidad, version)}.
+    Lanza CambiosInvalidos con todos los errores encontrados.
+    """
+    cambios = datos.get('cambios') if isinstance(datos, dict) else None
+    if not isinstance(cambios, list) or not cambios:
+        raise CambiosInvalidos(['No se enviaron cambios.'])
+    if len(cambios) > MAXIMO_CELDAS:
+        raise CambiosInvalidos([f'No se pueden guardar más de {MAXIMO_CELDAS} celdas a la vez.'])
+
+    errores, celdas = [], {}
+    for i, celda in enumerate(cambios, start=1):
+        if not isinstance(celda, dict):
+            errores.append(f'Celda {i}: formato inválido.')
+            continue
+        actividad_id, mes = _entero(celda.get('actividad_id')), _entero(celda.get('mes'))
+        cantidad, version = _entero(celda.get('cantidad_realizada')), _entero(celda.get('version'))
+        if actividad_id is None or mes not in MESES or version is None:
+            errores.append(f'Celda {i}: actividad, mes o versión inválidos.')
+        elif cantidad is None or not 0 <= cantidad <= 999999:
+            errores.append(f'Celda {i}: la cantidad realizada debe ser un número entre 0 y 999,999.')
+        elif (actividad_id, mes) in celdas:
+            errores.append(f'Celda {i}: la actividad y el mes están repetidos.')
+        else:
+            celdas[actividad_id, mes] = (cantidad, version)
+    if errores:
+        raise CambiosInvalidos(errores)
+    return celdas
+
+
+def _celda(fila):
+    return {
+        'actividad_id': fila['actividad_id'],
+        'mes': fila['mes'],
+        'cantidad_realizada': fila['cantidad_realizada'],
+        'cumplimiento': None if fila['cumplimiento'] is None else str(fila['cumplimiento']),
+        'es_no_planificada': fila['es_no_planificada'],
+        'version': fila['version'],
+    }
+
+
+@transaction.atomic
+def guardar_cambios(proyecto, datos):
+    """
+    Guarda las celdas de la grilla de un proyecto aprobado y retorna la diferencia:
+    {'actualizados': [...], 'conflictos': [...]} con el estado actual de cada celda.
+    """
+    celdas = validar_cambios(datos)
+    avances = AvanceMensual.objects.filter(actividad__meta__proyecto=proyecto, anio=proyecto.anio)
+    actividades = {actividad_id for actividad_id, _ in celdas}
+    existentes = {
+        (fila['actividad_id'], fila['mes']): fila
+        for fila in avances.select_for_update().filter(actividad_id__in=actividades).values(*CAMPOS_CELDA)
+    }
+    faltantes = [clave for clave in celdas if clave not in existentes]
+    if faltantes:
+        raise CambiosInvalidos([
+            f'La actividad {actividad_id} no tiene avance para el mes {mes} en este proyecto.'
+            for actividad_id, mes in faltantes
+        ])
+
+    conflictos, cambios = [], {}
+    for clave, (cantidad, version) in celdas.items():
+        fila = existentes[clave]
+        if fila['version'] != version:
+            conflictos.append(_celda(fila))
+        elif fila['cantidad_realizada'] != cantidad:
+            cambios[fila['id']] = (cantidad, version)
+
+    ids = list(cambios)
+    for inicio in range(0, len(ids), CELDAS_POR_LOTE):
+        lote = {avance_id: cambios[avance_id] for avance_id in ids[inicio:inicio + CELDAS_POR_LOTE]}
+        if AvanceMensual.objects.registrar_realizados(lote) != len(lote):
+            # Otro guardado ganó entre la lectura y la escritura: se descarta todo el envío
+            raise GuardadoSimultaneo()
+
+    actualizados = [_celda(fila) for fila in AvanceMensual.objects.filter(id__in=ids).values(*CAMPOS_CELDA)]
+    if actualizados:
+        # Los UPDATE no emiten señales: se invalidan aquí las cachés que dependen de los avances
+        incrementar_version('dashboard', espacio_unidad(proyecto.unidad.unidad_id))
+        proyecto.registrar_modificacion()
+    return {'actualizados': actualizados, 'conflictos': conflictos}
@@ -0,0 +1,69 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from poa.models import AuditoriaLog, AuditoriaLogArchivo
+
+
+class Command(BaseCommand):
+    """
+    Mueve los logs de auditoría de años anteriores a la tabla de archivo.
+    Ejemplo: python manage.py archivar_logs --conservar 2
+    """
+    help = 'Archiva por año los logs de auditoría antiguos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--conservar', type=int, default=1,
+            help='Cantidad de años (incluyendo el actual) que permanecen en la tabla principal',
+        )
+        parser.add_argument(
+            '--lote', type=int, default=5000,
+            help='Cantidad de registros movidos por transacción',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Solo muestra lo que se archivaría')
+
+    def handle(self, *args, **options):
+        conservar = options['conservar']
+        lote = options['lote']
+        if conservar < 1 or lote < 1:
+            raise CommandError('--conservar y --lote deben ser mayores a 0.')
+
+        anio_limite = timezone.localdate().year - conservar + 1
+        inicio_limite = timezone.make_aware(datetime(anio_limite, 1, 1))
+        pendientes = AuditoriaLog.objects.filter(fecha__lt=inicio_limite)
+
+        total = pendientes.count()
+        if options['dry_run']:
+            self.stdout.write(f'Se archivarían {total} logs anteriores a {anio_limite}.')
+            return
+
+        archivados = 0
+        while True:
+            with transaction.atomic():
+                logs = list(pendientes.order_by('fecha', 'id')[:lote])
+                if not logs:
+                    break
+                AuditoriaLogArchivo.objects.bulk_create([
+                    AuditoriaLogArchivo(
+                        anio=timezone.localtime(log.fecha).year,
+                        usuario_id=log.usuario_id,
+                        accion=log.accion,
+                        tabla=log.tabla,
+                        registro_id=log.registro_id,
+                        datos_anteriores=log.datos_anteriores,
+                        datos_nuevos=log.datos_nuevos,
+                        fecha=log.fecha,
+                        ip=log.ip,
+                    )
+                    for log in logs
+                ])
+                AuditoriaLog.objects.filter(id__in=[log.id for log in logs]).delete()
+            archivados += len(logs)
+
+        AuditoriaLog.objects.invalidar_acciones()
+        self.stdout.write(self.style.SUCCESS(
+            f'{archivados} logs anteriores a {anio_limite} movidos al archivo.'
+        ))
@@ -0,0 +1,53 @@
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+
+from poa.models import Proyecto
+from poa.renovacion import clonar_proyectos
+
+
+class Command(BaseCommand):
+    """
+    Copia los POA aprobados de un año al siguiente como borradores de cada unidad.
+    Ejemplo: python manage.py clonar_poas --desde 2025 --hasta 2026 --factor 1.1
+    """
+    help = 'Copia los proyectos aprobados de un año (metas, actividades y programación) a otro año'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', type=int, required=True, help='Año de los proyectos aprobados a copiar')
+        parser.add_argument('--hasta', type=int, help='Año destino (por defecto, el siguiente)')
+        parser.add_argument('--unidad', type=int, action='append', help='ID de la unidad a copiar (se puede repetir)')
+        parser.add_argument('--factor', default='1', help='Factor que escala las cantidades programadas')
+        parser.add_argument('--sin-programacion', action='store_true', help='Deja la programación mensual en 0')
+        parser.add_argument('--dry-run', action='store_true', help='Hace la copia y la revierte: muestra lo que se copiaría')
+
+    def handle(self, *args, **options):
+        desde = options['desde']
+        hasta = options['hasta'] or desde + 1
+        try:
+            factor = Decimal(options['factor'])
+        except InvalidOperation:
+            raise CommandError('--factor debe ser un número.')
+        if not factor.is_finite() or factor < 0:
+            raise CommandError('--factor debe ser un número mayor o igual a 0.')
+        if not 2000 <= hasta <= 2100:
+            raise CommandError('El año destino debe estar entre 2000 y 2100.')
+
+        proyectos = Proyecto.objects.filter(anio=desde, estado='APROBADO', es_no_planificado=False)
+        if options['unidad']:
+            proyectos = proyectos.filter(unidad__unidad_id__in=options['unidad'])
+
+        resumen = clonar_proyectos(
+            proyectos, anio=hasta, factor=factor, programacion=not options['sin_programacion'],
+            dry_run=options['dry_run'],
+        )
+        for proyecto, motivo in resumen['omitidos']:
+            self.stdout.write(self.style.WARNING(f'Omitido "{proyecto}": {motivo}.'))
+        if options['verbosity'] > 1:
+            for proyecto in resumen['proyectos']:
+                self.stdout.write(f'  {proyecto.unidad.unidad.nombre}: {proyecto}')
+        verbo = 'se copiarían' if options['dry_run'] else 'copiados'
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(resumen['proyectos'])} proyectos {verbo} a {hasta}: {resumen['metas']} metas, "
+            f"{resumen['actividades']} actividades y {resumen['avances']} avances mensuales."
+        ))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from utils.cache import obtener_metricas, reiniciar_metricas
+
+
+class Command(BaseCommand):
+    """Muestra los aciertos y fallos acumulados de los valores cacheados"""
+    help = 'Muestra las métricas de aciertos/fallos de la caché de agregados'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reiniciar', action='store_true', help='Pone los contadores en cero después de mostrarlos')
+
+    def handle(self, *args, **options):
+        metricas = obtener_metricas()
+        if not metricas:
+            self.stdout.write('Sin métricas registradas.')
+        for nombre, conteo in metricas.items():
+            self.stdout.write(
+                f"{nombre}: {conteo['aciertos']} aciertos, {conteo['fallos']} fallos "
+                f"({conteo['tasa_aciertos']:.1%})"
+            )
+        if options['reiniciar']:
+            reiniciar_metricas()
+            self.stdout.write(self.style.SUCCESS('Métricas reiniciadas.'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from poa.busqueda import reconstruir_indice
+
+
+class Command(BaseCommand):
+    """Regenera el índice de búsqueda de texto completo a partir de los datos actuales"""
+    help = 'Reconstruye el índice de búsqueda de proyectos, metas, actividades y unidades'
+
+    def handle(self, *args, **options):
+        total = reconstruir_indice()
+        self.stdout.write(self.style.SUCCESS(f'{total} documentos indexados.'))
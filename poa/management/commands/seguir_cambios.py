@@ -0,0 +1,48 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from poa.models import RegistroCambio
+
+
+class Command(BaseCommand):
+    """
+    Escribe en la salida estándar, una línea JSON por cambio, la bandeja de cambios
+    posterior a un cursor. Con --seguir sigue consultando hasta interrumpirlo.
+    Ejemplo: python manage.py seguir_cambios --desde 1520 --seguir > cambios.jsonl
+    """
+    help = 'Muestra los cambios registrados después de un cursor (id del último cambio leído)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', type=int, default=0, help='Id del último cambio ya procesado')
+        parser.add_argument('--lote', type=int, default=500, help='Cantidad de cambios leídos por consulta')
+        parser.add_argument('--seguir', action='store_true', help='Sigue esperando cambios nuevos')
+        parser.add_argument('--intervalo', type=float, default=2, help='Segundos entre consultas con --seguir')
+
+    def handle(self, *args, **options):
+        cursor = options['desde']
+        lote = options['lote']
+        if cursor < 0:
+            raise CommandError('--desde no puede ser negativo.')
+        if lote < 1 or options['intervalo'] <= 0:
+            raise CommandError('--lote e --intervalo deben ser mayores a 0.')
+
+        try:
+            while True:
+                cambios = list(RegistroCambio.objects.desde(cursor, lote))
+                for cambio in cambios:
+                    self.stdout.write(json.dumps(cambio.como_dict(), cls=DjangoJSONEncoder))
+                if cambios:
+                    cursor = cambios[-1].id
+                if len(cambios) == lote:
+                    continue
+                if not options['seguir']:
+                    break
+                self.stdout.flush()
+                time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            pass
+        # El cursor final permite retomar con --desde
+        self.stderr.write(f'cursor: {cursor}')
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('poa', '0012_proyecto_es_no_planificado'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditoriaLogArchivo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('anio', models.IntegerField(verbose_name='Año')),
+                ('accion', models.CharField(max_length=50, verbose_name='Acción')),
+                ('tabla', models.CharField(max_length=50, verbose_name='Tabla')),
+                ('registro_id', models.IntegerField(verbose_name='ID del Registro')),
+                ('datos_anteriores', models.JSONField(blank=True, null=True, verbose_name='Datos Anteriores')),
+                ('datos_nuevos', models.JSONField(blank=True, null=True, verbose_name='Datos Nuevos')),
+                ('fecha', models.DateTimeField(verbose_name='Fecha')),
+                ('ip', models.GenericIPAddressField(blank=True, null=True, verbose_name='Dirección IP')),
+            ],
+            options={
+                'verbose_name': 'Log de Auditoría Archivado',
+                'verbose_name_plural': 'Logs de Auditoría Archivados',
+                'ordering': ['-fecha'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='auditorialog',
+            index=models.Index(fields=['-fecha', '-id'], name='poa_log_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditorialog',
+            index=models.Index(fields=['accion', '-fecha'], name='poa_log_accion_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditorialog',
+            index=models.Index(fields=['usuario', '-fecha'], name='poa_log_usuario_fecha_idx'),
+        ),
+        migrations.AddField(
+            model_name='auditorialogarchivo',
+            name='usuario',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Usuario'),
+        ),
+        migrations.AddIndex(
+            model_name='auditorialogarchivo',
+            index=models.Index(fields=['anio', '-fecha'], name='poa_logarch_anio_fecha_idx'),
+        ),
+    ]
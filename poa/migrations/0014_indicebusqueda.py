@@ -0,0 +1,121 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+SQL_SQLITE = [
+    """CREATE VIRTUAL TABLE poa_indicebusqueda_fts USING fts5(
+        texto, content='poa_indicebusqueda', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER poa_indicebusqueda_ai AFTER INSERT ON poa_indicebusqueda BEGIN
+        INSERT INTO poa_indicebusqueda_fts(rowid, texto) VALUES (new.id, new.texto);
+    END""",
+    """CREATE TRIGGER poa_indicebusqueda_ad AFTER DELETE ON poa_indicebusqueda BEGIN
+        INSERT INTO poa_indicebusqueda_fts(poa_indicebusqueda_fts, rowid, texto) VALUES ('delete', old.id, old.texto);
+    END""",
+    """CREATE TRIGGER poa_indicebusqueda_au AFTER UPDATE ON poa_indicebusqueda BEGIN
+        INSERT INTO poa_indicebusqueda_fts(poa_indicebusqueda_fts, rowid, texto) VALUES ('delete', old.id, old.texto);
+        INSERT INTO poa_indicebusqueda_fts(rowid, texto) VALUES (new.id, new.texto);
+    END""",
+]
+
+SQL_SQLITE_REVERSA = [
+    "DROP TRIGGER IF EXISTS poa_indicebusqueda_au",
+    "DROP TRIGGER IF EXISTS poa_indicebusqueda_ad",
+    "DROP TRIGGER IF EXISTS poa_indicebusqueda_ai",
+    "DROP TABLE IF EXISTS poa_indicebusqueda_fts",
+]
+
+SQL_POSTGRES = [
+    """CREATE INDEX poa_indicebusqueda_tsv_idx ON poa_indicebusqueda
+        USING gin (to_tsvector('spanish'::regconfig, COALESCE(texto, '')))""",
+]
+
+SQL_POSTGRES_REVERSA = [
+    "DROP INDEX IF EXISTS poa_indicebusqueda_tsv_idx",
+]
+
+
+def _unir(*partes):
+    return ' '.join(p for p in partes if p)
+
+
+def crear_indice_texto(apps, schema_editor):
+    """Crea la estructura de texto completo propia de cada motor"""
+    vendor = schema_editor.connection.vendor
+    sentencias = {'sqlite': SQL_SQLITE, 'postgresql': SQL_POSTGRES}.get(vendor, [])
+    for sql in sentencias:
+        schema_editor.execute(sql)
+
+
+def eliminar_indice_texto(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    sentencias = {'sqlite': SQL_SQLITE_REVERSA, 'postgresql': SQL_POSTGRES_REVERSA}.get(vendor, [])
+    for sql in sentencias:
+        schema_editor.execute(sql)
+
+
+def poblar_indice(apps, schema_editor):
+    """Indexa los datos existentes"""
+    IndiceBusqueda = apps.get_model('poa', 'IndiceBusqueda')
+    Proyecto = apps.get_model('poa', 'Proyecto')
+    MetaProyecto = apps.get_model('poa', 'MetaProyecto')
+    Actividad = apps.get_model('poa', 'Actividad')
+    Usuario = apps.get_model('login', 'Usuario')
+
+    documentos = []
+    for p in Proyecto.objects.select_related('unidad__unidad'):
+        documentos.append(IndiceBusqueda(
+            tipo='PROYECTO', objeto_id=p.id, proyecto_id=p.id, unidad_id=p.unidad.unidad_id,
+            titulo=p.nombre or f'Proyecto {p.anio}',
+            texto=_unir(p.nombre, p.objetivo_unidad, p.unidad.unidad.nombre, str(p.anio)),
+        ))
+    for m in MetaProyecto.objects.select_related('proyecto__unidad'):
+        documentos.append(IndiceBusqueda(
+            tipo='META', objeto_id=m.id, proyecto_id=m.proyecto_id,
+            unidad_id=m.proyecto.unidad.unidad_id, titulo=m.descripcion, texto=m.descripcion,
+        ))
+    for a in Actividad.objects.select_related('meta__proyecto__unidad'):
+        documentos.append(IndiceBusqueda(
+            tipo='ACTIVIDAD', objeto_id=a.id, proyecto_id=a.meta.proyecto_id,
+            unidad_id=a.meta.proyecto.unidad.unidad_id, titulo=a.descripcion,
+            texto=_unir(a.descripcion, a.medio_verificacion),
+        ))
+    for u in Usuario.objects.filter(rol='UNIDAD').select_related('unidad'):
+        documentos.append(IndiceBusqueda(
+            tipo='UNIDAD', objeto_id=u.id, unidad_id=u.unidad_id,
+            titulo=u.unidad.nombre, texto=_unir(u.unidad.nombre, u.email),
+        ))
+    IndiceBusqueda.objects.bulk_create(documentos, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('login', '0002_crear_unidades_usuarios_iniciales'),
+        ('poa', '0013_auditorialog_indices_archivo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndiceBusqueda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('PROYECTO', 'Proyecto'), ('META', 'Meta'), ('ACTIVIDAD', 'Actividad'), ('UNIDAD', 'Unidad')], max_length=10, verbose_name='Tipo')),
+                ('objeto_id', models.BigIntegerField(verbose_name='ID del Objeto')),
+                ('titulo', models.CharField(max_length=500, verbose_name='Título')),
+                ('texto', models.TextField(verbose_name='Texto indexado')),
+                ('proyecto', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='poa.proyecto', verbose_name='Proyecto')),
+                ('unidad', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='login.unidad', verbose_name='Unidad')),
+            ],
+            options={
+                'verbose_name': 'Documento de Búsqueda',
+                'verbose_name_plural': 'Índice de Búsqueda',
+                'unique_together': {('tipo', 'objeto_id')},
+            },
+        ),
+        migrations.RunPython(crear_indice_texto, eliminar_indice_texto),
+        migrations.RunPython(poblar_indice, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('poa', '0014_indicebusqueda'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='actividad',
+            options={'ordering': ['meta_id', 'id'], 'verbose_name': 'Actividad', 'verbose_name_plural': 'Actividades'},
+        ),
+        migrations.AlterModelOptions(
+            name='avancemensual',
+            options={'ordering': ['actividad_id', 'anio', 'mes'], 'verbose_name': 'Avance Mensual', 'verbose_name_plural': 'Avances Mensuales'},
+        ),
+        migrations.AlterModelOptions(
+            name='metaproyecto',
+            options={'ordering': ['proyecto_id', 'id'], 'verbose_name': 'Meta', 'verbose_name_plural': 'Metas'},
+        ),
+        migrations.AlterField(
+            model_name='proyecto',
+            name='unidad',
+            field=models.ForeignKey(db_index=False, limit_choices_to={'rol': 'UNIDAD'}, on_delete=django.db.models.deletion.PROTECT, related_name='proyectos', to=settings.AUTH_USER_MODEL, verbose_name='Unidad'),
+        ),
+        migrations.AddIndex(
+            model_name='avancemensual',
+            index=models.Index(fields=['mes', 'cumplimiento'], name='poa_avance_mes_cump_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='evidencia',
+            index=models.Index(fields=['actividad', 'mes'], name='poa_evid_actividad_mes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proyecto',
+            index=models.Index(fields=['unidad', 'estado', '-anio'], name='poa_proy_unidad_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proyecto',
+            index=models.Index(fields=['estado', '-fecha_modificacion'], name='poa_proy_estado_fmod_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proyecto',
+            index=models.Index(fields=['unidad', 'anio', 'es_no_planificado'], name='poa_proy_unidad_anio_np_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:35
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('poa', '0016_avancemensual_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistroCambio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tabla', models.CharField(choices=[('PROYECTO', 'Proyecto'), ('META', 'Meta'), ('ACTIVIDAD', 'Actividad'), ('AVANCE', 'Avance Mensual'), ('EVIDENCIA', 'Evidencia')], max_length=10, verbose_name='Tabla')),
+                ('objeto_id', models.BigIntegerField(verbose_name='ID del Registro')),
+                ('operacion', models.CharField(choices=[('CREAR', 'Creación'), ('ACTUALIZAR', 'Actualización'), ('ELIMINAR', 'Eliminación')], max_length=10, verbose_name='Operación')),
+                ('datos', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Datos')),
+                ('fecha', models.DateTimeField(auto_now_add=True, verbose_name='Fecha')),
+            ],
+            options={
+                'verbose_name': 'Registro de Cambio',
+                'verbose_name_plural': 'Registro de Cambios',
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('poa', '0017_registrocambio'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='avancemensual',
+            index=models.Index(fields=['fecha_actualizacion'], name='poa_avance_fact_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registrocambio',
+            index=models.Index(fields=['tabla', 'fecha'], name='poa_cambio_tabla_fecha_idx'),
+        ),
+    ]
@@ -1,11 +1,56 @@
-from decimal import Decimal, InvalidOperation
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.db.models import Avg, Case, F, Q, Sum, Value, When
+from django.db.models.fields.files import FieldFile
+from django.db.models.functions import Least
+from django.db.models.lookups import GreaterThan
 from django.core.validators import MinValueValidator, MaxValueValidator
-from login.models import Usuario
+from django.utils import timezone
+from login.models import Usuario, Unidad
+from utils.cumplimiento import porcentaje_cumplimiento, porcentaje_cumplimiento_sql
+
+
+class AmbitoUnidadQuerySet(models.QuerySet):
+    """
+    QuerySet de los modelos que pertenecen a una unidad a través del usuario dueño del
+    proyecto. Cada modelo indica en RUTA_USUARIO el camino hasta ese usuario.
+    """
+
+    def con_unidad(self):
+        """Trae en la misma consulta la cadena de relaciones hasta el usuario dueño"""
+        return self.select_related(self.model.RUTA_USUARIO)
+
+    def de_unidad(self, unidad_id):
+        return self.filter(**{f'{self.model.RUTA_USUARIO}__unidad_id': unidad_id})
+
+    def visibles_para(self, usuario):
+        """Todo para administradores y auditores; para un usuario de unidad, solo lo de su unidad"""
+        return self.de_unidad(usuario.unidad_id) if usuario.rol == 'UNIDAD' else self
+
+
+class ProyectoQuerySet(AmbitoUnidadQuerySet):
+    """
+    Consultas frecuentes de proyectos. Ordenan por columnas propias para no unir la
+    tabla de unidades del orden por defecto y aprovechar los índices compuestos.
+    """
+
+    def aprobados_de(self, usuario):
+        """POAs aprobados de una unidad, el más reciente primero (con .first(), el de referencia)"""
+        return self.filter(unidad=usuario, estado='APROBADO').order_by('-anio', 'id')
+
+    def pendientes_revision(self):
+        return self.filter(estado='ENVIADO').order_by('-fecha_modificacion')
+
+    def no_planificado(self, usuario, anio):
+        """Proyecto contenedor de las actividades no planificadas del año"""
+        return self.filter(unidad=usuario, anio=anio, es_no_planificado=True).order_by('id')
 
 
 class Proyecto(models.Model):
     """Modelo para los proyectos de una unidad"""
+    RUTA_USUARIO = 'unidad'
+
     ESTADOS = [
         ('BORRADOR', 'Borrador'),
         ('ENVIADO', 'Enviado'),
@@ -18,7 +63,8 @@ class Proyecto(models.Model):
         on_delete=models.PROTECT, 
         verbose_name='Unidad',
         related_name='proyectos',
-        limit_choices_to={'rol': 'UNIDAD'}
+        limit_choices_to={'rol': 'UNIDAD'},
+        db_index=False,  # Cubierto por los índices compuestos que empiezan por unidad
     )
     nombre = models.CharField(max_length=200, verbose_name='Nombre del Proyecto', blank=True, null=True)
     objetivo_unidad = models.CharField(max_length=1000, verbose_name='Objetivo de la Unidad', blank=True)
@@ -48,10 +94,17 @@ class Proyecto(models.Model):
     fecha_modificacion = models.DateTimeField(auto_now=True, verbose_name='Última Modificación')
     es_no_planificado = models.BooleanField(default=False, verbose_name='Es Proyecto No Planificado')
     
+    objects = ProyectoQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Proyecto'
         verbose_name_plural = 'Proyectos'
         ordering = ['-anio', 'unidad__unidad__nombre', 'id']
+        indexes = [
+            models.Index(fields=['unidad', 'estado', '-anio'], name='poa_proy_unidad_estado_idx'),
+            models.Index(fields=['estado', '-fecha_modificacion'], name='poa_proy_estado_fmod_idx'),
+            models.Index(fields=['unidad', 'anio', 'es_no_planificado'], name='poa_proy_unidad_anio_np_idx'),
+        ]
     
     def __str__(self):
         return f"{self.nombre} ({self.anio})"
@@ -64,16 +117,34 @@ class Proyecto(models.Model):
         """Verifica si el proyecto puede ser enviado para revisión"""
         return self.estado == 'BORRADOR' and self.metas.exists()
 
+    # Segundos durante los que se agrupan los registros de avance en una sola
+    # actualización de fecha_modificacion
+    INTERVALO_MODIFICACION = 60
+
+    def registrar_modificacion(self):
+        """
+        Actualiza fecha_modificacion como máximo una vez por intervalo: cuando varios
+        miembros de la unidad registran avances, la fila del proyecto no se escribe en cada uno.
+        """
+        if cache.add(f'proyecto:{self.id}:modificado', True, self.INTERVALO_MODIFICACION):
+            self.fecha_modificacion = timezone.now()
+            Proyecto.objects.filter(id=self.id).update(fecha_modificacion=self.fecha_modificacion)
+            RegistroCambio.objects.registrar_filas(Proyecto.objects.filter(id=self.id))
+
 
 class MetaProyecto(models.Model):
     """Modelo para las metas de un proyecto"""
+    RUTA_USUARIO = 'proyecto__unidad'
+
     proyecto = models.ForeignKey(Proyecto, on_delete=models.CASCADE, related_name='metas', verbose_name='Proyecto')
     descripcion = models.CharField(max_length=200, verbose_name='Descripción de la Meta')
     
+    objects = AmbitoUnidadQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Meta'
         verbose_name_plural = 'Metas'
-        ordering = ['proyecto', 'id']
+        ordering = ['proyecto_id', 'id']
     
     def __str__(self):
         return f"Meta {self.id} - {self.proyecto.nombre}"
@@ -110,6 +181,8 @@ class ObjetivoEstrategico(models.Model):
 
 class Actividad(models.Model):
     """Modelo para las actividades de una meta"""
+    RUTA_USUARIO = 'meta__proyecto__unidad'
+
     meta = models.ForeignKey(MetaProyecto, on_delete=models.CASCADE, related_name='actividades', verbose_name='Meta')
     descripcion = models.CharField(max_length=500, verbose_name='Descripción de la Actividad')
     unidad_medida = models.CharField(max_length=80, verbose_name='Unidad de Medida')
@@ -131,17 +204,93 @@ class Actividad(models.Model):
     observaciones = models.CharField(max_length=500, blank=True, verbose_name='Observaciones')
     fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')
     
+    objects = AmbitoUnidadQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Actividad'
         verbose_name_plural = 'Actividades'
-        ordering = ['meta', 'id']
+        ordering = ['meta_id', 'id']
     
     def __str__(self):
         return f"Actividad {self.id} - {self.meta.proyecto.nombre}"
 
 
+def _campos_calculados(realizado):
+    """Expresiones SQL del cumplimiento y de si hay unidades no planificadas para `realizado`"""
+    programado = F('cantidad_programada_mes')
+    return {
+        'cumplimiento': porcentaje_cumplimiento_sql(Least(realizado, programado), programado),
+        'es_no_planificada': Case(When(GreaterThan(realizado, programado), then=Value(True)), default=Value(False)),
+    }
+
+
+class AvanceMensualQuerySet(AmbitoUnidadQuerySet):
+    """QuerySet de los avances mensuales"""
+
+    def registrar_realizado(self, cantidad, version=None):
+        """
+        Registra la cantidad realizada con un solo UPDATE que calcula en SQL el
+        cumplimiento y si hay unidades no planificadas. Con version, solo actualiza
+        si nadie modificó el avance desde que se leyó (concurrencia optimista).
+        Los avances actualizados se anotan en la bandeja de cambios.
+        Retorna la cantidad de avances actualizados.
+        """
+        avances = self if version is None else self.filter(version=version)
+        actualizados = avances.update(
+            cantidad_realizada=cantidad,
+            version=F('version') + 1,
+            fecha_actualizacion=timezone.now(),
+            **_campos_calculados(Value(cantidad)),
+        )
+        if actualizados:
+            RegistroCambio.objects.registrar_filas(self if version is None else self.filter(version=version + 1))
+        return actualizados
+
+    def registrar_realizados(self, cambios):
+        """
+        Registra varias cantidades realizadas a la vez. cambios: {avance_id: (cantidad, version)}.
+        Un UPDATE asigna las cantidades de los avances cuya versión coincide y otro
+        recalcula su cumplimiento; conviene llamarlo dentro de una transacción.
+        Retorna la cantidad de avances actualizados.
+        """
+        if not cambios:
+            return 0
+        coincide = Q()
+        for avance_id, (_, version) in cambios.items():
+            coincide |= Q(id=avance_id, version=version)
+        cantidad = Case(
+            *[When(id=avance_id, then=Value(cantidad)) for avance_id, (cantidad, _) in cambios.items()],
+            output_field=models.IntegerField(),
+        )
+        actualizados = self.filter(coincide).update(
+            cantidad_realizada=cantidad,
+            version=F('version') + 1,
+            fecha_actualizacion=timezone.now(),
+        )
+        self.filter(id__in=cambios).recalcular_cumplimiento()
+        if actualizados:
+            guardados = Q()
+            for avance_id, (_, version) in cambios.items():
+                guardados |= Q(id=avance_id, version=version + 1)
+            RegistroCambio.objects.registrar_filas(self.filter(guardados))
+        return actualizados
+
+    def recalcular_cumplimiento(self):
+        """Recalcula en SQL el cumplimiento y si hay unidades no planificadas con las cantidades guardadas"""
+        return self.update(**_campos_calculados(F('cantidad_realizada')))
+
+    def totales_por_mes(self):
+        """Cumplimiento promedio (sin los que no aplican), programado y realizado agrupados por mes"""
+        return self.order_by().values('mes').annotate(
+            promedio=Avg('cumplimiento'),
+            programado=Sum('cantidad_programada_mes'),
+            realizado=Sum('cantidad_realizada'),
+        )
+
+
 class AvanceMensual(models.Model):
     """Modelo para el avance mensual de una actividad"""
+    RUTA_USUARIO = 'actividad__meta__proyecto__unidad'
     MESES = [
         (1, 'Enero'), (2, 'Febrero'), (3, 'Marzo'), (4, 'Abril'),
         (5, 'Mayo'), (6, 'Junio'), (7, 'Julio'), (8, 'Agosto'),
@@ -180,12 +329,21 @@ class AvanceMensual(models.Model):
     causal_incumplimiento = models.CharField(max_length=500, blank=True, verbose_name='Causal de Incumplimiento')
     es_no_planificada = models.BooleanField(default=False, verbose_name='Es No Planificada')
     fecha_actualizacion = models.DateTimeField(auto_now=True, verbose_name='Fecha de Actualización')
+    # Se incrementa en cada escritura; los formularios de avance la envían para detectar
+    # ediciones simultáneas
+    version = models.PositiveIntegerField(default=0, editable=False, verbose_name='Versión')
+
+    objects = AvanceMensualQuerySet.as_manager()
     
     class Meta:
         verbose_name = 'Avance Mensual'
         verbose_name_plural = 'Avances Mensuales'
         unique_together = ['actividad', 'mes', 'anio']
-        ordering = ['actividad', 'anio', 'mes']
+        ordering = ['actividad_id', 'anio', 'mes']
+        indexes = [
+            models.Index(fields=['mes', 'cumplimiento'], name='poa_avance_mes_cump_idx'),
+            models.Index(fields=['fecha_actualizacion'], name='poa_avance_fact_idx'),
+        ]
     
 
     def calcular_cumplimiento(self):
@@ -194,27 +352,37 @@ class AvanceMensual(models.Model):
         - Si no hay programación, el cumplimiento NO SE CALCULA -> se marca como None
         """
         try:
-            if self.cantidad_programada_mes > 0:
-                cantidad_para_calculo = min(self.cantidad_realizada, self.cantidad_programada_mes)
-                porcentaje = (Decimal(cantidad_para_calculo) / Decimal(self.cantidad_programada_mes)) * 100
-                self.cumplimiento = min(round(porcentaje, 2), Decimal('100.00'))
+            programado = int(self.cantidad_programada_mes or 0)
+            if programado > 0:
+                realizado = min(int(self.cantidad_realizada or 0), programado)
+                # Aritmética entera: evita crear varios Decimal por cada guardado
+                self.cumplimiento = porcentaje_cumplimiento(realizado, programado)
             else:
                 # NO SE CALCULA → "No aplica"
                 self.cumplimiento = None
-        except (InvalidOperation, Exception):
+        except (TypeError, ValueError):
             self.cumplimiento = None
 
     
     def save(self, *args, **kwargs):
         self.calcular_cumplimiento()
+        self.version += 1
         super().save(*args, **kwargs)
     
     def __str__(self):
         return f"{self.actividad} - {self.get_mes_display()} {self.anio}"
 
 
+class EvidenciaQuerySet(AmbitoUnidadQuerySet):
+    """QuerySet de las evidencias"""
+
+    def del_mes(self, actividad, mes):
+        return self.filter(actividad=actividad, mes=mes)
+
+
 class Evidencia(models.Model):
     """Modelo para evidencias de actividades"""
+    RUTA_USUARIO = 'actividad__meta__proyecto__unidad'
     TIPOS = [
         ('PDF', 'PDF'),
         ('FOTO', 'Foto'),
@@ -236,15 +404,48 @@ class Evidencia(models.Model):
     )
     fecha_subida = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Subida')
     
+    objects = EvidenciaQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Evidencia'
         verbose_name_plural = 'Evidencias'
         ordering = ['-fecha_subida']
+        indexes = [
+            models.Index(fields=['actividad', 'mes'], name='poa_evid_actividad_mes_idx'),
+        ]
     
     def __str__(self):
         return f"{self.tipo} - {self.actividad}"
 
 
+class AuditoriaLogManager(models.Manager):
+    """Manager de los logs de auditoría"""
+
+    CLAVE_ACCIONES = 'auditoria:acciones'
+    TIEMPO_CACHE_ACCIONES = 60 * 60
+
+    def acciones_distintas(self):
+        """
+        Retorna la lista de acciones registradas, cacheada para no recorrer
+        toda la tabla en cada carga del visor de logs.
+        """
+        acciones = cache.get(self.CLAVE_ACCIONES)
+        if acciones is None:
+            acciones = sorted(
+                self.get_queryset().order_by().values_list('accion', flat=True).distinct()
+            )
+            cache.set(self.CLAVE_ACCIONES, acciones, self.TIEMPO_CACHE_ACCIONES)
+        return acciones
+
+    def invalidar_acciones(self, accion=None):
+        """Descarta la lista cacheada si la acción indicada aún no figura en ella"""
+        if accion is not None:
+            acciones = cache.get(self.CLAVE_ACCIONES)
+            if acciones is not None and accion in acciones:
+                return
+        cache.delete(self.CLAVE_ACCIONES)
+
+
 class AuditoriaLog(models.Model):
     """Modelo para auditoría de cambios"""
     usuario = models.ForeignKey(Usuario, on_delete=models.SET_NULL, null=True, verbose_name='Usuario')
@@ -256,21 +457,175 @@ class AuditoriaLog(models.Model):
     fecha = models.DateTimeField(auto_now_add=True, verbose_name='Fecha')
     ip = models.GenericIPAddressField(null=True, blank=True, verbose_name='Dirección IP')
     
+    objects = AuditoriaLogManager()
+    
     class Meta:
         verbose_name = 'Log de Auditoría'
         verbose_name_plural = 'Logs de Auditoría'
         ordering = ['-fecha']
+        # Sirven al orden por fecha (cursor del visor) y a los filtros exactos por acción
+        # o usuario; la búsqueda por subcadena (icontains) no los aprovecha
+        indexes = [
+            models.Index(fields=['-fecha', '-id'], name='poa_log_fecha_idx'),
+            models.Index(fields=['accion', '-fecha'], name='poa_log_accion_fecha_idx'),
+            models.Index(fields=['usuario', '-fecha'], name='poa_log_usuario_fecha_idx'),
+        ]
     
     def __str__(self):
         return f"{self.accion} - {self.tabla} - {self.fecha}"
 
 
+class AuditoriaLogArchivo(models.Model):
+    """
+    Logs de auditoría archivados. Los registros antiguos se mueven aquí por año
+    (comando archivar_logs) para que la tabla principal se mantenga pequeña.
+    """
+    anio = models.IntegerField(verbose_name='Año')
+    usuario = models.ForeignKey(Usuario, on_delete=models.SET_NULL, null=True, verbose_name='Usuario')
+    accion = models.CharField(max_length=50, verbose_name='Acción')
+    tabla = models.CharField(max_length=50, verbose_name='Tabla')
+    registro_id = models.IntegerField(verbose_name='ID del Registro')
+    datos_anteriores = models.JSONField(null=True, blank=True, verbose_name='Datos Anteriores')
+    datos_nuevos = models.JSONField(null=True, blank=True, verbose_name='Datos Nuevos')
+    fecha = models.DateTimeField(verbose_name='Fecha')
+    ip = models.GenericIPAddressField(null=True, blank=True, verbose_name='Dirección IP')
+    
+    class Meta:
+        verbose_name = 'Log de Auditoría Archivado'
+        verbose_name_plural = 'Logs de Auditoría Archivados'
+        ordering = ['-fecha']
+        # También cubre los filtros solo por año
+        indexes = [
+            models.Index(fields=['anio', '-fecha'], name='poa_logarch_anio_fecha_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.accion} - {self.tabla} - {self.fecha} (archivado)"
 
 
+class IndiceBusqueda(models.Model):
+    """
+    Documento de búsqueda de texto completo. Se mantiene sincronizado mediante
+    señales (ver poa/busqueda.py) y se consulta con FTS5 o tsvector según el motor.
+    """
+    TIPOS = [
+        ('PROYECTO', 'Proyecto'),
+        ('META', 'Meta'),
+        ('ACTIVIDAD', 'Actividad'),
+        ('UNIDAD', 'Unidad'),
+    ]
+    
+    tipo = models.CharField(max_length=10, choices=TIPOS, verbose_name='Tipo')
+    objeto_id = models.BigIntegerField(verbose_name='ID del Objeto')
+    proyecto = models.ForeignKey(Proyecto, on_delete=models.CASCADE, null=True, blank=True, related_name='+', verbose_name='Proyecto')
+    unidad = models.ForeignKey(Unidad, on_delete=models.CASCADE, related_name='+', verbose_name='Unidad')
+    titulo = models.CharField(max_length=500, verbose_name='Título')
+    texto = models.TextField(verbose_name='Texto indexado')
+    
+    class Meta:
+        verbose_name = 'Documento de Búsqueda'
+        verbose_name_plural = 'Índice de Búsqueda'
+        unique_together = ['tipo', 'objeto_id']
+    
+    def __str__(self):
+        return f"{self.get_tipo_display()}: {self.titulo[:50]}"
+
+
+def _estado(objeto):
+    """Valores de las columnas de un objeto (los archivos, por su ruta)"""
+    datos = {}
+    for campo in objeto._meta.concrete_fields:
+        valor = getattr(objeto, campo.attname)
+        datos[campo.attname] = valor.name if isinstance(valor, FieldFile) else valor
+    return datos
+
+
+class RegistroCambioQuerySet(models.QuerySet):
+    """QuerySet de la bandeja de cambios"""
+
+    def registrar(self, objeto, operacion):
+        """Registra el estado en memoria de un objeto guardado o eliminado"""
+        return self.create(
+            tabla=MODELOS_REGISTRADOS[type(objeto)], objeto_id=objeto.pk, operacion=operacion, datos=_estado(objeto)
+        )
+
+    def registrar_lote(self, objetos, operacion='CREAR'):
+        """Registra objetos creados con bulk_create (que no emite señales)"""
+        return self.bulk_create([
+            RegistroCambio(tabla=MODELOS_REGISTRADOS[type(objeto)], objeto_id=objeto.pk,
+                           operacion=operacion, datos=_estado(objeto))
+            for objeto in objetos
+        ], batch_size=500)
+
+    def registrar_filas(self, consulta, operacion='ACTUALIZAR'):
+        """Registra el estado actual de las filas de `consulta`, modificadas con update() (que no emite señales)"""
+        campos = [campo.attname for campo in consulta.model._meta.concrete_fields]
+        tabla = MODELOS_REGISTRADOS[consulta.model]
+        return self.bulk_create([
+            RegistroCambio(tabla=tabla, objeto_id=fila['id'], operacion=operacion, datos=fila)
+            for fila in consulta.order_by().values(*campos)
+        ], batch_size=500)
+
+    def desde(self, cursor, limite):
+        """Los cambios posteriores al cursor (id del último cambio leído), del más antiguo al más nuevo"""
+        return self.filter(id__gt=cursor).order_by('id')[:limite]
+
+
+class RegistroCambio(models.Model):
+    """
+    Bandeja de cambios de solo inserción: cada alta, modificación o baja de proyectos,
+    metas, actividades, avances y evidencias deja una fila con el estado del registro,
+    para que los consumidores de analítica sincronicen por cursor (el id) en lugar de
+    copiar la base completa. Se escribe en la misma transacción que el cambio.
+    """
+    TABLAS = [
+        ('PROYECTO', 'Proyecto'),
+        ('META', 'Meta'),
+        ('ACTIVIDAD', 'Actividad'),
+        ('AVANCE', 'Avance Mensual'),
+        ('EVIDENCIA', 'Evidencia'),
+    ]
+    OPERACIONES = [
+        ('CREAR', 'Creación'),
+        ('ACTUALIZAR', 'Actualización'),
+        ('ELIMINAR', 'Eliminación'),
+    ]
 
+    tabla = models.CharField(max_length=10, choices=TABLAS, verbose_name='Tabla')
+    objeto_id = models.BigIntegerField(verbose_name='ID del Registro')
+    operacion = models.CharField(max_length=10, choices=OPERACIONES, verbose_name='Operación')
+    datos = models.JSONField(encoder=DjangoJSONEncoder, verbose_name='Datos')
+    fecha = models.DateTimeField(auto_now_add=True, verbose_name='Fecha')
 
+    objects = RegistroCambioQuerySet.as_manager()
 
+    class Meta:
+        verbose_name = 'Registro de Cambio'
+        verbose_name_plural = 'Registro de Cambios'
+        ordering = ['id']
+        indexes = [
+            # Sincronización incremental de la API por fecha (modelos sin fecha de modificación)
+            models.Index(fields=['tabla', 'fecha'], name='poa_cambio_tabla_fecha_idx'),
+        ]
 
-
-
-
+    def __str__(self):
+        return f"{self.id}: {self.operacion} {self.tabla} {self.objeto_id}"
+
+    def como_dict(self):
+        return {
+            'id': self.id,
+            'tabla': self.tabla,
+            'objeto_id': self.objeto_id,
+            'operacion': self.operacion,
+            'fecha': self.fecha,
+            'datos': self.datos,
+        }
+
+
+MODELOS_REGISTRADOS = {
+    Proyecto: 'PROYECTO',
+    MetaProyecto: 'META',
+    Actividad: 'ACTIVIDAD',
+    AvanceMensual: 'AVANCE',
+    Evidencia: 'EVIDENCIA',
+}
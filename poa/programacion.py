@@ -0,0 +1,33 @@
+"""
+Matriz de programación mensual de un proyecto (actividades × 12 meses) cargada con una
+sola consulta agrupada, para que las plantillas recorran las filas sin buscar cada
+celda en diccionarios anidados.
+"""
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce
+
+from .models import Actividad, AvanceMensual
+
+
+def matriz_programacion(proyecto):
+    """
+    Lista de filas {'actividad', 'cantidades', 'meses', 'total'} en el orden de las
+    actividades: cantidades tiene las 12 cantidades programadas (enero a diciembre) y
+    meses las tuplas (mes, nombre, cantidad) para la plantilla.
+    """
+    columnas = {
+        f'programado_mes_{mes}': Coalesce(Sum('avances__cantidad_programada_mes', filter=Q(avances__mes=mes)), 0)
+        for mes, _ in AvanceMensual.MESES
+    }
+    actividades = Actividad.objects.filter(meta__proyecto=proyecto).select_related('meta').annotate(**columnas)
+
+    filas = []
+    for actividad in actividades:
+        cantidades = [getattr(actividad, columna) for columna in columnas]
+        filas.append({
+            'actividad': actividad,
+            'cantidades': cantidades,
+            'meses': [(mes, nombre, cantidad) for (mes, nombre), cantidad in zip(AvanceMensual.MESES, cantidades)],
+            'total': sum(cantidades),
+        })
+    return filas
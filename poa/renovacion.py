@@ -0,0 +1,149 @@
+"""
+Renovación anual de los POA: copia proyectos aprobados (metas, actividades y
+programación mensual, opcionalmente escalada) a un nuevo año como borradores que cada
+unidad revisa y envía. Cada unidad se copia en su propia transacción con inserciones
+masivas. Usado por el comando clonar_poas y por la acción del admin de Django.
+"""
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.db.models import Prefetch
+
+from .models import Proyecto, MetaProyecto, Actividad, AvanceMensual
+from .signals import despues_de_crear_en_lote
+
+MESES = range(1, 13)
+MAXIMO_CANTIDAD = 999999
+
+
+def _escalar(cantidad, factor):
+    if factor == 1:
+        return cantidad
+    return min(int((Decimal(cantidad) * factor).quantize(Decimal(1), rounding=ROUND_HALF_UP)), MAXIMO_CANTIDAD)
+
+
+def _nombre_destino(proyecto, anio):
+    nombre = proyecto.nombre or ''
+    if str(proyecto.anio) in nombre:
+        return nombre.replace(str(proyecto.anio), str(anio))
+    return nombre or f'Proyecto Operativo {anio}'
+
+
+def _cargar(proyectos):
+    """Proyectos con metas, actividades y avances de su año en cuatro consultas"""
+    return list(
+        proyectos.select_related('unidad__unidad').prefetch_related(
+            Prefetch('metas', queryset=MetaProyecto.objects.order_by('id')),
+            Prefetch('metas__actividades', queryset=Actividad.objects.order_by('id')),
+            Prefetch('metas__actividades__avances', queryset=AvanceMensual.objects.only(
+                'id', 'actividad_id', 'mes', 'anio', 'cantidad_programada_mes'
+            )),
+        )
+    )
+
+
+def _copiar_unidad(origenes, anio, factor, programacion, resumen):
+    """Copia los proyectos de una unidad y suma lo creado al resumen"""
+    existentes = set(
+        Proyecto.objects.filter(unidad=origenes[0].unidad, anio__in={anio or p.anio + 1 for p in origenes},
+                                es_no_planificado=False)
+        .values_list('anio', 'nombre')
+    )
+    copias = []
+    for origen in origenes:
+        destino = anio or origen.anio + 1
+        nombre = _nombre_destino(origen, destino)
+        if (destino, nombre) in existentes:
+            resumen['omitidos'].append((origen, f'la unidad ya tiene "{nombre}" en {destino}'))
+            continue
+        existentes.add((destino, nombre))
+        copia = Proyecto(
+            unidad=origen.unidad, nombre=nombre, objetivo_unidad=origen.objetivo_unidad,
+            anio=destino, estado='BORRADOR',
+        )
+        copias.append((origen, copia))
+    if not copias:
+        return
+
+    Proyecto.objects.bulk_create([copia for _, copia in copias])
+
+    metas = []
+    for origen, copia in copias:
+        for meta in origen.metas.all():
+            metas.append((origen.anio, meta, MetaProyecto(proyecto=copia, descripcion=meta.descripcion)))
+    MetaProyecto.objects.bulk_create([nueva for _, _, nueva in metas])
+
+    actividades = []
+    for anio_origen, meta, nueva_meta in metas:
+        for actividad in meta.actividades.all():
+            meses = {avance.mes: avance.cantidad_programada_mes for avance in actividad.avances.all()
+                     if avance.anio == anio_origen}
+            escalados = [_escalar(meses.get(mes, 0), factor) if programacion else 0 for mes in MESES]
+            cantidad = _escalar(actividad.cantidad_programada, factor)
+            if programacion and sum(meses.values()) == actividad.cantidad_programada:
+                # Se mantiene la regla del wizard: la programación suma la cantidad programada
+                cantidad = min(sum(escalados), MAXIMO_CANTIDAD)
+            nueva = Actividad(
+                meta=nueva_meta, descripcion=actividad.descripcion, unidad_medida=actividad.unidad_medida,
+                cantidad_programada=cantidad, es_cuantificable=actividad.es_cuantificable,
+                medio_verificacion=actividad.medio_verificacion, recursos=actividad.recursos,
+                total_recursos=actividad.total_recursos, observaciones=actividad.observaciones,
+            )
+            actividades.append((nueva, escalados))
+    Actividad.objects.bulk_create([nueva for nueva, _ in actividades])
+
+    avances = []
+    for actividad, escalados in actividades:
+        for mes, cantidad in zip(MESES, escalados):
+            avance = AvanceMensual(
+                actividad=actividad, mes=mes, anio=actividad.meta.proyecto.anio, cantidad_programada_mes=cantidad
+            )
+            avance.calcular_cumplimiento()
+            avances.append(avance)
+    AvanceMensual.objects.bulk_create(avances, batch_size=500)
+
+    despues_de_crear_en_lote(
+        origenes[0].unidad.unidad_id,
+        proyectos=[copia for _, copia in copias],
+        metas=[nueva for _, _, nueva in metas],
+        actividades=[nueva for nueva, _ in actividades],
+        avances=avances,
+    )
+
+    resumen['proyectos'].extend(copia for _, copia in copias)
+    resumen['metas'] += len(metas)
+    resumen['actividades'] += len(actividades)
+    resumen['avances'] += len(avances)
+
+
+def clonar_proyectos(proyectos, anio=None, factor=1, programacion=True, dry_run=False):
+    """
+    Copia los proyectos aprobados del queryset al año `anio` (por defecto, el siguiente
+    al de cada proyecto) como borradores. `factor` escala las cantidades programadas;
+    con programacion=False los meses quedan en 0 para programarlos de nuevo.
+    Omite los proyectos no aprobados y los que la unidad ya tiene en el año destino.
+    Con dry_run hace la copia completa y la revierte: el resumen (omitidos y totales) es
+    el mismo que daría la ejecución real.
+    Retorna {'proyectos': [copias], 'metas', 'actividades', 'avances', 'omitidos': [(proyecto, motivo)]}.
+    """
+    if dry_run:
+        with transaction.atomic():
+            resumen = clonar_proyectos(proyectos, anio, factor, programacion)
+            transaction.set_rollback(True)
+        return resumen
+
+    factor = Decimal(str(factor))
+    resumen = {'proyectos': [], 'metas': 0, 'actividades': 0, 'avances': 0, 'omitidos': []}
+
+    por_unidad = defaultdict(list)
+    for proyecto in _cargar(proyectos.filter(es_no_planificado=False)):
+        if proyecto.estado != 'APROBADO':
+            resumen['omitidos'].append((proyecto, 'no está aprobado'))
+        else:
+            por_unidad[proyecto.unidad_id].append(proyecto)
+
+    for origenes in por_unidad.values():
+        with transaction.atomic():
+            _copiar_unidad(origenes, anio, factor, programacion, resumen)
+    return resumen
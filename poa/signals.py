@@ -0,0 +1,220 @@
+"""
+Señales de la app POA.
+Mantienen sincronizadas las cachés, el índice de búsqueda y la bandeja de cambios
+derivados de los modelos.
+"""
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from login.models import Usuario, Unidad
+from utils.cache import incrementar_version
+from utils.estadisticas import espacio_unidad
+from . import busqueda
+from .models import (
+    AuditoriaLog, Proyecto, MetaProyecto, Actividad, AvanceMensual, Evidencia,
+    MetaPredeterminada, ObjetivoEstrategico, RegistroCambio, MODELOS_REGISTRADOS,
+)
+
+CAMPOS_INDEXADOS = {
+    Proyecto: {'nombre', 'objetivo_unidad', 'anio', 'unidad'},
+    MetaProyecto: {'descripcion', 'proyecto'},
+    Actividad: {'descripcion', 'medio_verificacion', 'meta'},
+    Usuario: {'email', 'rol', 'unidad'},
+}
+
+
+def _afecta_indice(sender, update_fields):
+    """Evita reindexar en guardados parciales que no tocan campos indexados"""
+    if update_fields is not None and not CAMPOS_INDEXADOS[sender] & set(update_fields):
+        return False
+    return busqueda.indice_disponible()
+
+
+@receiver(post_save, sender=AuditoriaLog)
+def log_guardado(sender, instance, created, **kwargs):
+    """Invalida la lista cacheada de acciones (si la acción es nueva) y los logs recientes"""
+    if created:
+        AuditoriaLog.objects.invalidar_acciones(instance.accion)
+        incrementar_version('auditoria')
+
+
+# --- Índice de búsqueda ---
+
+@receiver(post_save, sender=Proyecto)
+def proyecto_guardado_indice(sender, instance, update_fields=None, **kwargs):
+    if _afecta_indice(sender, update_fields):
+        busqueda.indexar_proyecto(instance)
+
+
+@receiver(post_save, sender=MetaProyecto)
+def meta_guardada_indice(sender, instance, update_fields=None, **kwargs):
+    if _afecta_indice(sender, update_fields):
+        busqueda.indexar_meta(instance)
+
+
+@receiver(post_save, sender=Actividad)
+def actividad_guardada_indice(sender, instance, update_fields=None, **kwargs):
+    if _afecta_indice(sender, update_fields):
+        busqueda.indexar_actividad(instance)
+
+
+@receiver(post_save, sender=Usuario)
+def usuario_guardado_indice(sender, instance, update_fields=None, **kwargs):
+    if _afecta_indice(sender, update_fields):
+        busqueda.indexar_usuario_unidad(instance)
+
+
+@receiver(post_save, sender=Unidad)
+def unidad_guardada_indice(sender, instance, created, **kwargs):
+    """El nombre de la unidad forma parte de los documentos de sus usuarios y proyectos"""
+    if created or not busqueda.indice_disponible():
+        return
+    for usuario in Usuario.objects.filter(unidad=instance, rol='UNIDAD').select_related('unidad'):
+        busqueda.indexar_usuario_unidad(usuario)
+    for proyecto in Proyecto.objects.filter(unidad__unidad=instance).select_related('unidad__unidad'):
+        busqueda.indexar_proyecto(proyecto)
+
+
+@receiver(post_delete, sender=Proyecto)
+def proyecto_eliminado_indice(sender, instance, **kwargs):
+    busqueda.eliminar_del_indice('PROYECTO', instance.id)
+
+
+@receiver(post_delete, sender=MetaProyecto)
+def meta_eliminada_indice(sender, instance, **kwargs):
+    busqueda.eliminar_del_indice('META', instance.id)
+
+
+@receiver(post_delete, sender=Actividad)
+def actividad_eliminada_indice(sender, instance, **kwargs):
+    busqueda.eliminar_del_indice('ACTIVIDAD', instance.id)
+
+
+@receiver(post_delete, sender=Usuario)
+def usuario_eliminado_indice(sender, instance, **kwargs):
+    busqueda.eliminar_del_indice('UNIDAD', instance.id)
+
+
+# --- Bandeja de cambios ---
+
+def registrar_guardado(sender, instance, created, raw=False, **kwargs):
+    # Las cargas de fixtures (raw) no son cambios de los usuarios
+    if not raw:
+        RegistroCambio.objects.registrar(instance, 'CREAR' if created else 'ACTUALIZAR')
+
+
+def registrar_eliminado(sender, instance, **kwargs):
+    RegistroCambio.objects.registrar(instance, 'ELIMINAR')
+
+
+for modelo in MODELOS_REGISTRADOS:
+    post_save.connect(registrar_guardado, sender=modelo, dispatch_uid=f'registro_cambio_guardado_{modelo.__name__}')
+    post_delete.connect(registrar_eliminado, sender=modelo, dispatch_uid=f'registro_cambio_eliminado_{modelo.__name__}')
+
+
+# --- Versiones de datos cacheados ---
+
+CAMPOS_DIRECTORIO_USUARIO = {'email', 'rol', 'unidad'}
+
+# Camino hasta la unidad (login.Unidad) desde el padre que conoce cada objeto modificado
+RUTAS_UNIDAD = {
+    Usuario: 'unidad_id',
+    Proyecto: 'unidad__unidad_id',
+    MetaProyecto: 'proyecto__unidad__unidad_id',
+    Actividad: 'meta__proyecto__unidad__unidad_id',
+}
+
+# Padres cuyas unidades se invalidan al confirmar la transacción en curso (por hilo)
+_padres_pendientes = threading.local()
+
+
+def _invalidar_unidad_de(modelo, objeto_id):
+    """
+    Invalida el espacio de la unidad del objeto indicado al confirmar la transacción.
+    Las unidades de todos los objetos acumulados se resuelven juntas, con una consulta
+    por modelo, en lugar de una por cada avance guardado o borrado en cascada.
+    """
+    if not hasattr(_padres_pendientes, 'ids'):
+        _padres_pendientes.ids = defaultdict(set)
+    _padres_pendientes.ids[modelo].add(objeto_id)
+    transaction.on_commit(_invalidar_unidades_pendientes)
+
+
+def _invalidar_unidades_pendientes():
+    pendientes = getattr(_padres_pendientes, 'ids', None)
+    if not pendientes:
+        return
+    _padres_pendientes.ids = defaultdict(set)
+    unidades = set()
+    for modelo, ids in pendientes.items():
+        # Los padres borrados en la misma transacción ya invalidaron su unidad en su propia señal
+        unidades.update(modelo.objects.filter(id__in=ids).values_list(RUTAS_UNIDAD[modelo], flat=True))
+    incrementar_version(*(espacio_unidad(unidad_id) for unidad_id in unidades))
+
+
+@receiver([post_save, post_delete], sender=Proyecto)
+def proyecto_modificado(sender, instance, **kwargs):
+    """Invalida el directorio de unidades y los agregados de los dashboards (global y de la unidad)"""
+    incrementar_version('unidades', 'dashboard')
+    _invalidar_unidad_de(Usuario, instance.unidad_id)
+
+
+@receiver(post_delete, sender=MetaProyecto)
+def meta_eliminada(sender, instance, **kwargs):
+    _invalidar_unidad_de(Proyecto, instance.proyecto_id)
+
+
+@receiver(post_delete, sender=Actividad)
+def actividad_eliminada(sender, instance, **kwargs):
+    # En un borrado en cascada la meta se borra después que sus actividades
+    _invalidar_unidad_de(MetaProyecto, instance.meta_id)
+
+
+@receiver([post_save, post_delete], sender=AvanceMensual)
+def avance_modificado(sender, instance, **kwargs):
+    # No invalida 'unidades': el directorio de unidades refresca el cumplimiento por antigüedad
+    incrementar_version('dashboard')
+    _invalidar_unidad_de(Actividad, instance.actividad_id)
+
+
+@receiver([post_save, post_delete], sender=Evidencia)
+def evidencia_modificada(sender, **kwargs):
+    incrementar_version('dashboard')
+
+
+@receiver([post_save, post_delete], sender=Unidad)
+def unidad_modificada(sender, **kwargs):
+    incrementar_version('unidades', 'dashboard')
+
+
+@receiver([post_save, post_delete], sender=Usuario)
+def usuario_modificado(sender, update_fields=None, **kwargs):
+    # El login guarda last_login en cada inicio de sesión; no afecta a los agregados
+    if update_fields is None or CAMPOS_DIRECTORIO_USUARIO & set(update_fields):
+        incrementar_version('unidades', 'dashboard')
+
+
+@receiver([post_save, post_delete], sender=MetaPredeterminada)
+@receiver([post_save, post_delete], sender=ObjetivoEstrategico)
+def catalogo_modificado(sender, **kwargs):
+    """Los catálogos en memoria de cada proceso se recargan en la siguiente consulta"""
+    incrementar_version('catalogos')
+
+
+# --- Altas en lote ---
+
+def despues_de_crear_en_lote(unidad_id, proyectos=(), metas=(), actividades=(), avances=()):
+    """
+    Hace lo que harían las señales con objetos creados con bulk_create (que no las emite):
+    los indexa, los registra en la bandeja de cambios e invalida las cachés de la unidad.
+    """
+    if busqueda.indice_disponible():
+        busqueda.indexar_lote('PROYECTO', proyectos)
+        busqueda.indexar_lote('META', metas)
+        busqueda.indexar_lote('ACTIVIDAD', actividades)
+    RegistroCambio.objects.registrar_lote([*proyectos, *metas, *actividades, *avances])
+    incrementar_version('unidades', 'dashboard', espacio_unidad(unidad_id))
@@ -1,3 +1,702 @@
-from django.test import TestCase
+import gzip
+import json
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from login.models import Unidad, Usuario
+from utils.cache import CacheArchivos, incrementar_version, version_datos
+from utils.cumplimiento import porcentaje_cumplimiento
+from utils.estadisticas import espacio_unidad
+from . import busqueda, renovacion, signals, validacion
+from .models import Proyecto, MetaProyecto, Actividad, AvanceMensual, Evidencia, IndiceBusqueda, RegistroCambio
+
+
+class DatosPOAMixin:
+    """Crea una unidad con un proyecto, una meta y una actividad"""
+
+    def crear_datos(self):
+        cache.clear()
+        self.unidad = Unidad.objects.create(nombre='Unidad de Turismo')
+        self.usuario = Usuario.objects.create_user(
+            email='turismo@ejemplo.com', password='clave123', unidad=self.unidad,
+            rol='UNIDAD', debe_cambiar_clave=False,
+        )
+        self.proyecto = Proyecto.objects.create(
+            unidad=self.usuario, nombre='Festival Gastronómico', anio=2025, estado='APROBADO',
+        )
+        self.meta = MetaProyecto.objects.create(proyecto=self.proyecto, descripcion='Promover el turismo local')
+        self.actividad = Actividad.objects.create(
+            meta=self.meta, descripcion='Organizar feria de artesanías', unidad_medida='Evento',
+            cantidad_programada=12, medio_verificacion='Fotografías y listas de asistencia',
+        )
+
+
+class BusquedaTestCase(DatosPOAMixin, TestCase):
+    """Tests para el índice de búsqueda de texto completo"""
+
+    def setUp(self):
+        self.crear_datos()
+
+    def coincidentes(self, modelo, consulta, tipo):
+        return list(modelo.objects.filter(id__in=busqueda.ids_coincidentes(consulta, tipo)).values_list('id', flat=True))
+
+    def test_indexa_por_senales(self):
+        """Crear objetos genera sus documentos y los cambios se reflejan en el índice"""
+        self.assertEqual(IndiceBusqueda.objects.filter(proyecto=self.proyecto).count(), 3)
+        self.assertTrue(IndiceBusqueda.objects.filter(tipo='UNIDAD', objeto_id=self.usuario.id).exists())
+        self.assertEqual(self.coincidentes(Actividad, 'asistencia', 'ACTIVIDAD'), [self.actividad.id])
+        # Búsqueda por prefijo y sin acentos
+        self.assertEqual(self.coincidentes(Proyecto, 'gastronomic', 'PROYECTO'), [self.proyecto.id])
+
+        self.actividad.medio_verificacion = 'Informe final'
+        self.actividad.save()
+        self.assertEqual(self.coincidentes(Actividad, 'asistencia', 'ACTIVIDAD'), [])
+
+        proyecto_id = self.proyecto.id
+        self.proyecto.delete()
+        self.assertFalse(IndiceBusqueda.objects.filter(proyecto_id=proyecto_id).exists())
+
+    def test_filtro_de_listas_sin_limite(self):
+        """Los filtros de listas traen todas las coincidencias, no solo la página de resultados"""
+        for i in range(busqueda.LIMITE_RESULTADOS + 5):
+            Proyecto.objects.create(unidad=self.usuario, nombre=f'Festival de invierno {i}', anio=2025)
+        self.assertEqual(len(busqueda.buscar('festival', tipos=['PROYECTO'])), busqueda.LIMITE_RESULTADOS)
+        self.assertEqual(len(self.coincidentes(Proyecto, 'festival', 'PROYECTO')), busqueda.LIMITE_RESULTADOS + 6)
+        # Prefijo de palabra, no subcadena
+        self.assertEqual(self.coincidentes(Proyecto, 'nomico', 'PROYECTO'), [])
+        self.assertEqual(self.coincidentes(Proyecto, '', 'PROYECTO'), [])
+
+    def test_unidad_solo_ve_sus_resultados(self):
+        """Las unidades no reciben resultados de otras unidades"""
+        otra = Unidad.objects.create(nombre='Clínica Municipal')
+        otro_usuario = Usuario.objects.create_user(
+            email='clinica@ejemplo.com', password='clave123', unidad=otra, rol='UNIDAD', debe_cambiar_clave=False,
+        )
+        Proyecto.objects.create(unidad=otro_usuario, nombre='Feria de salud', anio=2025)
+
+        self.client.force_login(self.usuario)
+        respuesta = self.client.get(reverse('poa:buscar'), {'q': 'feria'})
+        titulos = [r['titulo'] for r in respuesta.json()['resultados']]
+        self.assertEqual(titulos, ['Organizar feria de artesanías'])
+
+    def test_reconstruir_indice(self):
+        IndiceBusqueda.objects.all().delete()
+        usuarios_unidad = Usuario.objects.filter(rol='UNIDAD').count()
+        self.assertEqual(busqueda.reconstruir_indice(), 3 + usuarios_unidad)
+        self.assertEqual(self.coincidentes(Usuario, 'turismo ejemplo', 'UNIDAD'), [self.usuario.id])
+
+
+@skipUnless(connection.vendor == 'sqlite', 'El plan de ejecución se verifica con EXPLAIN QUERY PLAN de SQLite')
+class IndicesConsultasTestCase(DatosPOAMixin, TestCase):
+    """Las consultas frecuentes de las vistas usan los índices compuestos"""
+
+    def setUp(self):
+        self.crear_datos()
+
+    def assertUsaIndice(self, queryset, indice):
+        plan = queryset.explain()
+        self.assertIn(indice, plan)
+        return plan
+
+    def test_indices_de_consultas_frecuentes(self):
+        casos = [
+            # POA aprobado de una unidad (estadísticas, listas de unidades, exportaciones)
+            (Proyecto.objects.aprobados_de(self.usuario)[:1], 'poa_proy_unidad_estado_idx'),
+            # Pendientes de revisión del dashboard del administrador
+            (Proyecto.objects.pendientes_revision(), 'poa_proy_estado_fmod_idx'),
+            # Proyecto de actividades no planificadas del año
+            (Proyecto.objects.no_planificado(self.usuario, 2025)[:1], 'poa_proy_unidad_anio_np_idx'),
+            # Series mensuales de las estadísticas
+            (AvanceMensual.objects.totales_por_mes(), 'poa_avance_mes_cump_idx'),
+            # Evidencias por mes en el detalle del proyecto
+            (Evidencia.objects.del_mes(self.actividad, 1), 'poa_evid_actividad_mes_idx'),
+            (Usuario.objects.unidades(), 'login_usuario_rol_idx'),
+        ]
+        for queryset, indice in casos:
+            with self.subTest(indice=indice):
+                self.assertUsaIndice(queryset, indice)
+
+    def test_consultas_frecuentes_sin_joins(self):
+        # El orden por defecto de Proyecto une la tabla de unidades; las consultas frecuentes no
+        self.assertIn('JOIN', str(Proyecto.objects.filter(estado='APROBADO').query))
+        for queryset in (
+            Proyecto.objects.aprobados_de(self.usuario),
+            Proyecto.objects.pendientes_revision(),
+            Proyecto.objects.no_planificado(self.usuario, 2025),
+            self.actividad.avances.all(),
+        ):
+            with self.subTest(consulta=str(queryset.query)):
+                self.assertNotIn('JOIN', str(queryset.query))
+
+
+class CumplimientoTestCase(SimpleTestCase):
+    """El cálculo entero coincide con el cálculo anterior basado en Decimal"""
+
+    def test_coincide_con_decimal(self):
+        for programado in range(1, 120):
+            for realizado in range(0, programado + 1):
+                esperado = round(Decimal(realizado) / Decimal(programado) * 100, 2)
+                self.assertEqual(porcentaje_cumplimiento(realizado, programado), esperado)
+        self.assertEqual(porcentaje_cumplimiento(2, 3, decimales=1), Decimal('66.7'))
+        self.assertIsNone(porcentaje_cumplimiento(5, 0))
+
+
+class CacheArchivosTestCase(SimpleTestCase):
+    """La caché de archivos descarta entradas al superar MAX_ENTRIES, revisando cada CULL_INTERVAL escrituras"""
+
+    def test_descarta_al_superar_el_maximo(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            cache_archivos = CacheArchivos(directorio, {'OPTIONS': {
+                'MAX_ENTRIES': 20, 'CULL_FREQUENCY': 2, 'CULL_INTERVAL': 5,
+            }})
+            for i in range(100):
+                cache_archivos.set(f'clave:{i}', i)
+            self.assertLessEqual(len(cache_archivos._list_cache_files()), 25)
+            self.assertEqual(cache_archivos.get('clave:99'), 99)
+
+    def test_incr_atomico_y_sin_vencimiento(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            cache_archivos = CacheArchivos(directorio, {'TIMEOUT': 1})
+            cache_archivos.add('contador', 0, None)
+
+            def incrementar():
+                for _ in range(50):
+                    cache_archivos.incr('contador')
+
+            hilos = [threading.Thread(target=incrementar) for _ in range(4)]
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+            self.assertEqual(cache_archivos.get('contador'), 200)
+            # Conserva el vencimiento de la clave (None) en lugar del TIMEOUT por defecto
+            with mock.patch('time.time', return_value=time.time() + 60):
+                self.assertEqual(cache_archivos.incr('contador', 5), 205)
+            with self.assertRaises(ValueError):
+                cache_archivos.incr('otra')
+
+
+class VersionesCacheTestCase(DatosPOAMixin, TestCase):
+    """Las versiones de los datos cacheados cambian al confirmar la transacción"""
+
+    def test_incrementa_al_confirmar(self):
+        anterior = version_datos('pruebas')
+        with self.captureOnCommitCallbacks(execute=True):
+            incrementar_version('pruebas')
+            self.assertEqual(version_datos('pruebas'), anterior)
+        self.assertGreater(version_datos('pruebas'), anterior)
+
+    def test_borrado_en_cascada_invalida_una_vez(self):
+        self.crear_datos()
+        for mes in range(1, 13):
+            AvanceMensual.objects.create(actividad=self.actividad, mes=mes, cantidad_programada_mes=1)
+        espacio = espacio_unidad(self.unidad.id)
+        anterior = version_datos(espacio)
+
+        with mock.patch('utils.cache.cache.set_many', wraps=cache.set_many) as set_many:
+            with CaptureQueriesContext(connection) as consultas:
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.proyecto.delete()
+        self.assertGreater(version_datos(espacio), anterior)
+        # Espacios globales y, tras resolver las unidades de todos los avances juntos, el de la unidad
+        self.assertEqual(set_many.call_count, 2)
+        resoluciones = [c for c in consultas if 'INNER JOIN' in c['sql'] and '"unidad_id"' in c['sql']]
+        self.assertLessEqual(len(resoluciones), len(signals.RUTAS_UNIDAD))
+
+
+class ReportesTestCase(DatosPOAMixin, TestCase):
+    """Tests para los totales del reporte de un proyecto"""
+
+    def setUp(self):
+        self.crear_datos()
+        AvanceMensual.objects.create(actividad=self.actividad, mes=1, cantidad_programada_mes=4, cantidad_realizada=6)
+        AvanceMensual.objects.create(actividad=self.actividad, mes=2, cantidad_programada_mes=6, cantidad_realizada=3)
+        self.client.force_login(self.usuario)
+
+    def test_totales_con_tope_en_lo_programado(self):
+        # Sesión, usuario, proyecto con su dueño, conteo de actividades y la agregación
+        with self.assertNumQueries(5):
+            respuesta = self.client.get(reverse('poa:ver_reportes', args=[self.proyecto.id]))
+        self.assertEqual(respuesta.context['total_programado'], 10)
+        # Lo realizado por encima de lo programado no suma al cumplimiento
+        self.assertEqual(respuesta.context['total_realizado'], 7)
+        self.assertEqual(respuesta.context['porcentaje_cumplimiento'], Decimal('70.00'))
+
+    def test_desglose_por_meta_y_mes(self):
+        otra_meta = MetaProyecto.objects.create(proyecto=self.proyecto, descripcion='Capacitar guías')
+        otra = Actividad.objects.create(
+            meta=otra_meta, descripcion='Taller', unidad_medida='Taller', medio_verificacion='Listas',
+        )
+        AvanceMensual.objects.create(actividad=otra, mes=1, cantidad_programada_mes=0, cantidad_realizada=1)
+
+        respuesta = self.client.get(reverse('poa:ver_reportes', args=[self.proyecto.id]))
+        por_meta = respuesta.context['cumplimiento_por_meta']
+        self.assertEqual([(m['descripcion'], m['porcentaje']) for m in por_meta], [
+            ('Promover el turismo local', Decimal('70.00')),
+            ('Capacitar guías', None),
+        ])
+        por_mes = respuesta.context['cumplimiento_por_mes']
+        self.assertEqual([(m['nombre'], m['programado'], m['realizado']) for m in por_mes], [
+            ('Enero', 4, 4), ('Febrero', 6, 3),
+        ])
+
+
+class EstadoWizardTestCase(DatosPOAMixin, TestCase):
+    """Tests para el estado del wizard: el paso en la caché y el proyecto en edición en la sesión"""
+
+    def setUp(self):
+        self.crear_datos()
+        self.client.force_login(self.usuario)
+        self.url = reverse('poa:crear_proyecto_wizard')
+
+    def test_navegar_no_escribe_la_sesion(self):
+        self.client.get(self.url)
+        # Solo el primer guardado escribe en la sesión el proyecto en edición
+        self.client.post(self.url, {'accion': 'siguiente', 'anio': 2026, 'nombre': 'Ruta del Café'})
+        proyecto = Proyecto.objects.get(nombre='Ruta del Café')
+        self.assertEqual(self.client.session['wizard_proyecto_id'], proyecto.id)
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.post(self.url, {'accion': 'anterior'})
+            self.client.post(self.url, {'accion': 'siguiente', 'anio': 2026, 'nombre': 'Ruta del Café'})
+            self.client.post(self.url, {'accion': 'anterior'})
+        self.assertRedirects(respuesta, self.url)
+        self.assertFalse([c for c in consultas if 'django_session' in c['sql'] and not c['sql'].startswith('SELECT')])
+
+        respuesta = self.client.get(self.url)
+        self.assertEqual((respuesta.context['paso_actual'], respuesta.context['proyecto']), (1, proyecto))
+
+        self.client.get(reverse('poa:cancelar_wizard'))
+        self.assertEqual(self.client.get(self.url).context['paso_actual'], 1)
+        self.assertIsNone(self.client.get(self.url).context['proyecto'])
+
+    def test_estado_descartado_por_la_cache_no_duplica_el_borrador(self):
+        self.client.post(self.url, {'accion': 'siguiente', 'anio': 2026, 'nombre': 'Ruta del Café'})
+        proyecto = Proyecto.objects.get(nombre='Ruta del Café')
+        cache.clear()
+
+        respuesta = self.client.get(self.url)
+        self.assertEqual((respuesta.context['paso_actual'], respuesta.context['proyecto']), (1, proyecto))
+        self.client.post(self.url, {'accion': 'siguiente', 'anio': 2026, 'nombre': 'Ruta del Café'})
+        self.assertEqual(Proyecto.objects.filter(unidad=self.usuario, anio=2026).count(), 1)
+        self.assertEqual(self.client.get(self.url).context['paso_actual'], 2)
+
+
+class BorradorTestCase(DatosPOAMixin, TestCase):
+    """Tests para la creación de un POA completo desde un borrador JSON"""
+
+    def setUp(self):
+        self.crear_datos()
+        self.client.force_login(self.usuario)
+        self.url = reverse('poa:crear_proyecto_borrador')
+
+    def datos_actividad(self, descripcion, cantidad=12):
+        return {
+            'descripcion': descripcion, 'unidad_medida_select': 'Evento', 'es_cuantificable': True,
+            'cantidad_programada': cantidad, 'medio_verificacion': 'Fotografías',
+            'total_recursos': '0', 'programacion': [cantidad // 12] * 12,
+        }
+
+    def enviar(self, borrador):
+        return self.client.post(self.url, json.dumps(borrador), content_type='application/json')
+
+    def test_crea_el_arbol_en_una_transaccion(self):
+        borrador = {
+            'proyecto': {'anio': 2026, 'objetivo_unidad': 'Atraer visitantes'},
+            'metas': [
+                {'descripcion': f'Meta {i}', 'actividades': [self.datos_actividad(f'Ruta gastronómica {j}') for j in range(10)]}
+                for i in range(4)
+            ],
+        }
+        respuesta = self.enviar(borrador)
+        self.assertEqual(respuesta.status_code, 201)
+        proyecto = Proyecto.objects.get(id=respuesta.json()['proyecto_id'])
+        self.assertEqual(proyecto.nombre, 'Proyecto Operativo 2026 - 1')
+        self.assertEqual(Actividad.objects.filter(meta__proyecto=proyecto).count(), 40)
+        avances = AvanceMensual.objects.filter(actividad__meta__proyecto=proyecto, anio=2026)
+        self.assertEqual((avances.count(), avances.filter(cumplimiento=0).count()), (480, 480))
+        self.assertEqual(busqueda.buscar('gastronómica', unidad=self.unidad)[0].proyecto_id, proyecto.id)
+
+    def test_rechaza_sin_guardar_nada(self):
+        self.assertContains(self.client.get(self.url), 'id="metas-predeterminadas"')
+        incompleta = self.datos_actividad('Feria de artesanías')
+        incompleta['programacion'] = ['1'] * 6 + [''] * 6
+        respuesta = self.enviar({
+            'proyecto': {'anio': 2026},
+            'metas': [{'descripcion': 'Promover', 'actividades': [incompleta]}, {'descripcion': 'Sin actividades'}],
+        })
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.json()['errores'], [
+            'Meta 1, actividad 1: la suma de la programación mensual (6) debe ser igual a la cantidad programada (12).',
+            'Meta 2: todas las metas deben tener al menos una actividad.',
+        ])
+        self.assertEqual(Proyecto.objects.filter(unidad=self.usuario).count(), 1)
+
+    def test_rechaza_programacion_mal_formada(self):
+        corta = self.datos_actividad('Feria de artesanías')
+        corta['programacion'] = [2] * 6
+        larga = self.datos_actividad('Ruta del café')
+        larga['programacion'] = [1] * 13
+        no_enteras = self.datos_actividad('Ruta del vino')
+        no_enteras['programacion'] = [2.7, True, '3.5', None] + [1] * 8
+        respuesta = self.enviar({
+            'proyecto': {'anio': 2026},
+            'metas': [{'descripcion': 'Promover', 'actividades': [corta, larga, no_enteras]}],
+        })
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.json()['errores'], [
+            'Meta 1, actividad 1: la programación debe ser una lista de 12 cantidades.',
+            'Meta 1, actividad 1: la actividad no ha sido programada.',
+            'Meta 1, actividad 2: la programación debe ser una lista de 12 cantidades.',
+            'Meta 1, actividad 2: la actividad no ha sido programada.',
+        ] + [f'Meta 1, actividad 3: cantidad inválida para el mes {mes}.' for mes in range(1, 5)] + [
+            'Meta 1, actividad 3: la suma de la programación mensual (8) debe ser igual a la cantidad programada (12).',
+        ])
+
+
+class ValidacionWizardTestCase(DatosPOAMixin, TestCase):
+    """Tests para las validaciones agrupadas del wizard"""
+
+    def setUp(self):
+        self.crear_datos()
+        self.actividad.cantidad_programada = 6
+        self.actividad.save()
+        MetaProyecto.objects.create(proyecto=self.proyecto, descripcion='Meta sin actividades')
+        self.completa = Actividad.objects.create(
+            meta=self.meta, descripcion='Ruta del café', unidad_medida='Evento',
+            cantidad_programada=2, medio_verificacion='Fotografías',
+        )
+        for mes in (1, 2):
+            AvanceMensual.objects.create(actividad=self.completa, mes=mes, cantidad_programada_mes=1)
+            AvanceMensual.objects.create(actividad=self.actividad, mes=mes, cantidad_programada_mes=0)
+
+    def test_una_consulta_por_validacion(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(validacion.metas_sin_actividades(self.proyecto), ['Meta sin actividades'])
+        with self.assertNumQueries(1):
+            self.assertEqual(validacion.programacion_pendiente(self.proyecto), (['Organizar feria de artesanías'], []))
+
+        AvanceMensual.objects.filter(actividad=self.actividad, mes=1).update(cantidad_programada_mes=4)
+        self.assertEqual(
+            validacion.programacion_pendiente(self.proyecto), ([], [('Organizar feria de artesanías', 4, 6)])
+        )
+
+
+class ListaProyectosTestCase(DatosPOAMixin, TestCase):
+    """Tests para la lista de proyectos con totales agregados"""
+
+    def setUp(self):
+        self.crear_datos()
+        self.client.force_login(self.usuario)
+        self.url = reverse('poa:lista_proyectos')
+        for mes, realizada in ((1, 2), (2, 9)):
+            AvanceMensual.objects.create(
+                actividad=self.actividad, mes=mes, cantidad_programada_mes=3, cantidad_realizada=realizada
+            )
+
+    def test_consultas_constantes_y_avance_con_tope(self):
+        with self.assertNumQueries(6):
+            respuesta = self.client.get(self.url)
+        proyecto = respuesta.context['proyectos'][0]
+        self.assertEqual((proyecto.total_metas, proyecto.total_actividades), (1, 1))
+        self.assertEqual(proyecto.avance_general, Decimal('83.3'))
+
+        Proyecto.objects.bulk_create([
+            Proyecto(unidad=self.usuario, nombre=f'Proyecto {i}', anio=2024) for i in range(30)
+        ])
+        with self.assertNumQueries(6):
+            respuesta = self.client.get(self.url, {'page': 2})
+        self.assertEqual(len(respuesta.context['proyectos']), 11)
+        self.assertEqual(respuesta.context['proyectos'][0].avance_general, 0)
+
+
+class RegistrarAvanceTestCase(DatosPOAMixin, TestCase):
+    """Tests para el registro de avances con un UPDATE condicionado a la versión"""
+
+    def setUp(self):
+        self.crear_datos()
+        self.client.force_login(self.usuario)
+        self.avance = AvanceMensual.objects.create(
+            actividad=self.actividad, mes=3, anio=self.proyecto.anio, cantidad_programada_mes=32
+        )
+        self.url = reverse('poa:gestionar_avances', args=[self.proyecto.id])
+
+    def test_cumplimiento_en_sql_igual_al_de_python(self):
+        avances = AvanceMensual.objects.filter(id=self.avance.id)
+        for programado, realizado in [(32, 1), (3, 2), (8, 1), (7, 9), (0, 4), (999999, 1)]:
+            with self.subTest(programado=programado, realizado=realizado):
+                avances.update(cantidad_programada_mes=programado)
+                self.assertEqual(avances.registrar_realizado(realizado), 1)
+                avance = avances.get()
+                self.assertEqual(avance.cumplimiento, porcentaje_cumplimiento(min(realizado, programado), programado))
+                self.assertEqual(avance.es_no_planificada, realizado > programado)
+
+    def test_version_desactualizada_no_sobrescribe(self):
+        datos = {'actividad_id': self.actividad.id, 'mes': 3, 'cantidad_realizada': 40, 'version': self.avance.version}
+        self.client.post(self.url, datos)
+        self.avance.refresh_from_db()
+        self.assertEqual((self.avance.cantidad_realizada, self.avance.es_no_planificada), (40, True))
+        self.assertEqual(self.avance.cumplimiento, Decimal('100.00'))
+
+        respuesta = self.client.post(self.url, {**datos, 'cantidad_realizada': 5}, follow=True)
+        self.assertContains(respuesta, 'Otro usuario modificó este avance')
+        self.avance.refresh_from_db()
+        self.assertEqual(self.avance.cantidad_realizada, 40)
+
+
+class GrillaAvancesTestCase(DatosPOAMixin, TestCase):
+    """Tests para el guardado en lote de la grilla de avances"""
+
+    def setUp(self):
+        self.crear_datos()
+        self.client.force_login(self.usuario)
+        for mes in (1, 2, 3):
+            AvanceMensual.objects.create(actividad=self.actividad, mes=mes, anio=self.proyecto.anio, cantidad_programada_mes=4)
+        self.url = reverse('poa:gestionar_avances_grilla', args=[self.proyecto.id])
+
+    def enviar(self, cambios):
+        return self.client.post(self.url, json.dumps({'cambios': cambios}), content_type='application/json')
+
+    def celda(self, mes, cantidad):
+        version = AvanceMensual.objects.get(actividad=self.actividad, mes=mes).version
+        return {'actividad_id': self.actividad.id, 'mes': mes, 'cantidad_realizada': cantidad, 'version': version}
+
+    def test_guarda_varias_celdas_y_responde_la_diferencia(self):
+        self.assertContains(self.client.get(self.url), 'data-version', count=3)
+        respuesta = self.enviar([self.celda(1, 3), self.celda(2, 6)])
+        self.assertEqual(respuesta.status_code, 200)
+        datos = respuesta.json()
+        self.assertEqual(datos['conflictos'], [])
+        self.assertEqual(
+            [(c['mes'], c['cantidad_realizada'], c['cumplimiento'], c['es_no_planificada']) for c in datos['actualizados']],
+            [(1, 3, '75.00', False), (2, 6, '100.00', True)],
+        )
+        avance = AvanceMensual.objects.get(actividad=self.actividad, mes=2)
+        self.assertEqual((avance.cantidad_realizada, avance.cumplimiento), (6, Decimal('100.00')))
+
+    def test_celda_invalida_no_guarda_ninguna(self):
+        respuesta = self.enviar([self.celda(1, 3), self.celda(2, -1), {**self.celda(3, 1), 'mes': 13}])
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(len(respuesta.json()['errores']), 2)
+        self.assertFalse(AvanceMensual.objects.filter(actividad=self.actividad, cantidad_realizada__gt=0).exists())
+
+    def test_conflicto_devuelve_valor_actual(self):
+        desactualizada = self.celda(1, 3)
+        self.enviar([self.celda(1, 2)])
+        datos = self.enviar([desactualizada, self.celda(3, 4)]).json()
+        self.assertEqual([(c['mes'], c['cantidad_realizada']) for c in datos['conflictos']], [(1, 2)])
+        self.assertEqual([c['mes'] for c in datos['actualizados']], [3])
+
+
+class AmbitoUnidadTestCase(DatosPOAMixin, TestCase):
+    """Tests para las búsquedas limitadas a la unidad del usuario"""
+
+    def setUp(self):
+        self.crear_datos()
+        otra_unidad = Unidad.objects.create(nombre='Unidad de Deportes')
+        self.otro_usuario = Usuario.objects.create_user(
+            email='deportes@ejemplo.com', password='clave123', unidad=otra_unidad,
+            rol='UNIDAD', debe_cambiar_clave=False,
+        )
+
+    def test_filtra_por_la_unidad_del_usuario(self):
+        self.assertEqual(list(Actividad.objects.visibles_para(self.usuario)), [self.actividad])
+        self.assertFalse(Actividad.objects.visibles_para(self.otro_usuario).exists())
+        self.assertFalse(MetaProyecto.objects.de_unidad(self.otro_usuario.unidad_id).exists())
+
+    def test_verifica_la_unidad_en_la_misma_consulta(self):
+        self.client.force_login(self.usuario)
+        url = reverse('poa:obtener_evidencias_mes', args=[self.actividad.id, 1])
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        actividad = [c['sql'] for c in consultas.captured_queries if 'FROM "poa_actividad"' in c['sql']]
+        self.assertEqual(len(actividad), 1)
+        self.assertIn('INNER JOIN "poa_proyecto"', actividad[0])
+
+    def test_otra_unidad_no_accede(self):
+        self.client.force_login(self.otro_usuario)
+        url = reverse('poa:obtener_evidencias_mes', args=[self.actividad.id, 1])
+        self.assertEqual(self.client.get(url).status_code, 403)
+        respuesta = self.client.post(reverse('poa:eliminar_meta', args=[self.meta.id]))
+        self.assertEqual(respuesta.status_code, 404)
+        self.assertTrue(MetaProyecto.objects.filter(id=self.meta.id).exists())
+
+
+class ClonarProyectosTestCase(DatosPOAMixin, TestCase):
+    """Tests para la copia de POA aprobados al año siguiente"""
+
+    def setUp(self):
+        self.crear_datos()
+        for mes in range(1, 13):
+            AvanceMensual.objects.create(
+                actividad=self.actividad, mes=mes, anio=2025, cantidad_programada_mes=1, cantidad_realizada=1
+            )
+
+    def test_copia_el_arbol_con_programacion_escalada(self):
+        resumen = renovacion.clonar_proyectos(Proyecto.objects.filter(id=self.proyecto.id), factor='1.5')
+        self.assertEqual((len(resumen['proyectos']), resumen['metas'], resumen['actividades'], resumen['avances']), (1, 1, 1, 12))
+
+        copia = Proyecto.objects.get(unidad=self.usuario, anio=2026)
+        self.assertEqual((copia.nombre, copia.estado), ('Festival Gastronómico', 'BORRADOR'))
+        actividad = Actividad.objects.get(meta__proyecto=copia)
+        avances = AvanceMensual.objects.filter(actividad=actividad)
+        self.assertEqual(sorted(avances.values_list('cantidad_programada_mes', flat=True)), [2] * 12)
+        self.assertEqual(actividad.cantidad_programada, 24)
+        self.assertFalse(avances.filter(cantidad_realizada__gt=0).exists())
+        self.assertEqual(validacion.programacion_pendiente(copia), ([], []))
+        self.assertIn(copia.id, [doc.proyecto_id for doc in busqueda.buscar('artesanías', tipos=['ACTIVIDAD'])])
+
+    def test_omite_no_aprobados_y_copias_existentes(self):
+        Proyecto.objects.create(unidad=self.usuario, nombre='Borrador', anio=2025)
+        call_command('clonar_poas', '--desde', '2025', stdout=StringIO())
+        salida = StringIO()
+        call_command('clonar_poas', '--desde', '2025', stdout=salida)
+        self.assertIn('0 proyectos copiados', salida.getvalue())
+        self.assertEqual(Proyecto.objects.filter(anio=2026).count(), 1)
+
+    def test_dry_run_informa_lo_mismo_sin_guardar(self):
+        documentos, cambios = IndiceBusqueda.objects.count(), RegistroCambio.objects.count()
+        salida = StringIO()
+        call_command('clonar_poas', '--desde', '2025', '--dry-run', stdout=salida)
+        self.assertIn('1 proyectos se copiarían a 2026: 1 metas, 1 actividades y 12 avances', salida.getvalue())
+        self.assertFalse(Proyecto.objects.filter(anio=2026).exists())
+        self.assertEqual((IndiceBusqueda.objects.count(), RegistroCambio.objects.count()), (documentos, cambios))
+
+        Proyecto.objects.create(unidad=self.usuario, nombre='Festival Gastronómico', anio=2026)
+        salida = StringIO()
+        call_command('clonar_poas', '--desde', '2025', '--dry-run', stdout=salida)
+        self.assertIn('Omitido "Festival Gastronómico (2025)"', salida.getvalue())
+        self.assertIn('0 proyectos se copiarían', salida.getvalue())
+
+
+class RegistroCambioTestCase(DatosPOAMixin, TestCase):
+    """Tests para la bandeja de cambios de los consumidores de analítica"""
+
+    def setUp(self):
+        self.crear_datos()
+        self.admin = Usuario.objects.create_user(
+            email='admin@ejemplo.com', password='clave123', unidad=self.unidad, rol='ADMIN', debe_cambiar_clave=False,
+        )
+
+    def ultimos(self, desde):
+        return [(c.tabla, c.objeto_id, c.operacion) for c in RegistroCambio.objects.desde(desde, 100)]
+
+    def test_registra_guardados_actualizaciones_y_eliminaciones(self):
+        self.assertEqual(self.ultimos(0), [
+            ('PROYECTO', self.proyecto.id, 'CREAR'),
+            ('META', self.meta.id, 'CREAR'),
+            ('ACTIVIDAD', self.actividad.id, 'CREAR'),
+        ])
+        cursor = RegistroCambio.objects.last().id
+        avance = AvanceMensual.objects.create(actividad=self.actividad, mes=1, anio=2025, cantidad_programada_mes=4)
+        AvanceMensual.objects.filter(id=avance.id).registrar_realizado(3, avance.version)
+        actividad_id = self.actividad.id
+        self.actividad.delete()
+        self.assertEqual(self.ultimos(cursor), [
+            ('AVANCE', avance.id, 'CREAR'),
+            ('AVANCE', avance.id, 'ACTUALIZAR'),
+            ('AVANCE', avance.id, 'ELIMINAR'),
+            ('ACTIVIDAD', actividad_id, 'ELIMINAR'),
+        ])
+        actualizado = RegistroCambio.objects.get(tabla='AVANCE', operacion='ACTUALIZAR')
+        self.assertEqual((actualizado.datos['cantidad_realizada'], actualizado.datos['cumplimiento']), (3, '75.00'))
+
+    def test_registra_las_copias_masivas(self):
+        cursor = RegistroCambio.objects.last().id
+        copia = renovacion.clonar_proyectos(Proyecto.objects.filter(id=self.proyecto.id))['proyectos'][0]
+        tablas = [tabla for tabla, _, operacion in self.ultimos(cursor) if operacion == 'CREAR']
+        self.assertEqual(tablas, ['PROYECTO', 'META', 'ACTIVIDAD'] + ['AVANCE'] * 12)
+        self.assertEqual(RegistroCambio.objects.get(tabla='PROYECTO', objeto_id=copia.id).datos['anio'], 2026)
+
+    def test_endpoint_pagina_por_cursor(self):
+        url = reverse('poa:cambios_desde')
+        self.client.force_login(self.usuario)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.force_login(self.admin)
+        datos = self.client.get(url, {'limite': 2}).json()
+        self.assertEqual([c['tabla'] for c in datos['cambios']], ['PROYECTO', 'META'])
+        self.assertTrue(datos['hay_mas'])
+        datos = self.client.get(url, {'desde': datos['cursor'], 'limite': 2}).json()
+        self.assertEqual([c['tabla'] for c in datos['cambios']], ['ACTIVIDAD'])
+        self.assertFalse(datos['hay_mas'])
+        self.assertEqual(self.client.get(url, {'desde': datos['cursor']}).json()['cursor'], datos['cursor'])
+        self.assertEqual(self.client.get(url, {'desde': 'x'}).status_code, 400)
+
+    def test_comando_escribe_una_linea_por_cambio(self):
+        salida, errores = StringIO(), StringIO()
+        call_command('seguir_cambios', '--lote', '2', stdout=salida, stderr=errores)
+        lineas = [json.loads(linea) for linea in salida.getvalue().splitlines()]
+        self.assertEqual([c['objeto_id'] for c in lineas], [self.proyecto.id, self.meta.id, self.actividad.id])
+        self.assertIn(f'cursor: {lineas[-1]["id"]}', errores.getvalue())
+
+
+class ApiLecturaTestCase(DatosPOAMixin, TestCase):
+    """Tests para la API JSON de solo lectura"""
+
+    def setUp(self):
+        self.crear_datos()
+        self.auditor = Usuario.objects.create_user(
+            email='auditor@ejemplo.com', password='clave123', unidad=self.unidad,
+            rol='AUDITOR', debe_cambiar_clave=False,
+        )
+        self.client.force_login(self.auditor)
+        for mes in (1, 2, 3):
+            AvanceMensual.objects.create(actividad=self.actividad, mes=mes, anio=2025, cantidad_programada_mes=4)
+
+    def listar(self, recurso, **parametros):
+        return self.client.get(reverse('api_v1:listar', args=[recurso]), parametros)
+
+    def test_solo_administradores_y_auditores(self):
+        self.client.force_login(self.usuario)
+        self.assertEqual(self.listar('proyectos').status_code, 403)
+        self.client.logout()
+        self.assertEqual(self.listar('proyectos').status_code, 401)
+
+    def test_pagina_por_cursor_con_campos_seleccionados(self):
+        datos = self.listar('avances', campos='mes,cantidad_programada_mes', limite=2).json()
+        self.assertEqual(datos['resultados'][0].keys(), {'id', 'mes', 'cantidad_programada_mes'})
+        self.assertEqual([fila['mes'] for fila in datos['resultados']], [1, 2])
+        datos = self.listar('avances', campos='mes', despues_de=datos['siguiente'], limite=2).json()
+        self.assertEqual([fila['mes'] for fila in datos['resultados']], [3])
+        self.assertIsNone(datos['siguiente'])
+
+        proyecto = self.listar('proyectos', unidad=self.unidad.id).json()['resultados'][0]
+        self.assertEqual((proyecto['nombre'], proyecto['nombre_unidad']), ('Festival Gastronómico', 'Unidad de Turismo'))
+        self.assertEqual(self.listar('avances', campos='contraseña').status_code, 400)
+        self.assertEqual(self.listar('proyectos', estado='OTRO').status_code, 400)
+        self.assertEqual(self.listar('usuarios').status_code, 404)
+
+    def test_actualizado_desde_trae_solo_lo_modificado(self):
+        desde = timezone.now() + timedelta(seconds=1)
+        self.assertEqual(self.listar('actividades', actualizado_desde=desde.isoformat()).json()['resultados'], [])
+        self.assertEqual(self.listar('avances', actualizado_desde=desde.isoformat()).json()['resultados'], [])
+
+        RegistroCambio.objects.update(fecha=desde - timedelta(days=1))
+        AvanceMensual.objects.update(fecha_actualizacion=desde - timedelta(days=1))
+        self.actividad.save()
+        AvanceMensual.objects.filter(mes=2).registrar_realizado(4)
+        desde = (desde - timedelta(hours=1)).isoformat()
+        self.assertEqual(
+            [fila['id'] for fila in self.listar('actividades', actualizado_desde=desde).json()['resultados']],
+            [self.actividad.id],
+        )
+        self.assertEqual([fila['mes'] for fila in self.listar('avances', actualizado_desde=desde).json()['resultados']], [2])
+        self.assertEqual(self.listar('avances', actualizado_desde='ayer').status_code, 400)
+
+    def test_comprime_con_gzip(self):
+        respuesta = self.client.get(reverse('api_v1:listar', args=['avances']), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(respuesta['Content-Encoding'], 'gzip')
+        self.assertEqual(len(json.loads(gzip.decompress(respuesta.content))['resultados']), 3)
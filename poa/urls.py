@@ -6,6 +6,7 @@ app_name = 'poa'
 urlpatterns = [
     path('', views.lista_proyectos, name='lista_proyectos'),
     path('crear/', views.crear_proyecto_wizard, name='crear_proyecto_wizard'),
+    path('crear/borrador/', views.crear_proyecto_borrador, name='crear_proyecto_borrador'),
     path('cancelar/', views.cancelar_wizard, name='cancelar_wizard'),
     path('proyecto/<int:proyecto_id>/', views.detalle_proyecto, name='detalle_proyecto'),
     path('proyecto/<int:proyecto_id>/editar/', views.editar_proyecto, name='editar_proyecto'),
@@ -13,6 +14,7 @@ urlpatterns = [
     path('proyecto/<int:proyecto_id>/enviar/', views.enviar_proyecto, name='enviar_proyecto'),
     path('proyecto/<int:proyecto_id>/ver-aprobado/', views.ver_poa_aprobado, name='ver_poa_aprobado'),
     path('proyecto/<int:proyecto_id>/gestionar-avances/', views.gestionar_avances, name='gestionar_avances'),
+    path('proyecto/<int:proyecto_id>/gestionar-avances/grilla/', views.gestionar_avances_grilla, name='gestionar_avances_grilla'),
     path('proyecto/<int:proyecto_id>/gestionar-evidencias/', views.gestionar_evidencias, name='gestionar_evidencias'),
     path('proyecto/<int:proyecto_id>/reportes/', views.ver_reportes, name='ver_reportes'),
     path('actividad/<int:actividad_id>/registrar-avance/', views.registrar_avance_actividad, name='registrar_avance_actividad'),
@@ -22,5 +24,7 @@ urlpatterns = [
     path('subir-evidencia-mes/', views.subir_evidencia_mes, name='subir_evidencia_mes'),
     
     path('evidencias-mes/<int:actividad_id>/<int:mes>/', views.obtener_evidencias_mes, name='obtener_evidencias_mes'),
+    path('buscar/', views.buscar, name='buscar'),
+    path('cambios/', views.cambios_desde, name='cambios_desde'),
     path('crear-actividad-no-planificada/', views.crear_actividad_no_planificada, name='crear_actividad_no_planificada'),
 ]
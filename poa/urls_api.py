@@ -0,0 +1,9 @@
+from django.urls import path
+from . import api
+
+app_name = 'api_v1'
+
+urlpatterns = [
+    path('', api.indice, name='indice'),
+    path('<slug:recurso>/', api.listar, name='listar'),
+]
@@ -0,0 +1,37 @@
+"""
+Validaciones del wizard de creación de proyectos resueltas con una consulta agrupada
+cada una, en lugar de recorrer metas y actividades consultando sus relaciones.
+"""
+from django.db.models import F, Sum
+from django.db.models.functions import Coalesce
+
+from .models import MetaProyecto, Actividad
+
+
+def metas_sin_actividades(proyecto):
+    """Descripciones de las metas del proyecto que no tienen actividades"""
+    return list(
+        MetaProyecto.objects.filter(proyecto=proyecto, actividades__isnull=True)
+        .values_list('descripcion', flat=True)
+    )
+
+
+def programacion_pendiente(proyecto):
+    """
+    Actividades cuantificables cuya programación mensual no suma la cantidad programada.
+    Retorna (sin_programar, incompletas): descripciones de las que suman 0 y tuplas
+    (descripcion, suma, cantidad_programada) de las que suman otra cantidad.
+    """
+    filas = (
+        Actividad.objects.filter(meta__proyecto=proyecto, es_cuantificable=True, cantidad_programada__gt=0)
+        .annotate(suma=Coalesce(Sum('avances__cantidad_programada_mes'), 0))
+        .exclude(suma=F('cantidad_programada'))
+        .values_list('descripcion', 'suma', 'cantidad_programada')
+    )
+    sin_programar, incompletas = [], []
+    for descripcion, suma, cantidad in filas:
+        if suma == 0:
+            sin_programar.append(descripcion)
+        else:
+            incompletas.append((descripcion, suma, cantidad))
+    return sin_programar, incompletas
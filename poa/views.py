@@ -2,17 +2,34 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db import transaction
-from django.http import JsonResponse
-from decimal import Decimal, InvalidOperation
+from django.http import JsonResponse, Http404
+from django.urls import reverse
+from django.core.paginator import Paginator
+from django.db.models import Count
 from django.utils import timezone
-from .models import Proyecto, MetaProyecto, Actividad, AvanceMensual, Evidencia, AuditoriaLog, MetaPredeterminada
+from .models import Proyecto, MetaProyecto, Actividad, AvanceMensual, Evidencia, AuditoriaLog, RegistroCambio
 from .forms import FormularioProyecto, FormularioMeta, FormularioActividad, FormularioAvanceMensual, FormularioEvidencia
 import json
+from utils.cumplimiento import desglose_cumplimiento, agregados_cumplimiento, porcentaje_cumplimiento
+from utils.cache import incrementar_version
+from utils.catalogos import metas_predeterminadas_activas
+from utils.estadisticas import espacio_unidad
+from utils import estado_wizard
+from . import busqueda
+from .borrador import crear_desde_borrador, BorradorInvalido
+from .validacion import metas_sin_actividades, programacion_pendiente
+from .grilla import guardar_cambios, CambiosInvalidos, GuardadoSimultaneo
+from .ambito import obtener_con_unidad, puede_acceder
 
 
 
 
 
+PROYECTOS_POR_PAGINA = 20
+CAMBIOS_POR_PAGINA = 500
+MAXIMO_CAMBIOS_POR_PAGINA = 5000
+
+
 @login_required
 def lista_proyectos(request):
     """
@@ -21,40 +38,38 @@ def lista_proyectos(request):
     """
     if request.user.rol == 'UNIDAD':
         # Obtener todos los proyectos ordenados por año (desc) y fecha, excluyendo los no planificados
-        proyectos = Proyecto.objects.filter(unidad__unidad=request.user.unidad, es_no_planificado=False).order_by('-anio', '-fecha_modificacion').prefetch_related('metas__actividades')
+        proyectos = Proyecto.objects.de_unidad(request.user.unidad_id).filter(es_no_planificado=False).order_by('-anio', '-fecha_modificacion', 'id')
         
         # Obtener el proyecto de actividades no planificadas del año actual
         anio_actual = timezone.now().year
-        proyecto_no_planificado = Proyecto.objects.filter(
-            unidad=request.user,
-            anio=anio_actual,
-            es_no_planificado=True
+        proyecto_no_planificado = Proyecto.objects.no_planificado(
+            request.user, anio_actual
         ).prefetch_related('metas__actividades').first()
     else:
         # Admin ve todo (aunque tiene su propio dashboard), excluyendo los no planificados de la lista general
-        proyectos = Proyecto.objects.filter(es_no_planificado=False).order_by('-anio').prefetch_related('metas__actividades')
+        proyectos = Proyecto.objects.filter(es_no_planificado=False).order_by('-anio', 'id')
         proyecto_no_planificado = None
-    
-    # Calcular totales para mostrar en las tarjetas
-    for proyecto in proyectos:
-        proyecto.total_actividades = sum(meta.actividades.count() for meta in proyecto.metas.all())
-        
-        # Calcular avance general simple (opcional, para la vista de lista)
-        total_prog = Decimal(0)
-        total_real = Decimal(0)
-        # Nota: Esto puede ser pesado si hay muchos proyectos, optimizar con agregaciones si es necesario
-        avances = AvanceMensual.objects.filter(actividad__meta__proyecto=proyecto)
-        for av in avances:
-            total_prog += Decimal(av.cantidad_programada_mes)
-            total_real += Decimal(min(av.cantidad_realizada, av.cantidad_programada_mes))
-        
-        if total_prog > 0:
-            proyecto.avance_general = round((total_real / total_prog) * 100, 1)
-        else:
-            proyecto.avance_general = 0
+
+    page_obj = Paginator(proyectos.select_related('unidad__unidad'), PROYECTOS_POR_PAGINA).get_page(request.GET.get('page'))
+
+    # Totales de las tarjetas en una consulta agrupada, solo para los proyectos de la página
+    totales = {
+        fila['id']: fila
+        for fila in Proyecto.objects.filter(id__in=[p.id for p in page_obj]).values('id').annotate(
+            total_metas=Count('metas', distinct=True),
+            total_actividades=Count('metas__actividades', distinct=True),
+            **agregados_cumplimiento('metas__actividades__avances__'),
+        )
+    }
+    for proyecto in page_obj:
+        fila = totales[proyecto.id]
+        proyecto.total_metas = fila['total_metas']
+        proyecto.total_actividades = fila['total_actividades']
+        proyecto.avance_general = porcentaje_cumplimiento(fila['realizado'], fila['programado'], decimales=1) or 0
 
     return render(request, 'poa/lista_proyectos.html', {
-        'proyectos': proyectos,
+        'proyectos': page_obj,
+        'page_obj': page_obj,
         'proyecto_no_planificado': proyecto_no_planificado,
     })
 
@@ -68,8 +83,8 @@ def crear_proyecto_wizard(request):
     # LÓGICA MODIFICADA: Se eliminó la verificación de "si ya tiene poa aprobado"
     # Ahora siempre permite crear uno nuevo.
 
-    paso_actual = int(request.session.get('wizard_paso', 1))
-    proyecto_id = request.session.get('wizard_proyecto_id')
+    paso_actual = int(estado_wizard.obtener(request, 'wizard_paso', 1))
+    proyecto_id = estado_wizard.obtener(request, 'wizard_proyecto_id')
     
     proyecto = None
     if proyecto_id:
@@ -98,8 +113,7 @@ def crear_proyecto_wizard(request):
                         proyecto.nombre = f"Proyecto Operativo {proyecto.anio} - {conteo}"
                     
                     proyecto.save()
-                    request.session['wizard_proyecto_id'] = proyecto.id
-                    request.session['wizard_paso'] = 2
+                    estado_wizard.guardar(request, wizard_proyecto_id=proyecto.id, wizard_paso=2)
                     messages.success(request, 'Información guardada.')
                     return redirect('poa:crear_proyecto_wizard')
                 else:
@@ -134,13 +148,13 @@ def crear_proyecto_wizard(request):
                     messages.error(request, 'Debe seleccionar una meta o escribir una descripción.')
                     
             elif accion == 'siguiente':
-                if proyecto.metas.count() > 0:
-                    request.session['wizard_paso'] = 3
+                if proyecto.metas.exists():
+                    estado_wizard.guardar(request, wizard_paso=3)
                     return redirect('poa:crear_proyecto_wizard')
                 else:
                     messages.warning(request, 'Agregue al menos una meta.')
             elif accion == 'anterior':
-                request.session['wizard_paso'] = 1
+                estado_wizard.guardar(request, wizard_paso=1)
                 return redirect('poa:crear_proyecto_wizard')
 
         # Paso 3: Actividades
@@ -175,14 +189,14 @@ def crear_proyecto_wizard(request):
                         messages.error(request, 'No se especificó la meta.')
             elif accion == 'siguiente':
                 # Validación: todas las metas deben tener actividades
-                sin_actividades = [m.descripcion for m in proyecto.metas.all() if m.actividades.count() == 0]
+                sin_actividades = metas_sin_actividades(proyecto)
                 if sin_actividades:
                     messages.warning(request, 'Todas las metas deben tener al menos una actividad.')
                 else:
-                    request.session['wizard_paso'] = 4
+                    estado_wizard.guardar(request, wizard_paso=4)
                     return redirect('poa:crear_proyecto_wizard')
             elif accion == 'anterior':
-                request.session['wizard_paso'] = 2
+                estado_wizard.guardar(request, wizard_paso=2)
                 return redirect('poa:crear_proyecto_wizard')
 
         # Paso 4: Programación
@@ -208,26 +222,11 @@ def crear_proyecto_wizard(request):
                 
             elif accion == 'finalizar':
                 # Validación: verificar que todas las actividades cuantificables estén programadas correctamente
-                actividades = Actividad.objects.filter(meta__proyecto=proyecto)
-                actividades_sin_programar = []
-                actividades_incompletas = []
-                
-                for actividad in actividades:
-                    if actividad.es_cuantificable and actividad.cantidad_programada > 0:
-                        # Sumar la programación mensual
-                        suma_mensual = sum(
-                            av.cantidad_programada_mes 
-                            for av in actividad.avances.all()
-                        )
-                        
-                        # Verificar que la suma mensual sea mayor a 0
-                        if suma_mensual == 0:
-                            actividades_sin_programar.append(actividad.descripcion)
-                        # Verificar que la suma mensual sea exactamente igual a la cantidad programada
-                        elif suma_mensual != actividad.cantidad_programada:
-                            actividades_incompletas.append(
-                                f"{actividad.descripcion} ({suma_mensual}/{actividad.cantidad_programada})"
-                            )
+                # Una consulta agrupada: la suma mensual debe ser mayor a 0 e igual a la cantidad programada
+                actividades_sin_programar, incompletas = programacion_pendiente(proyecto)
+                actividades_incompletas = [
+                    f"{descripcion} ({suma}/{cantidad})" for descripcion, suma, cantidad in incompletas
+                ]
                 
                 if actividades_sin_programar:
                     messages.error(
@@ -240,21 +239,20 @@ def crear_proyecto_wizard(request):
                         f'Las siguientes actividades tienen programación incompleta: {", ".join(actividades_incompletas[:3])}{"..." if len(actividades_incompletas) > 3 else ""}. La suma de la programación mensual debe ser exactamente igual a la cantidad programada total.'
                     )
                 else:
-                    request.session['wizard_paso'] = 5
+                    estado_wizard.guardar(request, wizard_paso=5)
                     return redirect('poa:crear_proyecto_wizard')
             elif accion == 'anterior':
-                request.session['wizard_paso'] = 3
+                estado_wizard.guardar(request, wizard_paso=3)
                 return redirect('poa:crear_proyecto_wizard')
 
         # Paso 5: Confirmación
         elif paso_actual == 5:
             if accion == 'confirmar':
-                del request.session['wizard_paso']
-                del request.session['wizard_proyecto_id']
+                estado_wizard.limpiar(request, 'wizard_paso', 'wizard_proyecto_id')
                 messages.success(request, 'Proyecto creado exitosamente. Puede ver sus proyectos en la lista.')
                 return redirect('poa:lista_proyectos')
             elif accion == 'anterior':
-                request.session['wizard_paso'] = 4
+                estado_wizard.guardar(request, wizard_paso=4)
                 return redirect('poa:crear_proyecto_wizard')
 
     # Contextos de carga (igual que antes, simplificado aquí)
@@ -263,7 +261,7 @@ def crear_proyecto_wizard(request):
     elif paso_actual == 2:
         context['formulario_meta'] = FormularioMeta()
         context['metas'] = proyecto.metas.all() if proyecto else []
-        context['metas_predeterminadas'] = MetaPredeterminada.objects.filter(activa=True)
+        context['metas_predeterminadas'] = metas_predeterminadas_activas()
     elif paso_actual == 3:
         context['metas'] = proyecto.metas.prefetch_related('actividades').all() if proyecto else []
         context['formulario_actividad'] = FormularioActividad()
@@ -284,9 +282,9 @@ def crear_proyecto_wizard(request):
 @login_required
 def editar_proyecto(request, proyecto_id):
     """Vista para editar un proyecto existente"""
-    proyecto = get_object_or_404(Proyecto, id=proyecto_id)
+    proyecto = obtener_con_unidad(Proyecto, id=proyecto_id)
     
-    if request.user.rol == 'UNIDAD' and proyecto.unidad.unidad != request.user.unidad:
+    if not puede_acceder(request.user, proyecto):
         messages.error(request, 'No tiene permisos para editar este proyecto.')
         return redirect('poa:lista_proyectos')
     
@@ -308,9 +306,9 @@ def editar_proyecto(request, proyecto_id):
 @login_required
 def detalle_proyecto(request, proyecto_id):
     """Vista para ver el detalle de un proyecto"""
-    proyecto = get_object_or_404(Proyecto, id=proyecto_id)
+    proyecto = obtener_con_unidad(Proyecto, id=proyecto_id)
     
-    if request.user.rol == 'UNIDAD' and proyecto.unidad.unidad != request.user.unidad:
+    if not puede_acceder(request.user, proyecto):
         messages.error(request, 'No tiene permisos para ver este proyecto.')
         return redirect('poa:lista_proyectos')
     
@@ -325,9 +323,9 @@ def detalle_proyecto(request, proyecto_id):
 @login_required
 def eliminar_proyecto(request, proyecto_id):
     """Vista para eliminar un proyecto"""
-    proyecto = get_object_or_404(Proyecto, id=proyecto_id)
+    proyecto = obtener_con_unidad(Proyecto, id=proyecto_id)
     
-    if request.user.rol == 'UNIDAD' and proyecto.unidad.unidad != request.user.unidad:
+    if not puede_acceder(request.user, proyecto):
         messages.error(request, 'No tiene permisos para eliminar este proyecto.')
         return redirect('poa:lista_proyectos')
     
@@ -342,8 +340,8 @@ def eliminar_proyecto(request, proyecto_id):
 @login_required
 def eliminar_meta(request, meta_id):
     """Vista para eliminar una meta"""
-    meta = get_object_or_404(MetaProyecto, id=meta_id)
-    proyecto_id = meta.proyecto.id
+    meta = get_object_or_404(MetaProyecto.objects.visibles_para(request.user), id=meta_id)
+    proyecto_id = meta.proyecto_id
     
     if request.method == 'POST':
         meta.delete()
@@ -359,8 +357,8 @@ def eliminar_meta(request, meta_id):
 @login_required
 def eliminar_actividad(request, actividad_id):
     """Vista para eliminar una actividad"""
-    actividad = get_object_or_404(Actividad, id=actividad_id)
-    proyecto_id = actividad.meta.proyecto.id
+    actividad = get_object_or_404(Actividad.objects.visibles_para(request.user).select_related('meta'), id=actividad_id)
+    proyecto_id = actividad.meta.proyecto_id
     
     if request.method == 'POST':
         actividad.delete()
@@ -373,23 +371,52 @@ def eliminar_actividad(request, actividad_id):
         return redirect('poa:detalle_proyecto', proyecto_id=proyecto_id)
 
 
+@login_required
+def crear_proyecto_borrador(request):
+    """
+    Modo borrador: el POA completo se edita en el navegador y se envía como un solo
+    documento JSON que se valida y guarda en una transacción.
+    """
+    if request.user.rol != 'UNIDAD':
+        messages.error(request, 'Solo los usuarios de unidad pueden crear proyectos.')
+        return redirect('poa:lista_proyectos')
+
+    if request.method == 'POST':
+        try:
+            datos = json.loads(request.body)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return JsonResponse({'errores': ['El borrador no es un JSON válido.']}, status=400)
+        try:
+            proyecto = crear_desde_borrador(datos, request.user)
+        except BorradorInvalido as e:
+            return JsonResponse({'errores': e.errores}, status=400)
+        messages.success(request, 'Proyecto creado exitosamente. Puede ver sus proyectos en la lista.')
+        return JsonResponse({
+            'proyecto_id': proyecto.id,
+            'url': reverse('poa:detalle_proyecto', args=[proyecto.id]),
+        }, status=201)
+
+    return render(request, 'poa/crear_proyecto_borrador.html', {
+        'metas_predeterminadas': [meta.nombre for meta in metas_predeterminadas_activas()],
+        'unidades_medida': [valor for valor, _ in FormularioActividad.UNIDADES_MEDIDA if valor],
+        'anio_actual': timezone.now().year,
+    })
+
+
 @login_required
 def cancelar_wizard(request):
     """Vista para cancelar el wizard y limpiar la sesión"""
-    proyecto_id = request.session.get('wizard_proyecto_id')
+    proyecto_id = estado_wizard.obtener(request, 'wizard_proyecto_id')
     
     if proyecto_id:
         # Opcional: eliminar el proyecto en borrador
-        proyecto = Proyecto.objects.filter(id=proyecto_id).first()
+        proyecto = Proyecto.objects.filter(id=proyecto_id, unidad=request.user).first()
         if proyecto and request.GET.get('eliminar') == '1':
             proyecto.delete()
             messages.info(request, 'Creación de proyecto cancelada.')
     
-    # Limpiar sesión
-    if 'wizard_paso' in request.session:
-        del request.session['wizard_paso']
-    if 'wizard_proyecto_id' in request.session:
-        del request.session['wizard_proyecto_id']
+    # Limpiar el estado del wizard
+    estado_wizard.limpiar(request, 'wizard_paso', 'wizard_proyecto_id')
     
     return redirect('poa:lista_proyectos')
 
@@ -398,7 +425,7 @@ def enviar_proyecto(request, proyecto_id):
     """Vista para enviar un proyecto (cambiar estado de BORRADOR a ENVIADO)"""
     proyecto = get_object_or_404(Proyecto, id=proyecto_id)
     
-    if request.user.rol != 'UNIDAD' or proyecto.unidad != request.user:
+    if request.user.rol != 'UNIDAD' or proyecto.unidad_id != request.user.id:
         messages.error(request, 'No tiene permisos para enviar este proyecto.')
         return redirect('poa:lista_proyectos')
     
@@ -419,9 +446,9 @@ def enviar_proyecto(request, proyecto_id):
 @login_required
 def ver_poa_aprobado(request, proyecto_id):
     """Vista para ver el POA aprobado completo (solo lectura para unidades)"""
-    proyecto = get_object_or_404(Proyecto, id=proyecto_id)
+    proyecto = obtener_con_unidad(Proyecto, id=proyecto_id)
     
-    if request.user.rol == 'UNIDAD' and proyecto.unidad.unidad != request.user.unidad:
+    if not puede_acceder(request.user, proyecto):
         messages.error(request, 'No tiene permisos para ver este proyecto.')
         return redirect('login:dashboard_unidad')
     
@@ -441,9 +468,9 @@ def ver_poa_aprobado(request, proyecto_id):
 @login_required
 def gestionar_avances(request, proyecto_id):
     """Vista para gestionar los avances mensuales de las actividades"""
-    proyecto = get_object_or_404(Proyecto, id=proyecto_id)
+    proyecto = obtener_con_unidad(Proyecto, id=proyecto_id)
     
-    if request.user.rol == 'UNIDAD' and proyecto.unidad.unidad != request.user.unidad:
+    if not puede_acceder(request.user, proyecto):
         messages.error(request, 'No tiene permisos para gestionar este proyecto.')
         return redirect('login:dashboard_unidad')
     
@@ -458,40 +485,7 @@ def gestionar_avances(request, proyecto_id):
         cantidad_realizada = request.POST.get('cantidad_realizada')
         
         if actividad_id and mes and cantidad_realizada is not None:
-            actividad = get_object_or_404(Actividad, id=actividad_id, meta__proyecto=proyecto)
-            avance = get_object_or_404(AvanceMensual, actividad=actividad, mes=mes, anio=proyecto.anio)
-            
-            try:
-                cantidad_int = int(cantidad_realizada)
-                
-                if cantidad_int > 999999:
-                    messages.error(request, 'La cantidad realizada no puede exceder 999,999 unidades.')
-                    return redirect('poa:gestionar_avances', proyecto_id=proyecto.id)
-                
-                if cantidad_int < 0:
-                    messages.error(request, 'La cantidad realizada no puede ser negativa.')
-                else:
-                    if cantidad_int > avance.cantidad_programada_mes:
-                        avance.es_no_planificada = True
-                        messages.info(
-                            request, 
-                            f'Se registraron {cantidad_int - avance.cantidad_programada_mes} unidades adicionales no planificadas.'
-                        )
-                    else:
-                        avance.es_no_planificada = False
-                    
-                    avance.cantidad_realizada = cantidad_int
-                    avance.save()
-                    
-                    proyecto.fecha_modificacion = timezone.now()
-                    proyecto.save(update_fields=['fecha_modificacion'])
-                    
-                    messages.success(request, 'Avance actualizado exitosamente.')
-            except ValueError:
-                messages.error(request, 'La cantidad debe ser un número válido.')
-            except OverflowError:
-                messages.error(request, 'El número ingresado es demasiado grande. Por favor, ingrese un valor menor a 999,999.')
-            
+            _registrar_avance(request, proyecto, actividad_id, mes, cantidad_realizada, request.POST.get('version'))
             return redirect('poa:gestionar_avances', proyecto_id=proyecto.id)
     
     metas = proyecto.metas.prefetch_related('actividades__avances', 'actividades__evidencias').all()
@@ -502,7 +496,7 @@ def gestionar_avances(request, proyecto_id):
         for actividad in meta.actividades.all():
             for avance in actividad.avances.all():
                 # Contar evidencias para este mes específico
-                avance.evidencias_count = actividad.evidencias.filter(mes=avance.mes).count()
+                avance.evidencias_count = Evidencia.objects.del_mes(actividad, avance.mes).count()
     
     return render(request, 'poa/gestionar_avances.html', {
         'proyecto': proyecto,
@@ -511,12 +505,63 @@ def gestionar_avances(request, proyecto_id):
     })
 
 
+@login_required
+def gestionar_avances_grilla(request, proyecto_id):
+    """
+    Modo grilla de los avances: actividades por meses en una sola tabla; las celdas
+    modificadas se envían juntas como JSON y se responde solo con lo que cambió.
+    """
+    proyecto = obtener_con_unidad(Proyecto, id=proyecto_id)
+    
+    if not puede_acceder(request.user, proyecto):
+        if request.method == 'POST':
+            return JsonResponse({'errores': ['No tiene permisos para gestionar este proyecto.']}, status=403)
+        messages.error(request, 'No tiene permisos para gestionar este proyecto.')
+        return redirect('login:dashboard_unidad')
+    
+    if proyecto.estado != 'APROBADO':
+        if request.method == 'POST':
+            return JsonResponse({'errores': ['Solo puede gestionar avances de proyectos aprobados.']}, status=400)
+        messages.error(request, 'Solo puede gestionar avances de proyectos aprobados.')
+        return redirect('login:dashboard_unidad')
+    
+    if request.method == 'POST':
+        try:
+            datos = json.loads(request.body)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return JsonResponse({'errores': ['El envío no es un JSON válido.']}, status=400)
+        try:
+            diferencia = guardar_cambios(proyecto, datos)
+        except CambiosInvalidos as e:
+            return JsonResponse({'errores': e.errores}, status=400)
+        except GuardadoSimultaneo:
+            return JsonResponse({'errores': [
+                'Otro usuario guardó avances al mismo tiempo. Recargue la grilla y vuelva a intentarlo.'
+            ]}, status=409)
+        return JsonResponse(diferencia)
+    
+    avances = {
+        (avance.actividad_id, avance.mes): avance
+        for avance in AvanceMensual.objects.filter(actividad__meta__proyecto=proyecto, anio=proyecto.anio)
+    }
+    filas = [
+        {'actividad': actividad, 'avances': [avances.get((actividad.id, mes)) for mes in range(1, 13)]}
+        for actividad in Actividad.objects.filter(meta__proyecto=proyecto).select_related('meta').order_by('meta_id', 'id')
+    ]
+    
+    return render(request, 'poa/gestionar_avances_grilla.html', {
+        'proyecto': proyecto,
+        'filas': filas,
+        'meses': AvanceMensual.MESES,
+    })
+
+
 @login_required
 def gestionar_evidencias(request, proyecto_id):
     """Vista para gestionar las evidencias de las actividades"""
-    proyecto = get_object_or_404(Proyecto, id=proyecto_id)
+    proyecto = obtener_con_unidad(Proyecto, id=proyecto_id)
     
-    if request.user.rol == 'UNIDAD' and proyecto.unidad.unidad != request.user.unidad:
+    if not puede_acceder(request.user, proyecto):
         messages.error(request, 'No tiene permisos para gestionar este proyecto.')
         return redirect('login:dashboard_unidad')
     
@@ -554,54 +599,85 @@ def gestionar_evidencias(request, proyecto_id):
 @login_required
 def ver_reportes(request, proyecto_id):
     """Vista para ver reportes del POA"""
-    proyecto = get_object_or_404(Proyecto, id=proyecto_id)
+    proyecto = obtener_con_unidad(Proyecto, id=proyecto_id)
     
-    if request.user.rol == 'UNIDAD' and proyecto.unidad.unidad != request.user.unidad:
+    if not puede_acceder(request.user, proyecto):
         messages.error(request, 'No tiene permisos para ver este proyecto.')
         return redirect('login:dashboard_unidad')
     
     total_actividades = Actividad.objects.filter(meta__proyecto=proyecto).count()
     
-    # Calcular total programado
-    total_programado = Decimal(0)
-    for avance in AvanceMensual.objects.filter(actividad__meta__proyecto=proyecto):
-        total_programado += Decimal(avance.cantidad_programada_mes or 0)
-    
-    
-    total_realizado = Decimal(0)
-    for avance in AvanceMensual.objects.filter(actividad__meta__proyecto=proyecto):
-        cantidad_realizada = Decimal(avance.cantidad_realizada or 0)
-        cantidad_programada = Decimal(avance.cantidad_programada_mes or 0)
-        total_realizado += min(cantidad_realizada, cantidad_programada)
-    
-    try:
-        if total_programado > 0:
-            porcentaje_cumplimiento = (total_realizado / total_programado * 100)
-            porcentaje_cumplimiento = round(porcentaje_cumplimiento, 2)
-            
-            if porcentaje_cumplimiento > 100:
-                porcentaje_cumplimiento = Decimal(100)
-        else:
-            porcentaje_cumplimiento = Decimal(0)
-    except (InvalidOperation, ZeroDivisionError, Exception) as e:
-        porcentaje_cumplimiento = Decimal(0)
-        messages.warning(request, 'Error al calcular el porcentaje de cumplimiento.')
+    # Totales y desgloses por meta y por mes en una sola consulta agrupada
+    # (realizado con tope en lo programado)
+    desglose = desglose_cumplimiento(AvanceMensual.objects.filter(actividad__meta__proyecto=proyecto))
+    totales = desglose['totales']
+    nombres_mes = dict(AvanceMensual.MESES)
+    for fila in desglose['por_mes']:
+        fila['nombre'] = nombres_mes[fila['mes']]
     
     return render(request, 'poa/ver_reportes.html', {
         'proyecto': proyecto,
         'total_actividades': total_actividades,
-        'total_programado': total_programado,
-        'total_realizado': total_realizado,
-        'porcentaje_cumplimiento': porcentaje_cumplimiento,
+        'total_programado': totales['programado'],
+        'total_realizado': totales['realizado'],
+        'porcentaje_cumplimiento': totales['porcentaje'],
+        'cumplimiento_por_meta': desglose['por_meta'],
+        'cumplimiento_por_mes': desglose['por_mes'],
     })
 
+def _registrar_avance(request, proyecto, actividad_id, mes, cantidad_realizada, version):
+    """
+    Valida y registra la cantidad realizada de un avance (gestionar_avances y
+    registrar_avance_actividad): una lectura del avance y un UPDATE condicionado a su versión.
+    """
+    try:
+        cantidad_int = int(cantidad_realizada)
+    except ValueError:
+        messages.error(request, 'La cantidad debe ser un número válido.')
+        return
+    
+    if cantidad_int > 999999:
+        messages.error(request, 'La cantidad realizada no puede exceder 999,999 unidades.')
+        return
+    if cantidad_int < 0:
+        messages.error(request, 'La cantidad realizada no puede ser negativa.')
+        return
+    
+    avance = (
+        AvanceMensual.objects.filter(actividad_id=actividad_id, actividad__meta__proyecto=proyecto, mes=mes, anio=proyecto.anio)
+        .values('id', 'cantidad_programada_mes', 'version').first()
+    )
+    if avance is None:
+        raise Http404('Avance no encontrado')
+    try:
+        version = int(version)
+    except (TypeError, ValueError):
+        version = avance['version']
+    
+    if not AvanceMensual.objects.filter(id=avance['id']).registrar_realizado(cantidad_int, version):
+        messages.warning(
+            request,
+            'Otro usuario modificó este avance mientras usted lo editaba. Revise el valor actual y vuelva a intentarlo.'
+        )
+        return
+    
+    # El UPDATE no emite señales: se invalidan aquí las cachés que dependen de los avances
+    incrementar_version('dashboard', espacio_unidad(proyecto.unidad.unidad_id))
+    proyecto.registrar_modificacion()
+    
+    excedente = cantidad_int - avance['cantidad_programada_mes']
+    if excedente > 0:
+        messages.info(request, f'Se registraron {excedente} unidades adicionales no planificadas.')
+    messages.success(request, 'Avance actualizado exitosamente.')
+
+
 @login_required
 def registrar_avance_actividad(request, actividad_id):
     """Vista para registrar avances mensuales de una actividad específica"""
-    actividad = get_object_or_404(Actividad, id=actividad_id)
+    actividad = obtener_con_unidad(Actividad, id=actividad_id)
     proyecto = actividad.meta.proyecto
     
-    if request.user.rol == 'UNIDAD' and proyecto.unidad.unidad != request.user.unidad:
+    if not puede_acceder(request.user, actividad):
         messages.error(request, 'No tiene permisos para gestionar esta actividad.')
         return redirect('login:dashboard_unidad')
     
@@ -615,39 +691,7 @@ def registrar_avance_actividad(request, actividad_id):
         cantidad_realizada = request.POST.get('cantidad_realizada')
         
         if mes and cantidad_realizada is not None:
-            avance = get_object_or_404(AvanceMensual, actividad=actividad, mes=mes, anio=proyecto.anio)
-            
-            try:
-                cantidad_int = int(cantidad_realizada)
-                
-                if cantidad_int > 999999:
-                    messages.error(request, 'La cantidad realizada no puede exceder 999,999 unidades.')
-                    return redirect('poa:registrar_avance_actividad', actividad_id=actividad.id)
-                
-                if cantidad_int < 0:
-                    messages.error(request, 'La cantidad realizada no puede ser negativa.')
-                else:
-                    if cantidad_int > avance.cantidad_programada_mes:
-                        avance.es_no_planificada = True
-                        messages.info(
-                            request,
-                            f'Se registraron {cantidad_int - avance.cantidad_programada_mes} unidades adicionales no planificadas.'
-                        )
-                    else:
-                        avance.es_no_planificada = False
-                    
-                    avance.cantidad_realizada = cantidad_int
-                    avance.save()
-                    
-                    proyecto.fecha_modificacion = timezone.now()
-                    proyecto.save(update_fields=['fecha_modificacion'])
-                    
-                    messages.success(request, 'Avance actualizado exitosamente.')
-            except ValueError:
-                messages.error(request, 'La cantidad debe ser un número válido.')
-            except OverflowError:
-                messages.error(request, 'El número ingresado es demasiado grande. Por favor, ingrese un valor menor a 999,999.')
-            
+            _registrar_avance(request, proyecto, actividad.id, mes, cantidad_realizada, request.POST.get('version'))
             return redirect('poa:registrar_avance_actividad', actividad_id=actividad.id)
     
     avances = AvanceMensual.objects.filter(actividad=actividad, anio=proyecto.anio).order_by('mes')
@@ -665,10 +709,10 @@ def registrar_avance_actividad(request, actividad_id):
 @login_required
 def subir_evidencia_actividad(request, actividad_id):
     """Vista para subir evidencias de una actividad específica"""
-    actividad = get_object_or_404(Actividad, id=actividad_id)
+    actividad = obtener_con_unidad(Actividad, id=actividad_id)
     proyecto = actividad.meta.proyecto
     
-    if request.user.rol == 'UNIDAD' and proyecto.unidad.unidad != request.user.unidad:
+    if not puede_acceder(request.user, actividad):
         messages.error(request, 'No tiene permisos para gestionar esta actividad.')
         return redirect('login:dashboard_unidad')
     
@@ -711,10 +755,10 @@ def subir_evidencia_mes(request):
         descripcion = request.POST.get('descripcion', '')
         
         if actividad_id and mes and tipo:
-            actividad = get_object_or_404(Actividad, id=actividad_id)
+            actividad = obtener_con_unidad(Actividad, id=actividad_id)
             proyecto = actividad.meta.proyecto
             
-            if request.user.rol == 'UNIDAD' and proyecto.unidad.unidad != request.user.unidad:
+            if not puede_acceder(request.user, actividad):
                 messages.error(request, 'No tiene permisos para subir evidencias.')
                 return redirect('login:dashboard_unidad')
             
@@ -773,15 +817,14 @@ def subir_evidencia_mes(request):
 @login_required
 def obtener_evidencias_mes(request, actividad_id, mes):
     """Vista AJAX para obtener las evidencias de un mes específico"""
-    actividad = get_object_or_404(Actividad, id=actividad_id)
-    proyecto = actividad.meta.proyecto
+    actividad = obtener_con_unidad(Actividad, id=actividad_id)
     
-    if request.user.rol == 'UNIDAD' and proyecto.unidad.unidad != request.user.unidad:
+    if not puede_acceder(request.user, actividad):
         return JsonResponse({'error': 'No tiene permisos'}, status=403)
     
     # Si es ADMIN, permitir acceso sin restricciones adicionales
     
-    evidencias = Evidencia.objects.filter(actividad=actividad, mes=mes).order_by('-fecha_subida')
+    evidencias = Evidencia.objects.del_mes(actividad, mes).order_by('-fecha_subida')
     
     evidencias_data = []
     for ev in evidencias:
@@ -862,3 +905,60 @@ def crear_actividad_no_planificada(request):
         'formulario': formulario,
         'proyecto': proyecto
     })
+
+
+@login_required
+def buscar(request):
+    """
+    Búsqueda de texto completo (AJAX) en proyectos, metas, actividades y unidades.
+    Las unidades solo ven resultados propios; administradores y auditores ven todo.
+    """
+    consulta = request.GET.get('q', '').strip()
+    
+    if request.user.rol == 'UNIDAD':
+        documentos = busqueda.buscar(
+            consulta, unidad=request.user.unidad, tipos=['PROYECTO', 'META', 'ACTIVIDAD']
+        )
+    else:
+        documentos = busqueda.buscar(consulta)
+    
+    resultados = []
+    for doc in documentos:
+        resultados.append({
+            'tipo': doc.get_tipo_display(),
+            'titulo': doc.titulo,
+            'url': busqueda.url_resultado(doc, request.user),
+        })
+    
+    return JsonResponse({'resultados': resultados})
+
+
+@login_required
+def cambios_desde(request):
+    """
+    Bandeja de cambios (JSON) para los consumidores de analítica: los cambios
+    posteriores al cursor `desde`, en orden. La respuesta trae el cursor para la
+    siguiente consulta y si quedan cambios pendientes. Solo administradores y auditores.
+    """
+    if request.user.rol not in ('ADMIN', 'AUDITOR'):
+        return JsonResponse({'errores': ['No tiene permisos para consultar los cambios.']}, status=403)
+    
+    try:
+        desde = int(request.GET.get('desde', 0))
+        limite = int(request.GET.get('limite', CAMBIOS_POR_PAGINA))
+    except ValueError:
+        return JsonResponse({'errores': ['desde y limite deben ser números enteros.']}, status=400)
+    if desde < 0 or limite < 1:
+        return JsonResponse({'errores': ['desde no puede ser negativo y limite debe ser mayor a 0.']}, status=400)
+    limite = min(limite, MAXIMO_CAMBIOS_POR_PAGINA)
+    
+    # Se lee uno más para saber si quedan cambios sin contar la tabla
+    cambios = list(RegistroCambio.objects.desde(desde, limite + 1))
+    hay_mas = len(cambios) > limite
+    cambios = cambios[:limite]
+    
+    return JsonResponse({
+        'cambios': [cambio.como_dict() for cambio in cambios],
+        'cursor': cambios[-1].id if cambios else desde,
+        'hay_mas': hay_mas,
+    })
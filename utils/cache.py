@@ -0,0 +1,205 @@
+"""
+Utilidades de caché compartidas.
+Los datos derivados se versionan por espacio (p. ej. 'unidades', 'dashboard'): las
+señales incrementan la versión y todo lo calculado con la versión anterior queda
+obsoleto sin tener que buscar y borrar cada entrada.
+Usado por administrador, auditor y poa.
+"""
+import itertools
+import pickle
+import threading
+import time
+import zlib
+from collections import Counter
+
+from django.core.cache import cache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.files import locks
+from django.db import transaction
+
+TTL_POR_DEFECTO = 5 * 60
+
+# Cada cuántos eventos se vuelcan las métricas locales del proceso a la caché compartida
+VOLCADO_METRICAS = 50
+CLAVE_METRICAS = 'metricas:cache'
+RESULTADOS = ('aciertos', 'fallos')
+
+_AUSENTE = object()
+_metricas_locales = Counter()
+_bloqueo_metricas = threading.Lock()
+# Espacios a invalidar al confirmar la transacción en curso (por hilo)
+_pendientes = threading.local()
+
+
+class CacheArchivos(FileBasedCache):
+    """
+    FileBasedCache que revisa el tamaño del directorio cada CULL_INTERVAL escrituras
+    (OPTIONS) en lugar de listarlo completo en cada set.
+    """
+
+    def __init__(self, dir, params):
+        super().__init__(dir, params)
+        self._intervalo_cull = int(params.get('OPTIONS', {}).get('CULL_INTERVAL', 100))
+        self._escrituras = itertools.count()
+
+    def _cull(self):
+        if next(self._escrituras) % self._intervalo_cull == 0:
+            super()._cull()
+
+    def incr(self, key, delta=1, version=None):
+        """
+        Como touch(): lee y reescribe el archivo con un bloqueo exclusivo, para que dos
+        workers no se pisen los incrementos, y conserva el vencimiento de la clave (el
+        incr de Django hace get y set con el TIMEOUT por defecto).
+        """
+        try:
+            with open(self._key_to_file(key, version), 'r+b') as f:
+                try:
+                    locks.lock(f, locks.LOCK_EX)
+                    try:
+                        expira = pickle.load(f)
+                    except EOFError:
+                        expira = 0
+                    if expira is not None and expira < time.time():
+                        raise ValueError(f"Key '{key}' not found")
+                    valor = pickle.loads(zlib.decompress(f.read())) + delta
+                    f.seek(0)
+                    f.write(pickle.dumps(expira, self.pickle_protocol))
+                    f.write(zlib.compress(pickle.dumps(valor, self.pickle_protocol)))
+                    f.truncate()
+                    return valor
+                finally:
+                    locks.unlock(f)
+        except FileNotFoundError:
+            raise ValueError(f"Key '{key}' not found")
+
+
+def _clave_version(espacio):
+    return f'version:{espacio}'
+
+
+def _marca_tiempo():
+    # Versiones basadas en el reloj (microsegundos): no se repite una anterior aunque la
+    # caché se vacíe, y dos workers que invalidan a la vez no pierden la invalidación
+    return time.time_ns() // 1000
+
+
+def version_datos(espacio):
+    """Retorna la versión vigente de un espacio de datos"""
+    clave = _clave_version(espacio)
+    version = cache.get(clave)
+    if version is None:
+        cache.add(clave, _marca_tiempo(), None)
+        version = cache.get(clave)
+    return version
+
+
+def _invalidar_pendientes():
+    espacios = getattr(_pendientes, 'espacios', None)
+    if not espacios:
+        return
+    _pendientes.espacios = set()
+    version = _marca_tiempo()
+    cache.set_many({_clave_version(espacio): version for espacio in espacios}, None)
+
+
+def incrementar_version(*espacios):
+    """
+    Invalida todo lo derivado de los espacios de datos indicados.
+    Dentro de una transacción espera a que se confirme: antes, otra petición podría
+    recalcular con los datos viejos y cachearlos con la versión nueva. Los espacios de
+    toda la transacción se acumulan y se escriben una sola vez (p. ej. al borrar un
+    proyecto en cascada con cientos de avances).
+    La nueva versión es la hora actual en microsegundos, lo que permite usarla
+    también como fecha de última modificación.
+    """
+    if not hasattr(_pendientes, 'espacios'):
+        _pendientes.espacios = set()
+    _pendientes.espacios.update(espacios)
+    # La primera llamada que se ejecuta escribe todos los espacios; las demás no hacen nada.
+    # Si la transacción se revierte, sus espacios se invalidan con la siguiente (inofensivo).
+    transaction.on_commit(_invalidar_pendientes)
+
+
+# --- Valores cacheados ---
+
+def _registrar(nombre, resultado):
+    with _bloqueo_metricas:
+        _metricas_locales[(nombre, resultado)] += 1
+        if sum(_metricas_locales.values()) < VOLCADO_METRICAS:
+            return
+        pendientes = dict(_metricas_locales)
+        _metricas_locales.clear()
+    volcar_metricas(pendientes)
+
+
+def _clave_contador(nombre, resultado):
+    return f'{CLAVE_METRICAS}:{nombre}:{resultado}'
+
+
+def volcar_metricas(pendientes=None):
+    """
+    Suma las métricas del proceso a los totales compartidos por todos los workers.
+    Cada total es un contador propio que se suma con incr (atómico), de modo que dos
+    workers que vuelcan a la vez no pierden sus conteos.
+    """
+    if pendientes is None:
+        with _bloqueo_metricas:
+            pendientes = dict(_metricas_locales)
+            _metricas_locales.clear()
+    if not pendientes:
+        return
+    for (nombre, resultado), cantidad in pendientes.items():
+        clave = _clave_contador(nombre, resultado)
+        cache.add(clave, 0, None)
+        try:
+            cache.incr(clave, cantidad)
+        except ValueError:
+            # La caché descartó el contador entre add e incr
+            cache.add(clave, cantidad, None)
+    # Lista de nombres para obtener_metricas; si dos workers la pisan, el nombre perdido
+    # vuelve a agregarse en su siguiente volcado (los conteos no se pierden)
+    nombres = cache.get(CLAVE_METRICAS, set())
+    nuevos = {nombre for nombre, _ in pendientes} - nombres
+    if nuevos:
+        cache.set(CLAVE_METRICAS, nombres | nuevos, None)
+
+
+def obtener_metricas():
+    """Aciertos, fallos y tasa de aciertos por clave"""
+    volcar_metricas()
+    nombres = sorted(cache.get(CLAVE_METRICAS, set()))
+    contadores = cache.get_many([_clave_contador(n, r) for n in nombres for r in RESULTADOS])
+    metricas = {}
+    for nombre in nombres:
+        conteo = {r: contadores.get(_clave_contador(nombre, r), 0) for r in RESULTADOS}
+        total = conteo['aciertos'] + conteo['fallos']
+        metricas[nombre] = {**conteo, 'tasa_aciertos': round(conteo['aciertos'] / total, 4) if total else 0}
+    return metricas
+
+
+def reiniciar_metricas():
+    """Pone en cero los totales compartidos"""
+    nombres = cache.get(CLAVE_METRICAS, set())
+    cache.delete_many([_clave_contador(n, r) for n in nombres for r in RESULTADOS] + [CLAVE_METRICAS])
+
+
+def cacheado(espacio, nombre, calcular, ttl=TTL_POR_DEFECTO):
+    """
+    Retorna el valor cacheado para la versión vigente del espacio o lo calcula.
+
+    Args:
+        espacio: espacio de datos cuya versión invalida el valor
+        nombre: nombre de la clave dentro del espacio (también agrupa las métricas)
+        calcular: función sin argumentos que produce el valor
+        ttl: segundos de vida del valor aunque la versión no cambie
+    """
+    clave = f'{espacio}:{nombre}:{version_datos(espacio)}'
+    valor = cache.get(clave, _AUSENTE)
+    if valor is _AUSENTE:
+        _registrar(f'{espacio}:{nombre}', 'fallos')
+        valor = calcular()
+        cache.set(clave, valor, ttl)
+    else:
+        _registrar(f'{espacio}:{nombre}', 'aciertos')
+    return valor
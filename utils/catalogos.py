@@ -0,0 +1,42 @@
+"""
+Catálogos configurados por el administrador (metas predeterminadas y objetivos
+estratégicos) cacheados en la memoria de cada proceso.
+Cambian pocas veces al año: se cargan una vez por versión del espacio 'catalogos' y las
+señales de poa incrementan la versión al crearlos, editarlos o eliminarlos.
+Usado por poa (wizard de proyectos) y administrador.
+"""
+import threading
+
+from poa.models import MetaPredeterminada, ObjetivoEstrategico
+from .cache import version_datos
+
+ESPACIO = 'catalogos'
+
+_catalogos = {}
+_bloqueo = threading.Lock()
+
+
+def _obtener(nombre, cargar):
+    version = version_datos(ESPACIO)
+    with _bloqueo:
+        vigente = _catalogos.get(nombre)
+        if vigente is None or vigente[0] != version:
+            vigente = (version, cargar())
+            _catalogos[nombre] = vigente
+    return vigente[1]
+
+
+def metas_predeterminadas_activas():
+    """Metas predeterminadas activas, en el orden del modelo (por nombre)"""
+    return _obtener('metas_predeterminadas', lambda: tuple(MetaPredeterminada.objects.filter(activa=True)))
+
+
+def objetivos_estrategicos_activos():
+    """Objetivos estratégicos activos, los más recientes primero"""
+    return _obtener('objetivos_estrategicos', lambda: tuple(ObjetivoEstrategico.objects.filter(activa=True)))
+
+
+def limpiar():
+    """Descarta las copias en memoria del proceso (p. ej. entre tests)"""
+    with _bloqueo:
+        _catalogos.clear()
@@ -0,0 +1,117 @@
+"""
+Límite de exportaciones consolidadas simultáneas.
+Cada exportación ocupa un cupo: primero un semáforo del proceso (hilos del mismo
+worker) y luego un archivo bloqueado con flock entre MAXIMO_EXPORTACIONES archivos de
+EXPORTACIONES_DIR (workers distintos). El sistema operativo libera el bloqueo aunque el
+worker muera a mitad de la exportación.
+Usado por administrador y auditor.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.http import HttpResponse
+from django.shortcuts import redirect
+from django.utils.http import url_has_allowed_host_and_scheme
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo se limita dentro de cada proceso
+    fcntl = None
+
+INTERVALO_REINTENTO = 0.2
+REINTENTAR_EN = 10
+
+_semaforo = None
+_bloqueo_semaforo = threading.Lock()
+
+
+class SinCupo(Exception):
+    """Todas las exportaciones permitidas están en curso"""
+
+
+def _semaforo_proceso():
+    global _semaforo
+    with _bloqueo_semaforo:
+        if _semaforo is None:
+            _semaforo = threading.BoundedSemaphore(settings.MAXIMO_EXPORTACIONES)
+        return _semaforo
+
+
+def _tomar_archivo():
+    """Retorna el descriptor del primer cupo libre entre los workers, o None"""
+    if fcntl is None:
+        return -1
+    os.makedirs(settings.EXPORTACIONES_DIR, exist_ok=True)
+    for cupo in range(settings.MAXIMO_EXPORTACIONES):
+        fd = os.open(os.path.join(settings.EXPORTACIONES_DIR, f'cupo_{cupo}.lock'), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return fd
+        except BlockingIOError:
+            os.close(fd)
+    return None
+
+
+def _liberar_archivo(fd):
+    if fd >= 0:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+
+@contextmanager
+def cupo_exportacion(espera=None):
+    """
+    Ocupa un cupo durante el bloque. Espera hasta `espera` segundos
+    (ESPERA_EXPORTACIONES por defecto) y si no se libera ninguno lanza SinCupo.
+    """
+    espera = settings.ESPERA_EXPORTACIONES if espera is None else espera
+    limite = time.monotonic() + espera
+    semaforo = _semaforo_proceso()
+    if not semaforo.acquire(timeout=espera):
+        raise SinCupo()
+    try:
+        fd = _tomar_archivo()
+        while fd is None and time.monotonic() < limite:
+            time.sleep(INTERVALO_REINTENTO)
+            fd = _tomar_archivo()
+        if fd is None:
+            raise SinCupo()
+        try:
+            yield
+        finally:
+            _liberar_archivo(fd)
+    finally:
+        semaforo.release()
+
+
+def _sin_cupo(request):
+    mensaje = 'Hay demasiadas exportaciones en curso. Intente nuevamente en unos segundos.'
+    origen = request.META.get('HTTP_REFERER')
+    if origen and url_has_allowed_host_and_scheme(origen, allowed_hosts={request.get_host()}):
+        messages.warning(request, mensaje)
+        return redirect(origen)
+    respuesta = HttpResponse(mensaje, status=503, content_type='text/plain; charset=utf-8')
+    respuesta['Retry-After'] = str(REINTENTAR_EN)
+    return respuesta
+
+
+def limitar_exportaciones(view_func):
+    """
+    Decorator para las vistas de exportación consolidada: si no hay cupo, vuelve a la
+    página anterior con un aviso (o responde 503 con Retry-After).
+    Va debajo del decorator de rol para que los accesos rechazados no ocupen cupos.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        try:
+            with cupo_exportacion():
+                return view_func(request, *args, **kwargs)
+        except SinCupo:
+            return _sin_cupo(request)
+
+    return wrapper
@@ -0,0 +1,116 @@
+"""
+Cálculo del porcentaje de cumplimiento sin objetos Decimal intermedios.
+Usado por el modelo AvanceMensual (en cada guardado), por el motor de estadísticas y
+por las vistas de reportes. Lo realizado se toma hasta el tope de lo programado:
+lo no planificado se registra completo pero no suma al cumplimiento.
+"""
+from decimal import Decimal
+
+from django.db.models import Case, DecimalField, IntegerField, Sum, Value, When
+from django.db.models.functions import Coalesce, Least
+from django.db.models.lookups import Exact, GreaterThan
+
+CIEN = Decimal(100)
+
+
+def porcentaje_cumplimiento(realizado, programado, decimales=2):
+    """
+    Porcentaje realizado/programado calculado con enteros (centésimas de punto porcentual
+    con decimales=2) y redondeado mitad al par, igual que round() sobre Decimal.
+    Retorna Decimal, o None si no hay programación.
+    """
+    if not programado:
+        return None
+    cociente, resto = divmod(realizado * 100 * 10 ** decimales, programado)
+    if 2 * resto > programado or (2 * resto == programado and cociente % 2):
+        cociente += 1
+    return min(Decimal(cociente).scaleb(-decimales), CIEN)
+
+
+def porcentaje_cumplimiento_sql(realizado, programado, decimales=2):
+    """
+    Expresión SQL equivalente a porcentaje_cumplimiento (división entera y redondeo
+    mitad al par) para calcular el cumplimiento dentro de un UPDATE.
+    realizado ya debe venir con tope; retorna NULL si no hay programación.
+    """
+    numerador = realizado * Value(100 * 10 ** decimales, output_field=IntegerField())
+    cociente = numerador / programado
+    doble_resto = (numerador - cociente * programado) * Value(2)
+    ajuste = Case(
+        When(GreaterThan(doble_resto, programado), then=Value(1)),
+        # Empate: se sube solo si el cociente es impar
+        When(Exact(doble_resto, programado), then=cociente - cociente / Value(2) * Value(2)),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    salida = DecimalField(max_digits=5, decimal_places=decimales)
+    return Case(
+        When(GreaterThan(programado, Value(0)), then=(cociente + ajuste) * Value(Decimal(1).scaleb(-decimales))),
+        default=Value(None),
+        output_field=salida,
+    )
+
+
+def realizado_con_tope(prefijo=''):
+    """Expresión SQL de lo realizado hasta el tope de lo programado"""
+    return Least(f'{prefijo}cantidad_realizada', f'{prefijo}cantidad_programada_mes')
+
+
+def agregados_cumplimiento(prefijo=''):
+    """Agregados de programado y realizado (con tope) para aggregate()/annotate()"""
+    return {
+        'programado': Coalesce(Sum(f'{prefijo}cantidad_programada_mes'), Value(0)),
+        'realizado': Coalesce(Sum(realizado_con_tope(prefijo)), Value(0)),
+    }
+
+
+def totales_cumplimiento(avances, decimales=2):
+    """
+    Totales de un queryset de AvanceMensual en una sola consulta:
+    programado, realizado (con tope) y porcentaje (0 si no hay programación).
+    """
+    totales = avances.order_by().aggregate(**agregados_cumplimiento())
+    totales['porcentaje'] = (
+        porcentaje_cumplimiento(totales['realizado'], totales['programado'], decimales) or Decimal(0)
+    )
+    return totales
+
+
+def _con_porcentaje(acumulado, decimales):
+    acumulado['porcentaje'] = porcentaje_cumplimiento(acumulado['realizado'], acumulado['programado'], decimales)
+    return acumulado
+
+
+def desglose_cumplimiento(avances, decimales=2):
+    """
+    Totales, desglose por meta y por mes de un queryset de AvanceMensual, a partir
+    de una sola consulta agrupada por (meta, mes).
+    En el desglose el porcentaje es None cuando no hay programación.
+    """
+    filas = (
+        avances.order_by()
+        .values('actividad__meta_id', 'actividad__meta__descripcion', 'mes')
+        .annotate(**agregados_cumplimiento())
+    )
+    totales = {'programado': 0, 'realizado': 0}
+    por_meta = {}
+    por_mes = {}
+    for fila in filas:
+        meta = por_meta.setdefault(fila['actividad__meta_id'], {
+            'id': fila['actividad__meta_id'],
+            'descripcion': fila['actividad__meta__descripcion'],
+            'programado': 0,
+            'realizado': 0,
+        })
+        mes = por_mes.setdefault(fila['mes'], {'mes': fila['mes'], 'programado': 0, 'realizado': 0})
+        for acumulado in (totales, meta, mes):
+            acumulado['programado'] += fila['programado']
+            acumulado['realizado'] += fila['realizado']
+
+    _con_porcentaje(totales, decimales)
+    totales['porcentaje'] = totales['porcentaje'] or Decimal(0)
+    return {
+        'totales': totales,
+        'por_meta': [_con_porcentaje(por_meta[i], decimales) for i in sorted(por_meta)],
+        'por_mes': [_con_porcentaje(por_mes[m], decimales) for m in sorted(por_mes)],
+    }
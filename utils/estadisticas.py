@@ -0,0 +1,205 @@
+"""
+Motor de estadísticas compartido.
+Usado por administrador y auditor (dashboards, estadísticas y exportaciones) para
+calcular los agregados con consultas agrupadas en lugar de una consulta por unidad,
+estado o mes.
+"""
+from django.db.models import Avg, Count, Case, When, IntegerField, Q
+
+from login.models import Usuario
+from poa.models import Proyecto, Actividad, AvanceMensual, Evidencia
+from .cumplimiento import totales_cumplimiento
+
+# Orden de los estados en los gráficos
+ESTADOS_GRAFICO = ['APROBADO', 'ENVIADO', 'RECHAZADO', 'BORRADOR']
+MESES = range(1, 13)
+
+
+def _redondear(valor):
+    return round(float(valor or 0), 2)
+
+
+# --- Proyectos y avances ---
+
+def histograma_estados():
+    """Cantidad de proyectos por estado (todos los estados presentes, aunque sea con 0)"""
+    histograma = {estado: 0 for estado, _ in Proyecto.ESTADOS}
+    for estado, total in Proyecto.objects.order_by().values_list('estado').annotate(total=Count('id')):
+        histograma[estado] = total
+    return histograma
+
+
+def series_mensuales():
+    """
+    Series de los 12 meses en una sola consulta agrupada:
+    cumplimiento promedio (sin los avances que no aplican), programado y realizado (sumas).
+    """
+    filas = {fila['mes']: fila for fila in AvanceMensual.objects.totales_por_mes()}
+    vacia = {'promedio': None, 'programado': 0, 'realizado': 0}
+    return {
+        'cumplimiento_mensual': [_redondear(filas.get(mes, vacia)['promedio']) for mes in MESES],
+        'programado_mensual': [filas.get(mes, vacia)['programado'] or 0 for mes in MESES],
+        'realizado_mensual': [filas.get(mes, vacia)['realizado'] or 0 for mes in MESES],
+    }
+
+
+def datos_proyectos():
+    """Datos de los gráficos de proyectos: histograma de estados y series mensuales"""
+    histograma = histograma_estados()
+    return {
+        'estados': [histograma[estado] for estado in ESTADOS_GRAFICO],
+        **series_mensuales(),
+    }
+
+
+def conteos_generales():
+    """Totales de las tarjetas de los dashboards"""
+    histograma = histograma_estados()
+    return {
+        'total_unidades': Usuario.objects.unidades().count(),
+        'total_proyectos': sum(histograma.values()),
+        'proyectos_aprobados': histograma['APROBADO'],
+        'proyectos_pendientes': histograma['ENVIADO'],
+        'proyectos_borrador': histograma['BORRADOR'],
+    }
+
+
+# --- Por unidad ---
+
+def poa_aprobado_por_unidad():
+    """
+    {usuario_unidad_id: proyecto_id} con el POA aprobado de referencia de cada unidad:
+    el mismo que retorna Proyecto.objects.aprobados_de(u).first()
+    """
+    poas = {}
+    for unidad_id, proyecto_id in (
+        Proyecto.objects.filter(estado='APROBADO').order_by('unidad_id', '-anio', 'id')
+        .values_list('unidad_id', 'id')
+    ):
+        poas.setdefault(unidad_id, proyecto_id)
+    return poas
+
+
+def _por_proyecto(queryset, campo_proyecto, agregado):
+    return dict(
+        queryset.order_by().values_list(campo_proyecto).annotate(valor=agregado)
+    )
+
+
+def cumplimiento_por_proyecto(proyecto_ids):
+    """{proyecto_id: cumplimiento promedio} de los proyectos indicados"""
+    promedios = _por_proyecto(
+        AvanceMensual.objects.filter(actividad__meta__proyecto_id__in=proyecto_ids),
+        'actividad__meta__proyecto_id', Avg('cumplimiento'),
+    )
+    return {proyecto_id: _redondear(promedios.get(proyecto_id)) for proyecto_id in proyecto_ids}
+
+
+def datos_unidades():
+    """Cumplimiento, proyectos y métricas del POA aprobado de cada unidad para los gráficos"""
+    unidades = list(
+        Usuario.objects.unidades().select_related('unidad').annotate(total_proyectos=Count('proyectos'))
+    )
+    poas = poa_aprobado_por_unidad()
+    ids = list(poas.values())
+    cumplimientos = cumplimiento_por_proyecto(ids)
+    evidencias = _por_proyecto(
+        Evidencia.objects.filter(actividad__meta__proyecto_id__in=ids), 'actividad__meta__proyecto_id', Count('id')
+    )
+    actividades = _por_proyecto(
+        Actividad.objects.filter(meta__proyecto_id__in=ids), 'meta__proyecto_id', Count('id')
+    )
+
+    unidades_data = {'nombres': [], 'cumplimiento': [], 'proyectos': [], 'metricas': []}
+    for unidad in unidades:
+        unidades_data['nombres'].append(unidad.unidad.nombre)
+        unidades_data['proyectos'].append(unidad.total_proyectos)
+        poa_id = poas.get(unidad.id)
+        if poa_id is None:
+            unidades_data['cumplimiento'].append(0.0)
+            unidades_data['metricas'].append([0, 0, 0, 0, 0])
+            continue
+        cumplimiento = cumplimientos[poa_id]
+        unidades_data['cumplimiento'].append(cumplimiento)
+        unidades_data['metricas'].append([
+            cumplimiento,
+            min(evidencias.get(poa_id, 0) * 10, 100),
+            min(actividades.get(poa_id, 0) * 5, 100),
+            85,
+            90,
+        ])
+    return unidades_data
+
+
+def datos_trimestrales():
+    """
+    Cumplimiento promedio por trimestre del POA aprobado de cada unidad.
+    Usado por las páginas de estadísticas y las exportaciones del reporte trimestral.
+    """
+    unidades = Usuario.objects.unidades().select_related('unidad')
+    poas = poa_aprobado_por_unidad()
+
+    trimestre = Case(
+        When(mes__lte=3, then=1), When(mes__lte=6, then=2), When(mes__lte=9, then=3), default=4,
+        output_field=IntegerField(),
+    )
+    promedios = {
+        (proyecto_id, trim): promedio
+        for proyecto_id, trim, promedio in (
+            AvanceMensual.objects.filter(actividad__meta__proyecto_id__in=poas.values())
+            .annotate(trimestre=trimestre).order_by()
+            .values_list('actividad__meta__proyecto_id', 'trimestre')
+            .annotate(promedio=Avg('cumplimiento'))
+        )
+    }
+
+    datos = []
+    for unidad in unidades:
+        poa_id = poas.get(unidad.id)
+        datos.append({
+            'nombre': unidad.unidad.nombre,
+            **{f't{t}': _redondear(promedios.get((poa_id, t))) for t in range(1, 5)},
+        })
+    return datos
+
+
+def filtrar_por_nombre(filas, busqueda_str):
+    """Filtra filas con clave 'nombre' (p. ej. las de datos_trimestrales) por el texto buscado"""
+    if not busqueda_str:
+        return filas
+    busqueda_str = busqueda_str.lower()
+    return [fila for fila in filas if busqueda_str in fila['nombre'].lower()]
+
+
+# --- Dashboard de una unidad ---
+
+def espacio_unidad(unidad_id):
+    """Espacio de caché de los datos de una unidad (login.Unidad)"""
+    return f'unidad:{unidad_id}'
+
+
+def resumen_unidad(unidad):
+    """
+    Tarjetas del dashboard de una unidad: conteo por estado con agregación condicional
+    (una consulta), cumplimiento global con tope de los proyectos aprobados (una consulta)
+    y los proyectos recientes (dicts con los campos de la tabla, no instancias: el
+    resumen se guarda en la caché).
+    """
+    proyectos = Proyecto.objects.filter(unidad__unidad=unidad)
+    conteos = proyectos.aggregate(
+        total_proyectos=Count('id'),
+        proyectos_aprobados=Count('id', filter=Q(estado='APROBADO')),
+        proyectos_revision=Count('id', filter=Q(estado='ENVIADO')),
+        proyectos_borrador=Count('id', filter=Q(estado__in=['BORRADOR', 'RECHAZADO'])),
+    )
+    avances = AvanceMensual.objects.filter(
+        actividad__meta__proyecto__unidad__unidad=unidad, actividad__meta__proyecto__estado='APROBADO'
+    )
+    return {
+        **conteos,
+        'cumplimiento_global': totales_cumplimiento(avances, decimales=1)['porcentaje'],
+        'proyectos_recientes': list(
+            proyectos.order_by('-anio', '-fecha_modificacion', 'id')
+            .values('id', 'nombre', 'objetivo_unidad', 'anio', 'estado', 'fecha_modificacion')[:5]
+        ),
+    }
@@ -0,0 +1,56 @@
+"""
+Estado de navegación de los wizards (paso actual, proyecto en edición).
+El paso se guarda en la caché asociado a la clave de sesión en lugar de dentro de la
+sesión: cambiar de paso no modifica la sesión y por lo tanto no genera un UPDATE de
+django_session en cada clic. El estado vence junto con la cookie de sesión.
+Los valores de EN_SESION sí van a la sesión (solo se escribe cuando cambian): si la
+caché descarta la entrada, el wizard vuelve al paso 1 pero con el mismo proyecto, en
+lugar de crear otro borrador.
+Usado por poa (crear_proyecto_wizard) y administrador (editar_proyecto_admin).
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+EN_SESION = {'wizard_proyecto_id'}
+
+
+def _clave(request):
+    if request.session.session_key is None:
+        # Solo ocurre con sesiones aún no persistidas (antes del primer login)
+        request.session.save()
+    return f'wizard:{request.session.session_key}'
+
+
+def obtener(request, nombre, defecto=None):
+    """Valor guardado para la sesión del request o el defecto"""
+    if nombre in EN_SESION:
+        return request.session.get(nombre, defecto)
+    return cache.get(_clave(request), {}).get(nombre, defecto)
+
+
+def guardar(request, **valores):
+    """Actualiza uno o más valores del estado de la sesión"""
+    for nombre in EN_SESION & valores.keys():
+        valor = valores.pop(nombre)
+        if request.session.get(nombre) != valor:
+            request.session[nombre] = valor
+    if not valores:
+        return
+    clave = _clave(request)
+    estado = cache.get(clave, {})
+    estado.update(valores)
+    cache.set(clave, estado, settings.SESSION_COOKIE_AGE)
+
+
+def limpiar(request, *nombres):
+    """Elimina los valores indicados del estado de la sesión"""
+    for nombre in EN_SESION.intersection(nombres):
+        request.session.pop(nombre, None)
+    clave = _clave(request)
+    estado = cache.get(clave, {})
+    for nombre in nombres:
+        estado.pop(nombre, None)
+    if estado:
+        cache.set(clave, estado, settings.SESSION_COOKIE_AGE)
+    else:
+        cache.delete(clave)
@@ -0,0 +1,42 @@
+"""
+Datasets de los gráficos de estadísticas servidos como JSON.
+Usado por administrador y auditor: la página se renderiza sin los datos y cada
+gráfico pide su dataset. El ETag y Last-Modified salen de la versión del espacio
+'dashboard', así que el navegador revalida y recibe 304 mientras nada cambie.
+"""
+from django.http import Http404, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .cache import cacheado, version_datos
+from .estadisticas import datos_unidades, datos_proyectos
+
+ESPACIO = 'dashboard'
+TTL_DATASETS = 15 * 60
+
+DATASETS = {
+    'unidades': datos_unidades,
+    'proyectos': datos_proyectos,
+}
+
+
+def respuesta_dataset(request, dataset):
+    """Respuesta JSON (o 304) de un dataset de gráficos"""
+    if dataset not in DATASETS:
+        raise Http404('Dataset desconocido')
+
+    version = version_datos(ESPACIO)
+    etag = f'"{dataset}-{version}"'
+    # Las versiones se generan a partir del reloj en microsegundos
+    ultima_modificacion = version // 1_000_000
+
+    respuesta = get_conditional_response(request, etag=etag, last_modified=ultima_modificacion)
+    if respuesta is None:
+        datos = cacheado(ESPACIO, f'{dataset}_data', DATASETS[dataset], ttl=TTL_DATASETS)
+        respuesta = JsonResponse(datos)
+
+    respuesta['ETag'] = etag
+    respuesta['Last-Modified'] = http_date(ultima_modificacion)
+    # Siempre revalidar: los datos cambian con cada avance registrado
+    patch_cache_control(respuesta, private=True, no_cache=True)
+    return respuesta